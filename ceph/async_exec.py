@@ -0,0 +1,184 @@
+"""
+asyncio layer for executing commands on the remote hosts.
+
+The blocking exec_command ties up a thread per command for its whole duration,
+hence fanning out to hundreds of nodes or clients means hundreds of threads.
+Here the channel is opened in the default executor, which is quick, and the
+output is awaited on the event loop through the pipe based descriptor of the
+paramiko channel. Thousands of commands are thus awaited by a single thread.
+
+The concurrency per host is bounded by a semaphore sized to the SSH channel
+pool of the connection, hence the commands queue on the event loop instead of
+blocking the executor threads.
+
+Usage:
+    out, err = await node.aexec("uptime")
+    results = await gather_exec(clients, "mount | grep ceph", check_ec=False)
+
+    # From the synchronous test modules
+    results = exec_on_nodes(clients, lambda c: f"fio --name={c.hostname} ...")
+"""
+
+import asyncio
+import codecs
+import threading
+import weakref
+from time import monotonic
+
+READ_SIZE = 65536
+
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def host_semaphore(key, limit):
+    """Returns the semaphore of the host bound to the running event loop.
+
+    Args:
+        key (str): identity of the host connection e.g. user@host
+        limit (int): maximum number of commands executed concurrently
+    """
+    loop = asyncio.get_running_loop()
+    semaphores = _semaphores.setdefault(loop, {})
+    if key not in semaphores:
+        semaphores[key] = asyncio.Semaphore(max(int(limit), 1))
+    return semaphores[key]
+
+
+def _remaining(deadline):
+    return None if deadline is None else max(deadline - monotonic(), 0)
+
+
+async def wait_readable(channel, timeout=None):
+    """Waits until the channel has data on either stream or reached EOF.
+
+    Raises:
+        asyncio.TimeoutError: when nothing arrived within the timeout
+    """
+    loop = asyncio.get_running_loop()
+    ready = loop.create_future()
+    fd = channel.fileno()
+    loop.add_reader(fd, lambda: ready.done() or ready.set_result(True))
+    try:
+        await asyncio.wait_for(ready, timeout)
+    finally:
+        loop.remove_reader(fd)
+
+
+async def read_channel(channel, timeout=None):
+    """Reads the output and the exit status of the command on the channel.
+
+    Args:
+        channel: paramiko.Channel the command was executed on
+        timeout (int): maximum time allowed for the command in seconds
+
+    Returns:
+        stdout (str), stderr (str), exit status (int)
+
+    Raises:
+        asyncio.TimeoutError: when the command did not complete within the timeout
+    """
+    deadline = monotonic() + timeout if timeout else None
+    out = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    err = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    _out, _err = [], []
+
+    while True:
+        # EOF follows the last data, observing it before draining the buffers
+        # ensures the data fed along with it is read as well
+        eof = channel.eof_received
+        while channel.recv_ready():
+            _out.append(out.decode(channel.recv(READ_SIZE)))
+        while channel.recv_stderr_ready():
+            _err.append(err.decode(channel.recv_stderr(READ_SIZE)))
+
+        # The descriptor stays readable once EOF is received
+        if eof:
+            break
+
+        if deadline is not None and monotonic() >= deadline:
+            raise asyncio.TimeoutError()
+        await wait_readable(channel, _remaining(deadline))
+
+    if not channel.exit_status_ready():
+        # The exit status usually precedes EOF, it is rare to wait here
+        loop = asyncio.get_running_loop()
+        status = await loop.run_in_executor(
+            None, channel.status_event.wait, _remaining(deadline)
+        )
+        if not status:
+            raise asyncio.TimeoutError()
+
+    _out.append(out.decode(b"", final=True))
+    _err.append(err.decode(b"", final=True))
+    return "".join(_out), "".join(_err), channel.recv_exit_status()
+
+
+async def open_channel(pool, cmd, timeout=None):
+    """Acquires a channel of the pool and starts the command on it.
+
+    The pool and exec request are blocking, hence done in the default executor.
+
+    Returns:
+        slot of the pool to be released and the channel
+    """
+
+    def _open():
+        slot, channel = pool.acquire(timeout=timeout)
+        try:
+            channel.exec_command(cmd)
+        except BaseException:
+            pool.release(slot, channel)
+            raise
+        return slot, channel
+
+    return await asyncio.get_running_loop().run_in_executor(None, _open)
+
+
+async def gather_exec(nodes, cmd, return_exceptions=False, **kw):
+    """Executes the command on all the nodes concurrently.
+
+    Args:
+        nodes (list): CephNode objects
+        cmd (str|callable): command or method returning the command of a node
+        return_exceptions (bool): return the failures instead of raising the first
+        kw: arguments of CephNode.aexec e.g. sudo, timeout, check_ec
+
+    Returns:
+        list of the results of aexec in the order of the nodes
+    """
+    return await asyncio.gather(
+        *(node.aexec(cmd(node) if callable(cmd) else cmd, **kw) for node in nodes),
+        return_exceptions=return_exceptions,
+    )
+
+
+def run_sync(coro):
+    """Runs the coroutine to completion from synchronous code.
+
+    A separate thread hosts the event loop when the caller is already running
+    within one, e.g. a callback of an event loop.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    result = {}
+
+    def _run():
+        try:
+            result["value"] = asyncio.run(coro)
+        except BaseException as err:  # noqa
+            result["error"] = err
+
+    thread = threading.Thread(target=_run, daemon=True)
+    thread.start()
+    thread.join()
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+def exec_on_nodes(nodes, cmd, return_exceptions=False, **kw):
+    """Synchronous shim of gather_exec for the test modules."""
+    return run_sync(gather_exec(nodes, cmd, return_exceptions, **kw))
@@ -1,5 +1,6 @@
 """This module implements the required foundation data structures for testing."""
 
+import asyncio
 import base64
 import codecs
 import datetime
@@ -8,8 +9,11 @@ import os
 import pickle
 import random
 import re
+import select
 import socket
 import subprocess
+import threading
+import weakref
 from time import sleep, time
 
 import cryptography
@@ -18,15 +22,50 @@ import requests
 import yaml
 from looseversion import LooseVersion
 
+from ceph.async_exec import host_semaphore, open_channel, read_channel
+from ceph.health_watcher import find_watcher, pgs_active_clean
 from ceph.parallel import parallel
+from ceph.ssh_pool import ChannelPool, backoff_delays
 from cli.ceph.ceph import Ceph as CephCli
 from utility import lvm_utils
+from utility.command_profile import profiler
 from utility.log import Log
 from utility.utils import custom_ceph_config
 
 logger = Log(__name__)
 
 
+# Objects notified about every command executed on the nodes
+_command_observers = weakref.WeakSet()
+
+
+def register_command_observer(observer):
+    """Registers an object to be notified about the commands executed on the nodes.
+
+    The observer must implement ``observe(node, cmd)`` which is invoked before and
+    after the execution of every command. Observers are weakly referenced, hence they are
+    unregistered automatically when they are garbage collected.
+
+    Args:
+      observer: object implementing the observe method.
+    """
+    _command_observers.add(observer)
+
+
+def unregister_command_observer(observer):
+    """Unregisters the given command observer."""
+    _command_observers.discard(observer)
+
+
+def notify_command_observers(node, cmd):
+    """Notifies the registered observers about the command executed on the node."""
+    for observer in list(_command_observers):
+        try:
+            observer.observe(node, cmd)
+        except Exception as err:  # noqa
+            logger.debug(f"Command observer {observer} failed with {err}")
+
+
 class SocketTimeoutException(Exception):
     pass
 
@@ -724,8 +763,14 @@ class Ceph(object):
         pending_states = ["peering", "activating", "creating"]
         valid_states = ["active+clean"]
 
-        out = str()
-        while datetime.datetime.now() - starttime <= timeout:
+        # React to the ceph -w stream of the cluster instead of polling, when
+        # one is open. The stream gets only part of the timeout, so that a
+        # ceph -s can still confirm it, or poll for the rest of the timeout.
+        watcher = find_watcher(self.get_nodes(), cluster_name)
+        if watcher:
+            watcher.wait_for(pgs_active_clean(), timeout.total_seconds() * 0.8)
+
+        while True:
             cmd = "ceph -s"
             if cluster_name is not None:
                 cmd += f" --cluster {cluster_name}"
@@ -737,6 +782,8 @@ class Ceph(object):
             if not any(state in out for state in pending_states):
                 if all(state in out for state in valid_states):
                     break
+            if datetime.datetime.now() - starttime > timeout:
+                break
             sleep(5)
         logger.info(out)
         if not all(state in out for state in valid_states):
@@ -1221,6 +1268,81 @@ def read_stream(channel, end_time, timeout, stderr=False, log=True):
         return _output.decode("utf-8", errors="replace")  # Fallback to safe decode
 
 
+def wait_for_channel(channel, end_time=None, interval=5):
+    """Blocks until the channel has data on either stream or the command exits.
+
+    The paramiko channel exposes a pipe based file descriptor that is signalled
+    whenever data arrives on stdout/stderr or the stream is closed, so instead
+    of sleeping for a fixed interval the caller is woken up as soon as there is
+    something to process. Once EOF has been received the descriptor remains
+    readable, hence the exit status event is used for the remaining wait.
+
+    Args:
+      channel: the paramiko.Channel object to be watched.
+      end_time: maximum allocated time for the command. Default is None.
+      interval: maximum time in seconds to block before returning control to
+                the caller for timeout checks. Default is 5.
+
+    Returns:
+      True if the channel is ready to be processed else False.
+    """
+    _wait = interval
+    if end_time:
+        _remaining = (end_time - datetime.datetime.now()).total_seconds()
+        _wait = max(min(interval, _remaining), 0)
+
+    if channel.eof_received:
+        return channel.status_event.wait(_wait)
+
+    _ready, _, _ = select.select([channel], [], [], _wait)
+    return bool(_ready) or channel.exit_status_ready()
+
+
+def stream_channel(channel, err, timeout=None, size=1048576, err_size=65536):
+    """Yields the stdout data of the command as it arrives, draining stderr.
+
+    Both the streams share the window of the channel, a command writing to
+    stderr while its stdout is being streamed stalls once the window is filled
+    with unread stderr data. Hence stderr is drained along with stdout and its
+    last err_size bytes are kept in err.
+
+    Args:
+      channel: the paramiko.Channel the command is executed on.
+      err (bytearray): receives the tail of the stderr data.
+      timeout: maximum time in seconds without any data. Default is None.
+      size: maximum size of the chunks read. Default is 1 MiB.
+      err_size: maximum size of the stderr data kept. Default is 64 KiB.
+
+    Raises:
+      socket.timeout: if no data is received within the timeout.
+    """
+    while True:
+        # EOF follows the last data, observing it before draining the buffers
+        # ensures the data fed along with it is read as well
+        eof = channel.eof_received
+        _drained = False
+        while channel.recv_stderr_ready():
+            err.extend(channel.recv_stderr(size))
+            del err[:-err_size]
+            _drained = True
+
+        if channel.recv_ready():
+            yield channel.recv(size)
+            continue
+
+        if eof:
+            break
+
+        if not _drained:
+            _ready, _, _ = select.select([channel], [], [], timeout)
+            if not _ready:
+                raise socket.timeout()
+
+    while channel.recv_stderr_ready():
+        err.extend(channel.recv_stderr(size))
+        del err[:-err_size]
+
+
 class RolesContainer(object):
     """
     Container for single or multiple node roles.
@@ -1324,18 +1446,36 @@ class SSHConnectionManager(object):
         self.__transport = None
         self.__outage_start_time = None
         self.outage_timeout = datetime.timedelta(seconds=outage_timeout)
+        self._init_pool()
+
+    def _init_pool(self):
+        """Creates the channel pool sharing the connection of the manager."""
+        self._lock = threading.RLock()
+        self.pool = ChannelPool(
+            f"{self.username}@{self.ip_address}",
+            primary=self.get_client,
+            connect=self._new_client,
+        )
 
     @property
     def client(self):
         return self.get_client()
 
     def get_client(self):
-        if not (self.__transport and self.__transport.is_active()):
-            self.__connect()
-            self.__transport = self.__client.get_transport()
+        with self._lock:
+            if not (self.__transport and self.__transport.is_active()):
+                self.__connect()
+                self.__transport = self.__client.get_transport()
 
         return self.__client
 
+    def _new_client(self):
+        """Returns an additional connection to the host used by the channel pool."""
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.MissingHostKeyPolicy())
+        client.connect(**self._connect_kwargs())
+        return client
+
     def _get_ssh_key(self, private_key_file_path):
         """Get SSH key based on file type"""
         passphrase = self._private_key_password
@@ -1396,6 +1536,7 @@ class SSHConnectionManager(object):
 
     def close(self):
         """Close the SSH connection."""
+        self.pool.close()
         try:
             if self.__client:
                 self.__client.close()
@@ -1403,10 +1544,34 @@ class SSHConnectionManager(object):
             pass
         self.__transport = None
 
+    def _connect_kwargs(self):
+        """Returns the arguments of paramiko connect for the host."""
+        connect_kw = {
+            "hostname": self.ip_address,
+            "username": self.username,
+            "password": self.password,
+            "allow_agent": False,
+            "look_for_keys": (
+                False if self._private_key_file_path else self.look_for_keys
+            ),
+        }
+        if self._private_key_file_path:
+            # key_filename + passphrase (agent removed per user: agent did not work)
+            connect_kw["key_filename"] = [self._private_key_file_path]
+            connect_kw["passphrase"] = self._private_key_password
+        else:
+            connect_kw["pkey"] = self.pkey
+        return connect_kw
+
     def __connect(self):
-        """Establishes a connection with the remote host using the IP Address."""
+        """Establishes a connection with the remote host using the IP Address.
+
+        The attempts are retried with an exponential backoff until the outage
+        timeout, hence short blips recover quickly without hammering the host.
+        """
         end_time = datetime.datetime.now() + self.outage_timeout
         last_error = None
+        delays = backoff_delays()
         while end_time > datetime.datetime.now():
             try:
                 auth = (
@@ -1421,22 +1586,7 @@ class SSHConnectionManager(object):
                     auth,
                     self._private_key_file_path or "(none)",
                 )
-                connect_kw = {
-                    "hostname": self.ip_address,
-                    "username": self.username,
-                    "password": self.password,
-                    "allow_agent": False,
-                    "look_for_keys": (
-                        False if self._private_key_file_path else self.look_for_keys
-                    ),
-                }
-                if self._private_key_file_path:
-                    # key_filename + passphrase (agent removed per user: agent did not work)
-                    connect_kw["key_filename"] = [self._private_key_file_path]
-                    connect_kw["passphrase"] = self._private_key_password
-                else:
-                    connect_kw["pkey"] = self.pkey
-                self.__client.connect(**connect_kw)
+                self.__client.connect(**self._connect_kwargs())
                 logger.info("SSH connected to %s as %s", self.ip_address, self.username)
                 self.__outage_start_time = None
                 return
@@ -1453,8 +1603,10 @@ class SSHConnectionManager(object):
                 if not self.__outage_start_time:
                     self.__outage_start_time = datetime.datetime.now()
 
-                logger.debug("Retrying connection in 10 seconds")
-                sleep(10)
+                remaining = (end_time - datetime.datetime.now()).total_seconds()
+                delay = max(min(next(delays), remaining), 0)
+                logger.debug("Retrying connection in %.1f seconds", delay)
+                sleep(delay)
 
         hint = ""
         err_str = str(last_error).lower() if last_error else ""
@@ -1508,6 +1660,9 @@ class SSHConnectionManager(object):
         # pkey (paramiko/cryptography key) is not picklable; recreated in __setstate__
         if pickle_dict.get("pkey") is not None:
             del pickle_dict["pkey"]
+        # locks and the pooled transports are recreated in __setstate__
+        pickle_dict.pop("_lock", None)
+        pickle_dict.pop("pool", None)
         return pickle_dict
 
     def __setstate__(self, state):
@@ -1519,6 +1674,7 @@ class SSHConnectionManager(object):
         self.pkey = (
             self._get_ssh_key(key_path) if self.look_for_keys and key_path else None
         )
+        self._init_pool()
 
 
 class CephNode(object):
@@ -1989,7 +2145,7 @@ class CephNode(object):
         cmd = kw["cmd"]
         _end_time = None
         _verbose = kw.get("verbose", False)
-        ssh = self.rssh if kw.get("sudo") else self.ssh
+        connection = self.root_connection if kw.get("sudo") else self.connection
         long_running = kw.get("long_running", False)
         if "timeout" in kw:
             timeout = None if kw["timeout"] == "notimeout" else kw["timeout"]
@@ -1997,8 +2153,10 @@ class CephNode(object):
             # Set defaults if long_running then 1h else 5m
             timeout = 3600 if kw.get("long_running", False) else 600
 
+        slot, channel = None, None
         try:
-            channel = ssh().get_transport().open_session(timeout=timeout)
+            # Sessions are spread across the pooled transports of the node
+            slot, channel = connection.pool.acquire(timeout=timeout)
             channel.settimeout(timeout)
 
             logger.info(
@@ -2017,9 +2175,11 @@ class CephNode(object):
 
             _out = ""
             _err = ""
+            _wakeups = 0
             while not channel.exit_status_ready():
-                # Prevent high resource consumption
-                sleep(1)
+                # Block until the channel signals data or completion
+                wait_for_channel(channel, _end_time)
+                _wakeups += 1
 
                 # Check the streams for data and log in debug mode only if it
                 # is a long running command else don't log.
@@ -2044,6 +2204,12 @@ class CephNode(object):
                 channel.get_transport().get_username(),
                 self.ip_address,
             )
+            logger.debug(
+                "Completion of %s on %s was detected after %d channel wakeups",
+                cmd,
+                self.hostname,
+                _wakeups,
+            )
 
             # Check for data residues in the channel streams. This is required for the following reasons
             #   - exit_ready and first line is blank causing data to be None
@@ -2063,12 +2229,14 @@ class CephNode(object):
             logger.error("%s failed to execute within %d seconds.", cmd, timeout)
             raise SocketTimeoutException(terr)
         except TimeoutException as tex:
-            channel.close()
             logger.error("%s failed to execute within %ds.", cmd, timeout)
             raise CommandFailed(tex)
         except BaseException as be:  # noqa
             logger.exception(be)
             raise CommandFailed(be)
+        finally:
+            if slot:
+                connection.pool.release(slot, channel)
 
     def exec_command(self, **kw):
         """Execute the given command on the remote host.
@@ -2100,7 +2268,21 @@ class CephNode(object):
             self.rssh_transport().set_keepalive(15)
 
         cmd = kw["cmd"]
-        _out, _err, _exit, _time = self.long_running(**kw)
+        _out, _err, _exit = "", "", None
+        _start = time()
+        notify_command_observers(self, cmd)
+        try:
+            _out, _err, _exit, _time = self.long_running(**kw)
+        finally:
+            notify_command_observers(self, cmd)
+            profiler.record(
+                self.hostname,
+                cmd,
+                time() - _start,
+                len(cmd.encode()),
+                len(_out.encode()) + len(_err.encode()),
+                _exit,
+            )
         self.exit_status = _exit
 
         if kw.get("pretty_print"):
@@ -2138,6 +2320,87 @@ class CephNode(object):
 
         return _out, _err
 
+    async def aexec(
+        self, cmd, sudo=False, timeout=600, check_ec=True, verbose=False, limit=None
+    ):
+        """Execute the given command on the remote host from an event loop.
+
+        The asyncio counterpart of exec_command, the output is awaited without
+        blocking a thread hence the commands of many nodes can be gathered.
+
+        Args:
+          cmd: The command that needs to be executed on the remote host.
+          sudo: Bool flag to execute the command as root.
+          timeout: Max time to wait for command to complete. Default is 600 seconds.
+          check_ec: Bool flag to indicate if the command should check for error code.
+          verbose: Bool flag to also return the exit code and duration.
+          limit: Max commands executed concurrently on the host, defaults to the
+                 capacity of the SSH channel pool.
+
+        Returns:
+          Tuple having stdout, stderr data output
+          Tuple having stdout, stderr, exit code, duration when verbose is enabled
+
+        Raises:
+          CommandFailed: when the command fails, times out or the check_ec fails
+
+        Examples:
+            out, _ = await node.aexec("uptime")
+        """
+        connection = self.root_connection if sudo else self.connection
+        pool = connection.pool
+        timeout = None if timeout == "notimeout" else timeout
+        semaphore = host_semaphore(
+            pool.name, limit or pool.max_sessions * pool.max_transports
+        )
+
+        _out, _err, _exit = "", "", None
+        async with semaphore:
+            _start = time()
+            logger.info("Execute %s on %s [%s]", cmd, self.hostname, self.ip_address)
+            notify_command_observers(self, cmd)
+            try:
+                slot, channel = await open_channel(pool, cmd, timeout)
+                try:
+                    _out, _err, _exit = await read_channel(channel, timeout)
+                finally:
+                    pool.release(slot, channel)
+            except asyncio.TimeoutError:
+                logger.error("%s failed to execute within %ss.", cmd, timeout)
+                raise CommandFailed(
+                    f"{cmd} exceeded {timeout}s on {self.hostname} [{self.ip_address}]"
+                )
+            except CommandFailed:
+                raise
+            except Exception as err:  # noqa
+                logger.exception(err)
+                raise CommandFailed(err)
+            finally:
+                _time = time() - _start
+                notify_command_observers(self, cmd)
+                profiler.record(
+                    self.hostname,
+                    cmd,
+                    _time,
+                    len(cmd.encode()),
+                    len(_out.encode()) + len(_err.encode()),
+                    _exit,
+                )
+
+        logger.info(
+            "Execution of %s took %.2f seconds on %s", cmd, _time, self.hostname
+        )
+        self.exit_status = _exit
+        if check_ec and _exit != 0:
+            raise CommandFailed(
+                f"{cmd} returned {_err} and code {_exit} on {self.hostname} [{self.ip_address}]"
+            )
+
+        if verbose:
+            return _out, _err, _exit, _time
+
+        return _out, _err
+
     def remote_file(self, **kw):
         """Return contents of the remote file."""
         client = self.rssh if kw.get("sudo", False) else self.ssh
@@ -5,9 +5,8 @@ Contains helper functions that can used across the module.
 import json
 import os
 import tempfile
-from datetime import datetime, timedelta
+from datetime import datetime
 from os.path import dirname
-from time import sleep
 from typing import Optional
 
 from dateutil import parser
@@ -16,6 +15,7 @@ from looseversion import LooseVersion
 
 from ceph.ceph import CommandFailed
 from ceph.utils import get_node_by_id, get_nodes_by_ids
+from ceph.waiter import ADAPTIVE, WaitUntil
 from utility.log import Log
 from utility.ssl_certs import CertificateGenerator
 from utility.utils import generate_self_signed_certificate
@@ -1038,12 +1038,9 @@ def monitoring_file_existence(node, file_or_path, file_exist=True, timeout=180):
     Returns:
         boolean
     """
-    end_time = datetime.now() + timedelta(seconds=timeout)
-    while end_time > datetime.now():
-        if file_exist == file_or_path_exists(node, file_or_path):
-            return True
-        sleep(3)
-    return False
+    return WaitUntil(timeout=timeout, interval=3, name=file_or_path, **ADAPTIVE).poll(
+        lambda: file_exist == file_or_path_exists(node, file_or_path)
+    )
 
 
 def validate_log_file_after_enable(cls):
@@ -1160,7 +1157,6 @@ def check_service_exists(
         Boolean: True if the service and the list of daemons are running else False.
 
     """
-    end_time = datetime.now() + timedelta(seconds=timeout)
     cmd_args = ["cephadm", "shell", "--", "ceph", "orch", "ls"]
     if service_name:
         cmd_args += ["--service_name", service_name]
@@ -1174,8 +1170,10 @@ def check_service_exists(
 
     _retries = 3  # cross-verification retries
     _count = 0
-    while end_time > datetime.now():
-        sleep(interval)
+    # Fixed interval, the daemons must be seen running across spaced re-checks
+    for _ in WaitUntil(
+        timeout=timeout, interval=interval, name=service_name or service_type
+    ):
         out, _ = installer.exec_command(
             sudo=True, cmd=" ".join(cmd_args), check_ec=True
         )
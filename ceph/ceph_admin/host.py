@@ -4,6 +4,7 @@ import json
 from copy import deepcopy
 
 from ceph.ceph import CephNode
+from ceph.parallel import parallel
 from ceph.utils import get_node_by_id
 from utility.log import Log
 
@@ -154,8 +155,12 @@ class Host(MaintenanceMixin, Orch):
                     nodes: ["node1", "node2", ...]
                     labels: [mon, osd] or apply-all-labels
                     attach_ip_address: boolean
+                bulk: boolean               # enroll all hosts with one host spec
 
         """
+        if config.get("bulk"):
+            return self.add_hosts_bulk(config)
+
         args = config.get("args")
         nodes = args.pop("nodes", None)
 
@@ -168,6 +173,109 @@ class Host(MaintenanceMixin, Orch):
 
             self.add(cfg)
 
+    def add_hosts_bulk(self, config):
+        """Add host(s) to cluster with a single multi-document host spec.
+
+        All the hosts are submitted at once with ``ceph orch apply -i`` and then
+        verified against a single ``ceph orch host ls`` snapshot, instead of an
+        add and three listings per host. The admin keyring checks are executed
+        on all the _admin hosts concurrently.
+
+        Args:
+            config (Dict): hosts configuration, same as add_hosts
+
+        Example::
+
+            config:
+                base_cmd_args:
+                    concise: true
+                args:
+                    nodes: ["node1", "node2", ...]
+                    labels: [mon, osd] or apply-all-labels
+                    attach_ip_address: boolean
+                validate_admin_keyring: boolean
+        """
+        args = config.get("args", {})
+        attach_address = args.get("attach_ip_address")
+        labels = args.get("labels")
+        node_names = args.get("nodes") or [
+            node.hostname for node in self.cluster.get_nodes()
+        ]
+
+        ceph_nodes = list()
+        for node_name in node_names:
+            ceph_node = get_node_by_id(self.cluster, node_name=node_name)
+            if not ceph_node:
+                raise ResourceNotFoundError(f"No matching resource found: {node_name}")
+
+            # Skipping client node, if only client label is attached
+            if ["client"] == ceph_node.role.role_list:
+                continue
+            ceph_nodes.append(ceph_node)
+
+        if not ceph_nodes:
+            return
+
+        logger.info(
+            "Adding nodes %s, (attach_address: %s, labels: %s)"
+            % ([n.hostname for n in ceph_nodes], attach_address, labels)
+        )
+        spec = {
+            "service_type": "host",
+            "address": attach_address,
+            "labels": labels,
+            "nodes": [n.hostname for n in ceph_nodes],
+        }
+        self.apply_spec({"base_cmd_args": config.get("base_cmd_args"), "specs": [spec]})
+
+        out, _ = self.list()
+        hosts = {host["hostname"]: host for host in json.loads(out)}
+
+        admin_nodes = list()
+        for ceph_node in ceph_nodes:
+            host = hosts.get(ceph_node.hostname)
+            if not host:
+                raise HostOpFailure(
+                    f"Hostname verify failure. Expected {ceph_node.hostname}"
+                )
+
+            if attach_address and ceph_node.ip_address != host["addr"]:
+                raise HostOpFailure(
+                    f"IP address verify failed. Expected {ceph_node.ip_address}"
+                )
+
+            _labels = labels
+            if isinstance(_labels, str) and _labels == "apply-all-labels":
+                _labels = list(set(ceph_node.role.role_list))
+
+            if _labels:
+                logger.info(
+                    f"{ceph_node.hostname}: {sorted(host['labels'])} :: {sorted(_labels)}"
+                )
+                if "_admin" in _labels:
+                    admin_nodes.append(ceph_node)
+
+        if config.get("validate_admin_keyring") and admin_nodes:
+            with parallel() as p:
+                for ceph_node in admin_nodes:
+                    p.spawn(self._admin_files_exist, ceph_node)
+
+            missing = [
+                n.hostname for n, found in zip(admin_nodes, p.results) if not found
+            ]
+            if missing:
+                raise HostOpFailure(
+                    f"Ceph configuration or keyring not found on {missing}"
+                )
+            logger.info("Ceph configuration and Keyring found")
+
+    @staticmethod
+    def _admin_files_exist(ceph_node):
+        """Returns whether the admin keyring and ceph.conf exist on the node."""
+        return monitoring_file_existence(
+            ceph_node, DEFAULT_KEYRING_PATH
+        ) and monitoring_file_existence(ceph_node, DEFAULT_CEPH_CONF_PATH)
+
     def remove(self, config):
         """
         Remove host from cluster
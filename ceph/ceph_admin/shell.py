@@ -1,8 +1,16 @@
 """Interface to cephadm shell CLI."""
 
+import base64
+import datetime
+import os
+import socket
+import threading
 from copy import deepcopy
 from typing import Dict, List
+from uuid import uuid4
 
+from ceph.ceph import CommandFailed, notify_command_observers
+from utility.command_profile import profiler
 from utility.log import Log
 
 from .common import config_dict_to_string
@@ -11,6 +19,212 @@ from .typing_ import CephAdmProtocol
 LOG = Log(__name__)
 BASE_CMD = ["cephadm", "shell"]
 
+SESSION_MARKER = "__CEPHCI_SHELL__"
+SESSION_OUT = "/tmp/.cephci_shell.out"
+SESSION_ERR = "/tmp/.cephci_shell.err"
+SESSION_START_TIMEOUT = 300
+
+_SESSIONS = dict()
+_SESSIONS_LOCK = threading.Lock()
+
+
+class ShellSessionError(Exception):
+    """Raised when the persistent cephadm shell session is unusable."""
+
+    pass
+
+
+class ShellSession:
+    """Long-lived cephadm shell container serving many commands.
+
+    A single ``cephadm shell -- bash -s`` container is started on the installer
+    and kept alive. Every command is written to its stdin wrapped in a frame,
+    the stdout/stderr of the command are base64 encoded within the container
+    and returned along with the exit code between two markers carrying a
+    unique token. This avoids the container start up cost on every command.
+    """
+
+    def __init__(self, node, base_cmd_args: str = ""):
+        """
+        Args:
+            node (CephNode): installer node hosting the shell container
+            base_cmd_args (Str): cephadm base command options
+        """
+        self.node = node
+        self.base_cmd_args = base_cmd_args
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.broken = False
+        self._slot = None
+        self._channel = None
+        self._buffer = b""
+
+    @property
+    def active(self):
+        return bool(
+            self._channel
+            and not self._channel.closed
+            and not self._channel.exit_status_ready()
+        )
+
+    def open(self):
+        """Start the shell container and validate the framing protocol."""
+        cmd = deepcopy(BASE_CMD)
+        if self.base_cmd_args:
+            cmd.append(self.base_cmd_args)
+        cmd.extend(["--", "bash", "--norc", "--noprofile", "-s"])
+
+        LOG.info("Starting persistent cephadm shell session on %s", self.node.hostname)
+        try:
+            # The session holds a slot of the pool for its lifetime, hence it is
+            # accounted for along with the other sessions of the node
+            pool = self.node.root_connection.pool
+            self._slot, self._channel = pool.acquire(timeout=SESSION_START_TIMEOUT)
+            self._channel.exec_command(" ".join(cmd))
+        except Exception as err:
+            self.close()
+            raise ShellSessionError(f"Unable to start cephadm shell session: {err}")
+
+        self._buffer = b""
+        try:
+            _, _, rc, _ = self.run("true", timeout=SESSION_START_TIMEOUT)
+        except CommandFailed as err:
+            raise ShellSessionError(f"cephadm shell session handshake failed: {err}")
+        if rc != 0:
+            raise ShellSessionError("cephadm shell session handshake failed")
+
+    def close(self):
+        """Terminate the shell container."""
+        if self._channel:
+            try:
+                self._channel.sendall(b"exit 0\n")
+                self._channel.shutdown_write()
+            except Exception:
+                pass
+            if self._slot:
+                self.node.root_connection.pool.release(self._slot, self._channel)
+            else:
+                self._channel.close()
+        self._slot = None
+        self._channel = None
+        self._buffer = b""
+
+    def run(self, cmd: str, timeout: int = 600):
+        """Execute the command within the shell container.
+
+        Args:
+            cmd (Str): command to be executed
+            timeout (Int): Maximum time allowed for execution.
+
+        Returns:
+            out (Str), err (Str), rc (Int), duration (Float)
+
+        Raises:
+            ShellSessionError: when the command could not be sent to the session
+            CommandFailed: when the command exceeds the allocated time or the
+                session breaks once the command was sent, as the command may
+                have been executed and must not be replayed
+        """
+        token = uuid4().hex
+        script = (
+            f"( {cmd}\n) </dev/null >{SESSION_OUT} 2>{SESSION_ERR}; __rc=$?; "
+            f"echo {SESSION_MARKER}{token}; "
+            f"base64 -w0 {SESSION_OUT}; echo; base64 -w0 {SESSION_ERR}; echo; "
+            f"echo {SESSION_MARKER}{token} $__rc\n"
+        )
+
+        _start = datetime.datetime.now()
+        _end_time = _start + datetime.timedelta(seconds=timeout) if timeout else None
+        try:
+            self._channel.sendall(script.encode("utf-8"))
+        except Exception as err:
+            self.close()
+            raise ShellSessionError(f"cephadm shell session failure: {err}")
+
+        try:
+            frame = self._read_frame(token, _end_time)
+            out, err, rc = self._parse_frame(frame, token)
+        except socket.timeout:
+            self.close()
+            raise CommandFailed(
+                f"{cmd} failed to execute within {timeout}s on {self.node.hostname}"
+            )
+        except Exception as err:
+            self.close()
+            self.broken = True
+            raise CommandFailed(
+                f"{cmd} outcome unknown, cephadm shell session failed on "
+                f"{self.node.hostname}: {err}"
+            )
+
+        _time = (datetime.datetime.now() - _start).total_seconds()
+        return out, err, rc, _time
+
+    def _read_frame(self, token: str, end_time=None):
+        """Read the channel until the closing marker of the given token."""
+        _end = f"{SESSION_MARKER}{token} ".encode()
+        while True:
+            _idx = self._buffer.find(_end)
+            if _idx != -1:
+                _eol = self._buffer.find(b"\n", _idx)
+                if _eol != -1:
+                    frame = self._buffer[: _eol + 1]
+                    self._buffer = self._buffer[_eol + 1 :]
+                    return frame.decode("utf-8", errors="replace")
+
+            if end_time:
+                _remaining = (end_time - datetime.datetime.now()).total_seconds()
+                if _remaining <= 0:
+                    raise socket.timeout()
+                self._channel.settimeout(_remaining)
+            else:
+                self._channel.settimeout(None)
+
+            _data = self._channel.recv(65536)
+            if not _data:
+                raise ShellSessionError("cephadm shell session exited unexpectedly")
+            self._buffer += _data
+
+    @staticmethod
+    def _parse_frame(frame: str, token: str):
+        """Returns the stdout, stderr and exit code held in the frame."""
+        lines = frame.splitlines()
+        _start = f"{SESSION_MARKER}{token}"
+        try:
+            idx = lines.index(_start)
+            out, err, end = lines[idx + 1 : idx + 4]
+            rc = int(end.split()[-1])
+            return (
+                base64.b64decode(out).decode("utf-8", errors="replace"),
+                base64.b64decode(err).decode("utf-8", errors="replace"),
+                rc,
+            )
+        except (ValueError, IndexError) as e:
+            raise ShellSessionError(f"Malformed cephadm shell session frame: {e}")
+
+
+def get_shell_session(node, base_cmd_args: str = ""):
+    """Returns the persistent shell session of the node, creating it if required."""
+    key = (id(node), base_cmd_args)
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(key)
+        if session is None or session.pid != os.getpid() or session.node is not node:
+            session = ShellSession(node, base_cmd_args)
+            _SESSIONS[key] = session
+
+    return session
+
+
+def close_shell_sessions():
+    """Terminate all the persistent shell sessions of this process."""
+    with _SESSIONS_LOCK:
+        sessions = list(_SESSIONS.values())
+        _SESSIONS.clear()
+
+    for session in sessions:
+        if session.pid == os.getpid():
+            session.close()
+
 
 class ShellMixin:
     """Interface to shell CLI."""
@@ -28,6 +242,11 @@ class ShellMixin:
         """
         Ceph orchestrator shell interface to run ceph commands.
 
+        When ``persistent_shell`` is enabled in the configuration, commands are
+        executed in a long-lived cephadm shell session of the installer. The
+        one-shot ``cephadm shell`` invocation is used for long running commands,
+        when the session is busy or when the session cannot be used.
+
         Args:
             args (List): list arguments
             base_cmd_args (Dict)): cephadm base command options
@@ -42,10 +261,21 @@ class ShellMixin:
             rc (Int) exit status code if long_running command
 
         """
+        _base_args = config_dict_to_string(base_cmd_args) if base_cmd_args else ""
+        config = getattr(self, "config", None) or {}
+        if config.get("persistent_shell") and not long_running:
+            out = self._session_shell(
+                args, _base_args, check_status, timeout, pretty_print
+            )
+            if out is not None:
+                if print_output:
+                    LOG.debug(out[0])
+                return out
+
         cmd = deepcopy(BASE_CMD)
 
-        if base_cmd_args:
-            cmd.append(config_dict_to_string(base_cmd_args))
+        if _base_args:
+            cmd.append(_base_args)
 
         cmd.append("--")
         cmd.extend(args)
@@ -63,3 +293,77 @@ class ShellMixin:
             if print_output:
                 LOG.debug(out[0])
         return out
+
+    def _session_shell(
+        self: CephAdmProtocol,
+        args: List[str],
+        base_cmd_args: str,
+        check_status: bool,
+        timeout: int,
+        pretty_print: bool,
+    ):
+        """Execute the command using the persistent shell session.
+
+        Returns:
+            out (Str), err (Str) or None when the one-shot invocation must be used.
+        """
+        node = self.installer.node
+        session = get_shell_session(node, base_cmd_args)
+        if session.broken or not session.lock.acquire(blocking=False):
+            return None
+
+        cmd = " ".join(args)
+        out, err, rc, _time = "", "", None, 0
+        try:
+            if not session.active:
+                session.open()
+
+            LOG.info(
+                "Execute %s on %s [%s] using cephadm shell session",
+                cmd,
+                node.hostname,
+                node.ip_address,
+            )
+            notify_command_observers(node, cmd)
+            out, err, rc, _time = session.run(cmd, timeout=timeout)
+        except ShellSessionError as e:
+            LOG.warning(f"{e}. Falling back to one-shot cephadm shell invocation.")
+            session.broken = True
+            session.close()
+            return None
+        finally:
+            session.lock.release()
+            notify_command_observers(node, cmd)
+            if rc is not None:
+                profiler.record(
+                    node.hostname,
+                    cmd,
+                    _time,
+                    len(cmd.encode()),
+                    len(out.encode()) + len(err.encode()),
+                    rc,
+                    source="shell-session",
+                )
+
+        LOG.info(
+            "Execution of %s took %s seconds on %s using cephadm shell session",
+            cmd,
+            str(_time),
+            node.hostname,
+        )
+        if pretty_print:
+            msg = f"\nCommand:    {cmd}"
+            msg += f"\nDuration:   {_time} seconds"
+            msg += f"\nExit Code:  {rc}"
+            if out:
+                msg += f"\nStdout:     {out}"
+            if err:
+                msg += f"\nStderr:      {err}"
+            LOG.info(msg)
+
+        if check_status and rc != 0:
+            raise CommandFailed(
+                f"{cmd} returned {err} and code {rc} on {node.hostname} [{node.ip_address}]"
+            )
+
+        return out, err
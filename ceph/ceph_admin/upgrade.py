@@ -1,15 +1,13 @@
 """Module that interfaces with ceph orch upgrade CLI."""
 
-from datetime import datetime, timedelta
 from json import JSONDecodeError, loads
-from time import sleep
 from typing import Dict
 
 from looseversion import LooseVersion
 from packaging.version import Version
 
 from ceph.ceph import CommandFailed
-from ceph.waiter import WaitUntil
+from ceph.waiter import ADAPTIVE, WaitUntil
 from utility.log import Log
 
 from ..utils import get_daemon_versions
@@ -201,11 +199,10 @@ class UpgradeMixin:
             timeout (int):  Timeout in seconds (default:3600)
 
         """
-        interval = 7  # ceph orch down while upgrading mgr daemon BZ2313471
-        end_time = datetime.now() + timedelta(seconds=timeout)
-
-        while end_time > datetime.now():
-            sleep(interval)
+        # ceph orch down while upgrading mgr daemon BZ2313471
+        for w in WaitUntil(
+            timeout=timeout, interval=7, name="upgrade status", **ADAPTIVE
+        ):
             out = self.upgrade_status()
 
             if not out["in_progress"]:
@@ -213,5 +210,6 @@ class UpgradeMixin:
                 break
 
             LOG.info("Status : %s" % out)
-        else:
+
+        if w.expired:
             raise UpgradeFailure("Upgrade did not complete or failed")
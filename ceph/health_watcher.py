@@ -0,0 +1,446 @@
+"""
+Streaming watcher of the cluster health.
+
+The health checks used to poll ``ceph -s`` or ``ceph health`` on a timer. The
+watcher keeps a single ``ceph -w`` stream open per cluster, parses the health
+and PG state transitions of the cluster log into an in-memory state along with
+a timeline of the events, and wakes up the waiters as soon as an event changes
+the state.
+
+The timeline of every watcher is written as an artifact of the test by
+flush_timelines, next to the command profile of the test.
+
+``ceph -w -f json`` prints the status of the cluster once as a JSON document
+when it connects, the cluster log lines that follow are always plain text.
+Hence only the first JSON document of a stream seeds the state, the later
+transitions are parsed from the log lines.
+
+Usage:
+    watcher = watch_cluster(client_node)
+    if not watcher.wait_for(pgs_active_clean(), timeout=600):
+        raise Exception("PGs are not active+clean")
+
+    # From a coroutine
+    await watcher.await_for(check_cleared("OSD_DOWN"), timeout=300)
+"""
+
+import asyncio
+import json
+import re
+import threading
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from time import monotonic
+from typing import Dict, Optional
+
+from ceph.ssh_pool import backoff_delays
+from utility.log import Log
+
+log = Log(__name__)
+
+HEALTH_OK = "HEALTH_OK"
+HEALTH_WARN = "HEALTH_WARN"
+HEALTH_ERR = "HEALTH_ERR"
+
+_LOG_LINE = re.compile(r"\[(?P<level>DBG|INF|WRN|ERR|SEC)\]\s+(?P<msg>.*)$")
+_CHECK_RAISED = re.compile(
+    r"Health check (?P<op>failed|update): (?P<summary>.*) \((?P<name>[A-Z0-9_]+)\)$"
+)
+_CHECK_CLEARED = re.compile(
+    r"Health check cleared: (?P<name>[A-Z0-9_]+) \(was: (?P<summary>.*)\)$"
+)
+_OVERALL = re.compile(r"overall (?P<status>HEALTH_[A-Z]+)")
+_PGMAP = re.compile(r"pgmap v\d+: (?P<total>\d+) pgs: (?P<states>[^;]+)")
+_DEGRADED = re.compile(r"(?P<count>\d+)/\d+ objects degraded")
+
+
+@dataclass
+class HealthEvent:
+    """A transition of the cluster health or of the PG states."""
+
+    time: str
+    kind: str
+    name: str = ""
+    detail: str = ""
+    status: str = ""
+
+
+@dataclass
+class HealthState:
+    """Last known health of the cluster."""
+
+    status: Optional[str] = None
+    checks: Dict[str, str] = field(default_factory=dict)
+    severities: Dict[str, str] = field(default_factory=dict)
+    pgs: Dict[str, int] = field(default_factory=dict)
+    num_pgs: int = 0
+    degraded_objects: int = 0
+
+    def derive_status(self):
+        if any(s == HEALTH_ERR for s in self.severities.values()):
+            self.status = HEALTH_ERR
+        elif self.checks:
+            self.status = HEALTH_WARN
+        else:
+            self.status = HEALTH_OK
+
+
+def health_is(status=HEALTH_OK):
+    """Predicate of the overall health status."""
+    return lambda state: state.status == status
+
+
+def check_raised(name):
+    """Predicate of the given health check being raised e.g. OSD_DOWN."""
+    return lambda state: name in state.checks
+
+
+def check_cleared(name):
+    """Predicate of the given health check being cleared."""
+    return lambda state: state.status is not None and name not in state.checks
+
+
+def no_degraded_pgs():
+    """Predicate of no PG in a degraded state."""
+    return lambda state: bool(state.pgs) and not any(
+        "degraded" in pg_state for pg_state in state.pgs
+    )
+
+
+def pgs_active_clean():
+    """Predicate of all the PGs being active+clean, scrubbing is tolerated."""
+
+    def _clean(state):
+        clean = sum(
+            count
+            for pg_state, count in state.pgs.items()
+            if pg_state == "active+clean" or pg_state.startswith("active+clean+")
+        )
+        return state.num_pgs > 0 and clean == state.num_pgs
+
+    return _clean
+
+
+def _parse_pg_states(text):
+    states = dict()
+    for item in text.split(","):
+        count, _, pg_state = item.strip().partition(" ")
+        if count.isdigit() and pg_state:
+            states[pg_state.strip()] = int(count)
+    return states
+
+
+class ClusterWatcher(object):
+    """Keeps a ceph -w stream of the cluster open and tracks its health."""
+
+    def __init__(self, node, cluster_name=None, cephadm=False):
+        """
+        Args:
+            node (CephNode): node with the ceph admin keyring
+            cluster_name (str): name of the cluster, the default one if None
+            cephadm (bool): execute the stream from a cephadm shell
+        """
+        self.node = node
+        self.cluster_name = cluster_name
+        cmd = "ceph -w -f json --watch-debug"
+        if cluster_name:
+            cmd += f" --cluster {cluster_name}"
+        self.cmd = f"cephadm shell -- {cmd}" if cephadm else cmd
+        self.state = HealthState()
+        self.timeline = list()
+        self.connected = False
+        self.seeded = False
+        self._flushed = 0
+        self._cond = threading.Condition()
+        self._stopped = threading.Event()
+        self._channel = None
+        self._thread = None
+
+    @property
+    def alive(self):
+        return bool(self._thread and self._thread.is_alive() and self.connected)
+
+    def start(self):
+        """Starts streaming the cluster log in the background."""
+        if self._thread and self._thread.is_alive():
+            return self
+
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"ceph-w-{self.node.hostname}", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Closes the stream and waits for the reader to end."""
+        self._stopped.set()
+        channel = self._channel
+        if channel is not None:
+            try:
+                channel.close()
+            except Exception:
+                pass
+        if self._thread:
+            self._thread.join(timeout=10)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _run(self):
+        delays = backoff_delays()
+        while not self._stopped.is_set():
+            try:
+                self._stream()
+            except Exception as err:
+                log.debug(f"ceph -w stream of {self.node.hostname} ended: {err}")
+
+            with self._cond:
+                self.connected = False
+            if self._stopped.wait(next(delays)):
+                break
+
+    def _stream(self):
+        with self.node.root_connection.pool.session() as channel:
+            self._channel = channel
+            with self._cond:
+                self.seeded = False
+            try:
+                # The remote ceph -w is hung up along with the pty on close
+                channel.get_pty()
+                channel.exec_command(self.cmd)
+                for line in channel.makefile("r"):
+                    if self._stopped.is_set():
+                        break
+                    self.feed(line)
+            finally:
+                self._channel = None
+
+    def _event(self, kind, name="", detail=""):
+        event = HealthEvent(
+            time=datetime.now().isoformat(),
+            kind=kind,
+            name=name,
+            detail=detail,
+            status=self.state.status or "",
+        )
+        self.timeline.append(event)
+        log.debug(f"{self.node.hostname} {kind} {name} {detail} {event.status}")
+
+    def feed(self, line):
+        """Updates the state from a line of the stream and wakes up the waiters."""
+        line = line.strip()
+        if not line:
+            return
+
+        with self._cond:
+            self.connected = True
+            if not self.seeded and line.startswith("{"):
+                self.seeded = self._status_document(line)
+            else:
+                match = _LOG_LINE.search(line)
+                if match:
+                    self._log_message(match.group("level"), match.group("msg"))
+            self._cond.notify_all()
+
+    def _status_document(self, line):
+        try:
+            status = json.loads(line)
+        except ValueError:
+            return False
+
+        state = self.state
+        health = status.get("health", {})
+        checks = health.get("checks", {})
+        state.checks = {
+            name: check.get("summary", {}).get("message", "")
+            for name, check in checks.items()
+        }
+        state.severities = {
+            name: check.get("severity", "") for name, check in checks.items()
+        }
+        state.status = health.get("status") or health.get("overall_status")
+
+        pgmap = status.get("pgmap", {})
+        state.pgs = {s["state_name"]: s["count"] for s in pgmap.get("pgs_by_state", [])}
+        state.num_pgs = pgmap.get("num_pgs", sum(state.pgs.values()))
+        state.degraded_objects = pgmap.get("degraded_objects", 0)
+        self._event("status", detail=", ".join(sorted(state.checks)))
+        return True
+
+    def _log_message(self, level, msg):
+        state = self.state
+        match = _CHECK_RAISED.search(msg)
+        if match:
+            name = match.group("name")
+            state.checks[name] = match.group("summary")
+            state.severities[name] = HEALTH_ERR if level == "ERR" else HEALTH_WARN
+            state.derive_status()
+            self._event(
+                "check_raised" if match.group("op") == "failed" else "check_updated",
+                name,
+                match.group("summary"),
+            )
+            return
+
+        match = _CHECK_CLEARED.search(msg)
+        if match:
+            name = match.group("name")
+            state.checks.pop(name, None)
+            state.severities.pop(name, None)
+            state.derive_status()
+            self._event("check_cleared", name, match.group("summary"))
+            return
+
+        if msg.startswith("Cluster is now healthy"):
+            state.checks.clear()
+            state.severities.clear()
+            state.status = HEALTH_OK
+            self._event("status", detail=msg)
+            return
+
+        match = _OVERALL.search(msg)
+        if match:
+            if match.group("status") != state.status:
+                state.status = match.group("status")
+                self._event("status", detail=msg)
+            return
+
+        match = _PGMAP.search(msg)
+        if match:
+            pgs = _parse_pg_states(match.group("states"))
+            degraded = _DEGRADED.search(msg)
+            state.degraded_objects = int(degraded.group("count")) if degraded else 0
+            state.num_pgs = int(match.group("total"))
+            if pgs != state.pgs:
+                state.pgs = pgs
+                detail = ", ".join(f"{c} {s}" for s, c in sorted(pgs.items()))
+                self._event("pg_states", detail=detail)
+
+    def wait_for(self, predicate, timeout=300):
+        """Blocks until the predicate holds for the state of the cluster.
+
+        Args:
+            predicate (callable): called with the HealthState on every change
+            timeout (int): maximum time to wait in seconds
+
+        Returns:
+            True when the predicate holds, False on timeout
+        """
+        deadline = monotonic() + timeout
+        with self._cond:
+            while not predicate(self.state):
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    async def await_for(self, predicate, timeout=300):
+        """Awaitable version of wait_for."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.wait_for, predicate, timeout)
+
+    def summary(self):
+        """Returns the current health and PG states as a single line."""
+        with self._cond:
+            pgs = ", ".join(f"{c} {s}" for s, c in sorted(self.state.pgs.items()))
+            return (
+                f"{self.state.status} checks: {sorted(self.state.checks) or '-'} "
+                f"pgs: {pgs or '-'}"
+            )
+
+    def events(self, since=0):
+        """Returns the events of the timeline from the given index as dicts."""
+        with self._cond:
+            return [asdict(e) for e in self.timeline[since:]]
+
+    def dump(self, path, since=0):
+        """Writes the timeline to the given file as json."""
+        events = self.events(since)
+        with open(path, "w") as fh:
+            json.dump(
+                {
+                    "node": self.node.hostname,
+                    "cluster": self.cluster_name,
+                    "events": events,
+                },
+                fh,
+                indent=2,
+            )
+        return len(events)
+
+
+_watchers = dict()
+_watchers_lock = threading.Lock()
+
+
+def watch_cluster(node, cluster_name=None, cephadm=False):
+    """Returns the running watcher of the node, started if needed."""
+    key = (node.ip_address, cluster_name)
+    with _watchers_lock:
+        watcher = _watchers.get(key)
+        if watcher is None:
+            watcher = _watchers[key] = ClusterWatcher(node, cluster_name, cephadm)
+        return watcher.start()
+
+
+def find_watcher(nodes, cluster_name=None):
+    """Returns a streaming watcher of any of the nodes, None otherwise."""
+    addresses = {getattr(node, "ip_address", None) for node in nodes}
+    with _watchers_lock:
+        for (address, name), watcher in _watchers.items():
+            if address in addresses and name == cluster_name and watcher.alive:
+                return watcher
+    return None
+
+
+def flush_timelines(path_prefix):
+    """Writes the events recorded since the last flush of every watcher.
+
+    Args:
+        path_prefix (str): path of the artifact without extension, the events
+                           are written to <prefix>.health.json
+
+    Returns:
+        number of events written
+    """
+    with _watchers_lock:
+        watchers = list(_watchers.values())
+
+    timelines = list()
+    for watcher in watchers:
+        with watcher._cond:
+            since, watcher._flushed = watcher._flushed, len(watcher.timeline)
+        events = watcher.events(since)
+        if events:
+            timelines.append(
+                {
+                    "node": watcher.node.hostname,
+                    "cluster": watcher.cluster_name,
+                    "events": events,
+                }
+            )
+
+    if not timelines:
+        return 0
+
+    try:
+        with open(f"{path_prefix}.health.json", "w") as fh:
+            json.dump(timelines, fh, indent=2)
+    except OSError as err:
+        log.warning(f"Unable to write health timeline {path_prefix}: {err}")
+    return sum(len(t["events"]) for t in timelines)
+
+
+def stop_watchers():
+    """Stops all the watchers."""
+    with _watchers_lock:
+        watchers = list(_watchers.values())
+        _watchers.clear()
+
+    for watcher in watchers:
+        watcher.stop()
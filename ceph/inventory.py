@@ -0,0 +1,166 @@
+"""
+Cluster inventory of the ceph daemon versions and metadata.
+
+Collecting the versions used to take a command per container on every node,
+executed serially. The inventory asks the orchestrator for all the daemons and
+their versions in a single ``ceph orch ps`` call. Clusters without the
+orchestrator e.g. ceph-ansible deployments fall back to a single batched
+script per node, executed on all the nodes concurrently.
+
+The outputs of the queries are cached for the run and shared by
+ceph.utils.get_ceph_versions, get_daemon_versions and get_daemon_metadata. Like
+the RadosOrchestrator query cache, the entries are dropped as soon as any
+command which could modify the cluster state is executed.
+
+Usage:
+    versions = get_ceph_versions(ceph_cluster.get_nodes())
+    daemons = get_daemons(installer)
+"""
+
+import json
+import shlex
+
+from ceph.ceph import CommandFailed
+from ceph.parallel import parallel
+from ceph.rados.query_cache import QueryCache, normalize
+from utility.log import Log
+
+log = Log(__name__)
+
+INVENTORY_TTL = 30
+METADATA_TTL = 60
+
+# Roles of the nodes on which ceph commands are not supported
+SKIP_ROLES = ("client", "grafana")
+SKIP_CONTAINERS = ("node-exporter",)
+
+inventory_cache = QueryCache()
+
+# Prints "<container>\t<ceph --version>" of every ceph container of the node
+CONTAINER_VERSIONS_SCRIPT = (
+    "cli=$(command -v podman || command -v docker) || exit 1; "
+    "for c in $($cli ps --format '{{{{.Names}}}}'); do "
+    'case " {skip} " in *" $c "*) continue;; esac; '
+    "v=$($cli exec $c ceph --version 2>/dev/null | head -1); "
+    '[ -n "$v" ] && printf "%s\\t%s\\n" "$c" "$v"; '
+    "done; true"
+)
+
+
+def query(node, cmd, ttl=INVENTORY_TTL):
+    """Returns the output of the command, served from the cache when possible.
+
+    Args:
+        node: CephNode the command is executed on
+        cmd (str): read-only command
+        ttl (int): time to live of the output in seconds
+    """
+    key = (node.ip_address, normalize(cmd))
+    hit, out = inventory_cache.get(key)
+    if hit:
+        return out
+
+    out, _ = node.exec_command(sudo=True, cmd=cmd)
+    inventory_cache.put(key, out, ttl)
+    return out
+
+
+def get_versions(node):
+    """Returns the output of ceph versions as a dict."""
+    return json.loads(query(node, "cephadm shell -- ceph versions -f json"))
+
+
+def get_daemons(node):
+    """Returns the daemons reported by the orchestrator along with their versions."""
+    return json.loads(query(node, "cephadm shell -- ceph orch ps -f json"))
+
+
+def get_metadata(node, daemon_type, daemon_id=None):
+    """Returns the output of ceph <daemon_type> metadata [<daemon_id>]."""
+    cmd = f"cephadm shell -- ceph {daemon_type} metadata"
+    if daemon_id is not None:
+        cmd += f" {daemon_id}"
+    return query(node, cmd, METADATA_TTL)
+
+
+def _daemon_versions(node):
+    """Returns the version of every daemon from a single orchestrator query."""
+    versions = dict()
+    for daemon in get_daemons(node):
+        name = daemon.get("daemon_name") or (
+            f"{daemon['daemon_type']}.{daemon['daemon_id']}"
+        )
+        if daemon.get("version"):
+            versions[name] = f"ceph version {daemon['version']}"
+    return versions
+
+
+def _node_versions(node, containerized):
+    """Returns the versions of the node, or of its containers, in one command."""
+    if node.role == "installer":
+        if node.pkg_type == "rpm":
+            out, _ = node.exec_command(cmd="rpm -qa | grep ceph-ansible")
+        else:
+            out, _ = node.exec_command(cmd="dpkg -s ceph-ansible")
+        return {node.shortname: out.rstrip()}
+
+    if not containerized:
+        out, _ = node.exec_command(cmd="ceph --version")
+        return {node.shortname: out.rstrip()}
+
+    if node.role in SKIP_ROLES:
+        return dict()
+
+    script = CONTAINER_VERSIONS_SCRIPT.format(skip=" ".join(SKIP_CONTAINERS))
+    out, _ = node.exec_command(sudo=True, cmd=f"bash -c {shlex.quote(script)}")
+    versions = dict()
+    for line in out.splitlines():
+        name, _, version = line.partition("\t")
+        if version:
+            versions[name] = version.rstrip()
+    return versions
+
+
+def _safe_node_versions(node, containerized):
+    try:
+        return _node_versions(node, containerized)
+    except CommandFailed:
+        log.info("No ceph versions on {}".format(node.shortname))
+        return dict()
+
+
+def get_ceph_versions(ceph_nodes, containerized=False, use_orchestrator=True):
+    """Returns the ceph or ceph-ansible versions of the nodes or the daemons.
+
+    The versions of the daemons are retrieved from the orchestrator when it is
+    available, otherwise a single command per node is executed concurrently.
+
+    Args:
+        ceph_nodes: nodes in the cluster
+        containerized: is the cluster containerized or not
+        use_orchestrator: query the orchestrator of the cluster first
+
+    Returns:
+        A dict of the name / version pair for each node or container in the cluster
+    """
+    installers = [n for n in ceph_nodes if n.role == "installer"]
+    nodes = [n for n in ceph_nodes if n.role != "installer"]
+    versions = dict()
+
+    if use_orchestrator and installers:
+        try:
+            versions.update(_daemon_versions(installers[0]))
+            nodes = []
+        except (CommandFailed, ValueError, KeyError) as err:
+            log.debug(f"Orchestrator inventory not available, {err}")
+
+    with parallel() as p:
+        for node in installers + nodes:
+            p.spawn(_safe_node_versions, node, containerized)
+
+    for result in p.results:
+        versions.update(result)
+
+    for name, version in sorted(versions.items()):
+        log.info(f"{name}: {version}")
+    return versions
@@ -1,6 +1,7 @@
 import re
 
 from ceph.ceph_admin.common import config_dict_to_string
+from ceph.nvmeof.cli.v2.bulk import BulkProvisioner
 from ceph.nvmeof.cli.v2.common import substitute_keys
 from utility.log import Log
 
@@ -56,8 +57,14 @@ class BaseCLI:
         return self.ceph_version
 
     @substitute_keys(KEY_MAP)
-    def run_nvme_cli(self, entity, action, **kwargs):
-        LOG.info(f"NVMeoF command - {entity} {action}")
+    def build_nvme_cli_cmd(self, entity, action, **kwargs):
+        """Returns the NVMe CLI command for the entity action.
+
+        Args:
+            entity: NVMeoF entity i.e. subsystem, ns, host, listener
+            action: action on the entity
+            kwargs: command arguments (args) and base command arguments (base_cmd_args)
+        """
         base_cmd_args = kwargs.get("base_cmd_args", {})
 
         # TODO: Currently mtls is not supported in Ceph NVMe CLI(Tentacle).
@@ -79,7 +86,7 @@ class BaseCLI:
             else:
                 cmd_args["traddr"] = self.node.ip_address
 
-        command = [
+        return [
             self.BASE_CMD,
             self.__local_mtls_cert_path(),
             entity,
@@ -87,5 +94,17 @@ class BaseCLI:
             config_dict_to_string(cmd_args),
             config_dict_to_string(base_cmd_args),
         ]
+
+    def run_nvme_cli(self, entity, action, **kwargs):
+        LOG.info(f"NVMeoF command - {entity} {action}")
+        command = self.build_nvme_cli_cmd(entity, action, **kwargs)
         out, err = self.shell(args=command, pretty_print=True)
         return out, err
+
+    def bulk(self, **kwargs):
+        """Returns a provisioner running many NVMe CLI commands per cephadm shell.
+
+        Args:
+            kwargs: BulkProvisioner arguments i.e. concurrency, batch_size, timeout
+        """
+        return BulkProvisioner(self, **kwargs)
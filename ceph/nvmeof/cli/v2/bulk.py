@@ -0,0 +1,225 @@
+"""Bulk provisioning of the NVMeoF gateway entities.
+
+Every NVMe CLI command executed by BaseCLI.run_nvme_cli starts a cephadm shell
+container, hence provisioning thousands of namespaces, hosts or listeners is
+bound by the container start up time. BulkProvisioner queues the commands and
+executes a batch of them within a single cephadm shell invocation, running up
+to ``concurrency`` commands at a time. The output, error and exit code of every
+command are returned separately along with the throughput of the run.
+
+Example::
+
+    with gateway.bulk(concurrency=32) as bulk:
+        for num in range(1024):
+            bulk.add(
+                "ns",
+                "add",
+                pre_cmd=f"rbd create rbd/image{num} --size 1G",
+                args={"subsystem": nqn, "rbd-pool": "rbd", "rbd-image": f"image{num}"},
+            )
+    bulk.raise_on_error()
+    LOG.info(bulk.summary())
+"""
+
+import base64
+import shlex
+from collections import namedtuple
+from time import time
+from uuid import uuid4
+
+from utility.log import Log
+
+LOG = Log(__name__)
+
+BulkResult = namedtuple("BulkResult", ["cmd", "out", "err", "rc"])
+BULK_MARKER = "__CEPHCI_NVMEOF__"
+
+DEFAULT_CONCURRENCY = 16
+DEFAULT_BATCH_SIZE = 256
+
+# The script is passed as a single argument, which is limited to 128KiB
+MAX_SCRIPT_SIZE = 96 * 1024
+
+
+class BulkProvisioningError(Exception):
+    """Raised when any of the bulk provisioning commands failed."""
+
+    pass
+
+
+class BulkProvisioner:
+    """Batches of NVMe CLI commands executed within one cephadm shell."""
+
+    def __init__(
+        self,
+        base,
+        concurrency=DEFAULT_CONCURRENCY,
+        batch_size=DEFAULT_BATCH_SIZE,
+        timeout=3600,
+    ):
+        """
+        Args:
+            base: BaseCLI object of the gateway
+            concurrency: maximum number of commands executed at a time
+            batch_size: number of commands executed per cephadm shell invocation
+            timeout: maximum time allowed for executing a batch of commands
+        """
+        self.base = base
+        self.concurrency = max(int(concurrency), 1)
+        self.batch_size = max(int(batch_size), 1)
+        self.timeout = timeout
+        self.queue = []
+        self.results = []
+        self.elapsed = 0.0
+        self._size = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None and self.queue:
+            self.execute()
+        return False
+
+    def add(self, entity, action, pre_cmd=None, **kwargs):
+        """Queue the NVMe CLI command of the entity action.
+
+        Args:
+            entity: NVMeoF entity i.e. subsystem, ns, host, listener
+            action: action on the entity
+            pre_cmd: command to be executed before e.g. creating the rbd image
+            kwargs: command arguments (args) and base command arguments (base_cmd_args)
+
+        Returns:
+            index of the result of the command in the results
+        """
+        cmd = " ".join(self.base.build_nvme_cli_cmd(entity, action, **kwargs))
+        if pre_cmd:
+            cmd = f"{pre_cmd} && {cmd}"
+        return self.add_command(cmd)
+
+    def add_command(self, cmd):
+        """Queue a command to be executed within the cephadm shell.
+
+        The queued commands are executed once the batch is full.
+
+        Args:
+            cmd: command to be executed
+
+        Returns:
+            index of the result of the command in the results
+        """
+        idx = len(self.results) + len(self.queue)
+        self.queue.append(cmd)
+        self._size += len(cmd) + 64
+        if len(self.queue) >= self.batch_size or self._size >= MAX_SCRIPT_SIZE:
+            self.execute()
+        return idx
+
+    def _script(self, token):
+        """Returns the script executing the queued commands concurrently."""
+        script = [
+            "d=$(mktemp -d); trap 'rm -rf $d' EXIT",
+            'run(){ ( eval "$2" ) </dev/null >$d/$1.o 2>$d/$1.e; echo $? >$d/$1.rc; }',
+        ]
+        for idx, cmd in enumerate(self.queue):
+            script.append(f"run {idx} {shlex.quote(cmd)} &")
+            script.append(f"[ $(jobs -rp | wc -l) -lt {self.concurrency} ] || wait -n")
+
+        script.extend(
+            [
+                "wait",
+                f"for i in $(seq 0 {len(self.queue) - 1}); do "
+                f"echo {BULK_MARKER}{token} $i; "
+                "base64 -w0 $d/$i.o; echo; base64 -w0 $d/$i.e; echo; "
+                f'echo {BULK_MARKER}{token} $i "$(cat $d/$i.rc)"; done',
+            ]
+        )
+        return "\n".join(script)
+
+    @staticmethod
+    def _parse(out, token):
+        """Returns the stdout, stderr and exit code of the commands by index."""
+        lines, results = out.splitlines(), {}
+        marker = f"{BULK_MARKER}{token} "
+        for num, line in enumerate(lines):
+            if not line.startswith(marker):
+                continue
+
+            fields = line[len(marker) :].split()
+            if len(fields) != 2:
+                continue
+
+            idx, rc = int(fields[0]), int(fields[1])
+            _out, _err = lines[num - 2 : num]
+            results[idx] = (
+                base64.b64decode(_out).decode("utf-8", errors="replace"),
+                base64.b64decode(_err).decode("utf-8", errors="replace"),
+                rc,
+            )
+
+        return results
+
+    def execute(self):
+        """Runs the queued commands within a single cephadm shell invocation.
+
+        Returns:
+            list of BulkResult of the executed commands
+        """
+        if not self.queue:
+            return []
+
+        token = uuid4().hex
+        script = self._script(token)
+        LOG.info(
+            f"Executing {len(self.queue)} NVMe CLI commands with concurrency "
+            f"{self.concurrency} on {self.base.node.hostname}"
+        )
+        _start = time()
+        out, _ = self.base.shell(
+            args=["bash", "-c", shlex.quote(script)],
+            check_status=False,
+            timeout=self.timeout,
+            print_output=False,
+        )
+        self.elapsed += time() - _start
+        parsed = self._parse(out or "", token)
+
+        batch = []
+        for idx, cmd in enumerate(self.queue):
+            # rc is None when the command did not complete within the batch
+            _out, _err, rc = parsed.get(idx, ("", "", None))
+            if rc != 0:
+                LOG.error(f"{cmd} failed with {rc}: {_err}")
+            batch.append(BulkResult(cmd, _out, _err, rc))
+
+        self.queue = []
+        self._size = 0
+        self.results.extend(batch)
+        LOG.info(self.summary())
+        return batch
+
+    @property
+    def failures(self):
+        """Returns the results of the failed commands."""
+        return [result for result in self.results if result.rc != 0]
+
+    def raise_on_error(self):
+        """Raises BulkProvisioningError if any of the commands failed."""
+        failures = self.failures
+        if failures:
+            details = "\n".join(
+                f"{r.cmd}: {r.rc} {r.err.strip()}" for r in failures[:5]
+            )
+            raise BulkProvisioningError(
+                f"{len(failures)} of {len(self.results)} NVMe CLI commands failed\n{details}"
+            )
+
+    def summary(self):
+        """Returns the throughput summary of the executed commands."""
+        elapsed = self.elapsed or 1e-9
+        return (
+            f"{len(self.results)} NVMe CLI commands in {self.elapsed:.2f}s: "
+            f"{len(self.results) / elapsed:.1f} commands/s, "
+            f"{len(self.failures)} failed, concurrency {self.concurrency}"
+        )
@@ -47,16 +47,50 @@ when iterating over the results, or when the with block ends.
 When the scope of with block changes, the main thread waits until all
 spawned functions have completed within the given timeout. On timeout,
 all pending threads/processes are issued shutdown command.
+
+With fail_fast enabled, the first failure is raised as soon as it happens and
+the pending tasks are cancelled instead of waiting for the siblings::
+
+    with parallel(fail_fast=True) as p:
+        for node in nodes:
+            p.spawn(quux, node)
+
+Results can be consumed as and when the tasks complete::
+
+    with parallel() as p:
+        for node in nodes:
+            p.spawn(quux, node)
+        for result in p.as_completed():
+            print result
+
+The time taken by every task is available via the stats property.
 """
 
 import logging
-from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
-from datetime import datetime, timedelta
-from time import sleep
+from concurrent.futures import (
+    ALL_COMPLETED,
+    FIRST_EXCEPTION,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from concurrent.futures import as_completed as _as_completed
+from concurrent.futures import wait
+from time import monotonic
+
+from utility.log import clear_thread_test, get_thread_test, set_thread_test
 
 logger = logging.getLogger(__name__)
 
 
+def _run_as(test_name, fun, *args, **kwargs):
+    """Executes the function with the thread associated to the given test."""
+    set_thread_test(test_name)
+    try:
+        return fun(*args, **kwargs)
+    finally:
+        clear_thread_test()
+
+
 class parallel:
     """This class is a context manager for concurrent method execution."""
 
@@ -66,6 +100,7 @@ class parallel:
         timeout=None,
         shutdown_cancel_pending=False,
         max_workers=None,
+        fail_fast=False,
     ):
         """Object initialization method.
 
@@ -73,15 +108,22 @@ class parallel:
             thread_pool (bool)          Whether to use threads or processes.
             timeout (int | float)       Maximum allowed time.
             shutdown_cancel_pending (bool) If enabled, it would cancel pending tasks.
+            max_workers (int)           Maximum number of workers.
+            fail_fast (bool)            Raise the first failure without waiting
+                                        for the other tasks and cancel the
+                                        pending ones.
         """
+        self._thread_pool = thread_pool
         if thread_pool:
             self._executor = ThreadPoolExecutor(max_workers=max_workers)
         else:
             self._executor = ProcessPoolExecutor(max_workers=max_workers)
         self._timeout = timeout
         self._cancel_pending = shutdown_cancel_pending
+        self._fail_fast = fail_fast
         self._futures = list()
         self._results = list()
+        self._stats = dict()
         self._iter_index = 0
 
     @property
@@ -92,6 +134,40 @@ class parallel:
     def results(self):
         return self._results
 
+    @property
+    def stats(self):
+        """Returns the timing details of the spawned tasks in submission order.
+
+        Each entry holds the name of the function, the time taken from
+        submission to completion in seconds and the state of the task.
+        """
+        _stats = list()
+        for _f in self._futures:
+            _name, _start, _end = self._stats[_f]
+            if _f.cancelled():
+                _state = "cancelled"
+            elif not _f.done():
+                _state = "running"
+            elif _f.exception() is not None:
+                _state = "failed"
+            else:
+                _state = "passed"
+
+            _stats.append(
+                {
+                    "name": _name,
+                    "duration": (_end or monotonic()) - _start,
+                    "state": _state,
+                }
+            )
+
+        return _stats
+
+    def _task_done(self, future):
+        """Records the completion time of the task."""
+        _name, _start, _ = self._stats[future]
+        self._stats[future] = (_name, _start, monotonic())
+
     def spawn(self, fun, *args, **kwargs):
         """Triggers the first class method.
 
@@ -103,37 +179,68 @@ class parallel:
         Returns:
             None
         """
-        _future = self._executor.submit(fun, *args, **kwargs)
+        _name = getattr(fun, "__name__", str(fun))
+        _test = get_thread_test() if self._thread_pool else None
+        if _test:
+            # Route the logs of the worker thread to the spawning test
+            _future = self._executor.submit(_run_as, _test, fun, *args, **kwargs)
+        else:
+            _future = self._executor.submit(fun, *args, **kwargs)
+        self._stats[_future] = (_name, monotonic(), None)
         self._futures.append(_future)
+        _future.add_done_callback(self._task_done)
+
+    def as_completed(self):
+        """Yields the results of the spawned tasks as and when they complete.
+
+        Like the iterator, an exception raised by a task is returned in place
+        of its result.
+        """
+        _timeout = self._timeout if self._timeout else 3600
+        for _f in _as_completed(self._futures, timeout=_timeout):
+            try:
+                yield _f.result()
+            except Exception as e:
+                logger.exception(e)
+                yield e
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_value, trackback):
-        _not_done = self._futures[:]
-        _end_time = datetime.now() + timedelta(
-            seconds=self._timeout if self._timeout else 3600
-        )
+        _timeout = self._timeout if self._timeout else 3600
+        _return_when = FIRST_EXCEPTION if self._fail_fast else ALL_COMPLETED
 
         # Wait for all futures to complete within the given time or 1 hour.
-        while datetime.now() < _end_time:
-            # if the list is empty break
-            if len(_not_done) == 0:
-                break
-
-            sleep(2.0)
+        # In fail fast mode, the wait ends as soon as a task fails.
+        _, _not_done = wait(self._futures, timeout=_timeout, return_when=_return_when)
+
+        _failed = [
+            _f
+            for _f in self._futures
+            if _f.done() and not _f.cancelled() and _f.exception() is not None
+        ]
+        if self._fail_fast and _failed and _not_done:
+            logger.error(
+                "A task failed, cancelling %d pending task(s).", len(_not_done)
+            )
             for _f in _not_done:
-                if _f.done():
-                    _not_done.remove(_f)
-
-        # Graceful shutdown of running threads
-        if _not_done:
+                _f.cancel()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        elif _not_done:
+            # Graceful shutdown of running threads
             self._executor.shutdown(wait=False, cancel_futures=self._cancel_pending)
+        else:
+            self._executor.shutdown(wait=False)
 
         if exc_value is not None:
             logger.exception(trackback)
             return False
 
+        if self._fail_fast and _failed:
+            logger.error("Encountered an exception during parallel execution.")
+            raise _failed[0].exception()
+
         # Check for any exceptions and raise
         # At this point, all threads/processes should have completed or cancelled
         try:
@@ -24,6 +24,12 @@ from ceph.ceph import CommandFailed, SocketTimeoutException, TimeoutException
 from ceph.ceph_admin import CephAdmin
 from ceph.parallel import parallel
 from ceph.rados import utils as osd_utils
+from ceph.rados.query_cache import QueryCache, get_ttl
+from ceph.rados.rados_bench import (
+    DEFAULT_RESULTS_DB,
+    BenchResultStore,
+    parse_bench_output,
+)
 from tests.rados.rados_test_util import wait_for_device_rados
 from utility import utils
 from utility.log import Log
@@ -49,6 +55,8 @@ class RadosOrchestrator:
         self.ceph_cluster = node.cluster
         self.client = node.cluster.get_nodes(role="client")[0]
         self.rhbuild = node.config.get("rhbuild")
+        self.query_cache = QueryCache(enabled=node.config.get("query_cache", True))
+        self.last_bench_result = None
 
     def change_recovery_flags(self, action, flags: list = None):
         """Sets and unsets the recovery flags on the cluster
@@ -171,6 +179,10 @@ class RadosOrchestrator:
         """
         Runs ceph commands with json tag for the action specified otherwise treats action as command
         and returns formatted output
+
+        The output of the cluster state queries like osd dump, osd tree, pool details and daemon
+        metadata is served from the query cache for a short duration. The cache is invalidated
+        when any command modifying the cluster state is executed.
         Args:
             print_output: bool to print output and error
             cmd: Command that needs to be run
@@ -180,6 +192,14 @@ class RadosOrchestrator:
         """
 
         cmd = f"{cmd} -f json"
+        ttl = None
+        if self.query_cache.enabled and not return_err:
+            ttl = get_ttl(cmd)
+        if ttl:
+            hit, status = self.query_cache.get(cmd)
+            if hit:
+                return status
+
         try:
             if client_exec:
                 out, err = self.client.exec_command(cmd=cmd, sudo=True, timeout=timeout)
@@ -191,6 +211,8 @@ class RadosOrchestrator:
         if out.isspace():
             return {}
         status = json.loads(out)
+        if ttl:
+            self.query_cache.put(cmd, status, ttl)
         if print_output:
             log.info("out: " + out + "\n")
             log.info("err: " + err + "\n")
@@ -266,9 +288,8 @@ class RadosOrchestrator:
         Collect the list of pools present on the cluster
         Returns: list of pool names
         """
-        cmd = "ceph df"
-        out = self.run_ceph_command(cmd=cmd)
-        return [entry["name"] for entry in out["pools"]]
+        cmd = "ceph osd pool ls"
+        return self.run_ceph_command(cmd=cmd)
 
     def get_pool_property(self, pool, props):
         """
@@ -447,7 +468,12 @@ class RadosOrchestrator:
                 - background (bool) -> run rados bench as background process and continue with test execution
                 - nocleanup (bool) -> if false, the nocleanup flag will not be added and the objects would be deleted
                 - timeout (int) -> user defined timeout for rados bench process
+                - record_results (dict) -> persist the parsed result to the results store
+                    keys: suite, build (default: ceph version of the cluster), pool_profile, cluster_shape
+                    (default: derived from the cluster), db (default: ~/.cephci/rados_bench.db)
         Returns: True -> pass, False -> fail
+
+        The parsed result of the run is available as self.last_bench_result
         """
         duration = kwargs.get("rados_write_duration", 200)
         byte_size = str(kwargs.get("byte_size", 4096)).upper()
@@ -471,9 +497,16 @@ class RadosOrchestrator:
         log.info(f"check_ec: {check_ec}")
 
         try:
-            self.client.exec_command(
+            out, _, _, _ = self.client.exec_command(
                 cmd=cmd, check_ec=check_ec, timeout=_timeout, verbose=True
             )
+            if not kwargs.get("background"):
+                self.last_bench_result = parse_bench_output(out, mode="write")
+                log.info(self.last_bench_result)
+                if kwargs.get("record_results"):
+                    self.record_bench_result(
+                        self.last_bench_result, pool_name, **kwargs["record_results"]
+                    )
             if max_objs and verify_stats:
                 exp_objs = org_objs + max_objs
                 assert self.verify_pool_stats(pool_name=pool_name, exp_objs=exp_objs)
@@ -499,6 +532,73 @@ class RadosOrchestrator:
             log.error(err)
             return False
 
+    def get_bench_pool_profile(self, pool_name: str) -> str:
+        """
+        Method to describe the pool configuration used for keying the bench results
+        Args:
+            pool_name: name of the pool
+        Returns: pool profile, eg: replicated-3, ec-jerasure-4-2
+        """
+        pool = self.get_pool_details(pool=pool_name)
+        if pool.get("erasure_code_profile"):
+            profile = self.get_ec_profile_detail(pool["erasure_code_profile"]) or {}
+            return (
+                f"ec-{profile.get('plugin', 'jerasure')}-"
+                f"{profile.get('k')}-{profile.get('m')}"
+            )
+        return f"replicated-{pool.get('size')}"
+
+    def get_cluster_shape(self) -> str:
+        """
+        Method to describe the cluster used for keying the bench results
+        Returns: cluster shape, eg: hosts-4-osds-12
+        """
+        osd_tree = self.run_ceph_command(cmd="ceph osd tree")
+        hosts = [n for n in osd_tree["nodes"] if n["type"] == "host"]
+        osds = [n for n in osd_tree["nodes"] if n["type"] == "osd"]
+        return f"hosts-{len(hosts)}-osds-{len(osds)}"
+
+    def get_ceph_build(self) -> str:
+        """
+        Method to fetch the ceph build running on the cluster
+        Returns: ceph version of the build, eg: 18.2.1-229.el9cp
+        """
+        out = self.run_ceph_command(cmd="ceph version")
+        return out["version"].split()[2]
+
+    def record_bench_result(self, result, pool_name: str, **kwargs) -> int:
+        """
+        Method to persist the rados bench result to the results store
+        Args:
+            result: BenchResult parsed from the rados bench output
+            pool_name: pool on which the benchmark was executed
+            kwargs: keys of the result
+                - suite -> name of the suite (str)
+                - build -> build under test (str) | default: ceph version of the cluster
+                - pool_profile -> pool configuration (str) | default: derived from the pool
+                - cluster_shape -> cluster configuration (str) | default: derived from the cluster
+                - db -> path of the results store (str)
+        Returns: id of the stored result, None on failure
+        """
+        try:
+            store = BenchResultStore(kwargs.get("db", DEFAULT_RESULTS_DB))
+            try:
+                return store.record(
+                    result,
+                    build=kwargs.get("build") or self.get_ceph_build(),
+                    suite=kwargs.get("suite"),
+                    pool_profile=kwargs.get("pool_profile")
+                    or self.get_bench_pool_profile(pool_name),
+                    cluster_shape=kwargs.get("cluster_shape")
+                    or self.get_cluster_shape(),
+                )
+            finally:
+                store.close()
+        except Exception as err:
+            # The benchmark itself succeeded, failing to store is not a test failure
+            log.error(f"Failed to store the rados bench result of {pool_name}: {err}")
+            return None
+
     def verify_pool_stats(self, pool_name, exp_objs: int, timeout=180) -> bool:
         """
         Method to verify pool stats
@@ -2271,6 +2371,53 @@ class RadosOrchestrator:
             log.error(f"Hit exception collecting PG state for : {pg_id}. Error:  {err}")
             return False
 
+    def get_pg_state_snapshot(self, pool_name: str = None) -> dict:
+        """Function to collect the state of all the PGs with a single command.
+
+        "ceph pg ls-by-pool <pool>" is used when the pool name is provided, else
+        "ceph pg dump pgs_brief" is used to fetch the states of all the PGs.
+        Example:
+            get_pg_state_snapshot(pool_name="test-pool")
+        Args:
+            pool_name: name of the pool whose PGs need to be collected
+
+        Returns: dictionary having the PG states indexed by PG ID, pool ID and state
+            {
+                "pgs": {"1.0": "active+clean", ...},
+                "by_pool": {"1": {"active+clean": ["1.0", ...]}},
+                "by_state": {"active+clean": ["1.0", ...]},
+            }
+        """
+        if pool_name:
+            cmd = f"ceph pg ls-by-pool {pool_name}"
+        else:
+            cmd = "ceph pg dump pgs_brief"
+
+        out = self.run_ceph_command(cmd=cmd, client_exec=True)
+        pg_stats = out.get("pg_stats", []) if isinstance(out, dict) else out
+        return self.index_pg_states(pg_stats or [])
+
+    @staticmethod
+    def index_pg_states(pg_stats: list) -> dict:
+        """Indexes the PG stats entries by PG ID, pool ID and state.
+
+        Args:
+            pg_stats: list of PG entries having "pgid" and "state" keys
+
+        Returns: dictionary as described in get_pg_state_snapshot
+        """
+        snapshot = {"pgs": {}, "by_pool": {}, "by_state": {}}
+        for entry in pg_stats:
+            pg_id, state = entry["pgid"], entry["state"]
+            pool_id = pg_id.split(".")[0]
+            snapshot["pgs"][pg_id] = state
+            snapshot["by_pool"].setdefault(pool_id, {}).setdefault(state, []).append(
+                pg_id
+            )
+            snapshot["by_state"].setdefault(state, []).append(pg_id)
+
+        return snapshot
+
     def get_osd_map(self, pool: str, obj: str, nspace: str = None) -> dict:
         """
         Retrieve the osd map for an object in a pool
@@ -4970,10 +5117,15 @@ EOF"""
             pool_name: name of the pool
         Returns:
             pool ID in integer format
+        Raises:
+            CommandFailed: when the pool does not exist
         """
-        _cmd = f"ceph osd pool stats {pool_name}"
-        out = self.run_ceph_command(cmd=_cmd, client_exec=True)
-        return int(out[0]["pool_id"])
+        details = self.get_pool_details(pool=pool_name)
+        if "pool_id" not in details:
+            raise CommandFailed(
+                f"Unable to fetch the ID of pool {pool_name}: not found"
+            )
+        return int(details["pool_id"])
 
     def rados_pool_cleanup(self):
         """
@@ -7088,7 +7240,9 @@ EOF"""
         Automation for bug : [1] & [2]
         Args:
             timeout: timeout in seconds or "unlimited"
-            sleep_interval: sleep timeout in seconds (default: 120)
+            sleep_interval: maximum sleep between the checks in seconds (default: 120).
+                The PG states are polled every 5 seconds while the number of pending PGs
+                decreases and the interval is doubled up to this value otherwise.
             test_pool: name of the test pool, whose PG states need to be monitored.
             recovery_thread: flag to control if recovery threads are to be modified
         Returns:  True -> pass, False -> fail
@@ -7106,68 +7260,57 @@ EOF"""
             end_time = datetime.datetime.utcnow() + datetime.timedelta(seconds=timeout)
             condition = lambda: datetime.datetime.utcnow() < end_time
 
+        health_warnings = (
+            "remapped",
+            "backfilling",
+            "degraded",
+            "incomplete",
+            "peering",
+            "recovering",
+            "recovery_wait",
+            "undersized",
+            "backfilling_wait",
+        )
+        # Poll quickly while the PGs are settling and back off up to the
+        # sleep interval while no progress is made.
+        min_interval = min(5, sleep_interval)
+        interval = min_interval
+        last_pending = None
         while condition():
-            health_warnings = (
-                "remapped",
-                "backfilling",
-                "degraded",
-                "incomplete",
-                "peering",
-                "recovering",
-                "recovery_wait",
-                "undersized",
-                "backfilling_wait",
-            )
-            all_pg_active_clean = True
-            if test_pool:
-                log.debug(f"Checking for active + clean PGs on pool: {test_pool}")
-                pool_pg_ids = self.get_pgid(pool_name=test_pool)
-                for pg_id in pool_pg_ids:
-                    try:
-                        pg_state = self.get_pg_state(pg_id=pg_id)
-                    except Exception as err:
-                        log.error(f"PGID : {pg_id} was not found, err: {err}")
-                        continue
-                    if any(key in health_warnings for key in pg_state.split("+")):
-                        all_pg_active_clean = False
-                        log.debug(
-                            f"PG: {pg_id} in states: {pg_state}"
-                            f"Waiting for active + clean. "
-                        )
-                        break
+            try:
+                snapshot = self.get_pg_state_snapshot(pool_name=test_pool)
+            except Exception as err:
+                log.error(f"Error occurred while fetching PG states: {err}")
+                snapshot = None
+
+            if snapshot is not None:
+                pending = {
+                    state: len(pg_ids)
+                    for state, pg_ids in snapshot["by_state"].items()
+                    if any(key in health_warnings for key in state.split("+"))
+                }
+                if not pending:
+                    if recovery_thread:
+                        log.debug("Removing recovery thread settings")
+                        self.change_recovery_threads(config={}, action="rm")
                     log.info(
-                        f" PG: {pg_id} in state: {pg_state}."
-                        f" Checking status on next PG in the pool"
+                        "The recovery and back-filling of the OSDs/Pool is completed"
                     )
-            else:
-                try:
-                    status_report = self.run_ceph_command(
-                        cmd="ceph report", client_exec=True
-                    )
-                    for entry in status_report["num_pg_by_state"]:
-                        if any(
-                            key in health_warnings for key in entry["state"].split("+")
-                        ):
-                            all_pg_active_clean = False
-                            log.debug(f"PG state: {entry['state']}")
-                        log.info(
-                            f"Waiting for active + clean. Active alerts: {status_report['health']['checks'].keys()},"
-                            f" PG States: {status_report['num_pg_by_state']}."
-                            f" Checking status again in {sleep_interval} seconds"
-                        )
-                        log.info(
-                            f"\nceph status : {self.run_ceph_command(cmd='ceph -s', client_exec=True)}\n"
-                        )
-                except Exception as e:
-                    log.error(f"Error occurred while fetching status report: {e}")
+                    return True
 
-            if all_pg_active_clean:
-                if recovery_thread:
-                    log.debug("Removing recovery thread settings")
-                    self.change_recovery_threads(config={}, action="rm")
-                log.info("The recovery and back-filling of the OSDs/Pool is completed")
-                return True
-            time.sleep(sleep_interval)
+                pending_count = sum(pending.values())
+                if last_pending is not None and pending_count < last_pending:
+                    interval = min_interval
+                else:
+                    interval = min(interval * 2, sleep_interval)
+                last_pending = pending_count
+                log.info(
+                    f"Waiting for active + clean on {test_pool or 'cluster'}."
+                    f" {pending_count} PGs pending, PG States: {pending}."
+                    f" Checking status again in {interval} seconds"
+                )
+
+            time.sleep(interval)
 
         if recovery_thread:
             log.debug("Removing recovery thread settings")
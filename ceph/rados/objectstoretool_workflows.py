@@ -51,14 +51,169 @@ ceph-objectstore-tool --data-path path to osd [ --op list $obj_ID]
     update-mon-db
     dump-export
     trim-pg-log
+
+Multiple commands can be executed with the OSD stopped only once using a session.
+All the queued commands are executed within a single container invocation.
+
+    with objectstore_obj.session(osd_id=2) as session:
+        for obj in objects:
+            session.add(f"--pgid {pgid} '{obj}' set-bytes < /tmp/corrupt")
+        results = session.execute()
 """
 
+import base64
+import shlex
+from collections import namedtuple
+from uuid import uuid4
+
+from ceph.ceph import CommandFailed
 from ceph.ceph_admin import CephAdmin
 from ceph.rados.core_workflows import RadosOrchestrator
 from utility.log import Log
 
 log = Log(__name__)
 
+COTResult = namedtuple("COTResult", ["cmd", "out", "err", "rc"])
+SESSION_MARKER = "__CEPHCI_COT__"
+
+
+class COTSession:
+    """
+    Batch of ceph-objectstore-tool commands run on a stopped OSD.
+
+    The OSD is stopped on entering the session and started once on exit.
+    Queued commands are executed in one cephadm shell container and the
+    output, error and exit code of every command are returned separately.
+    As with run_cot_command(mount=True), the host /tmp directory is mounted
+    at /mnt within the container for the commands reading or writing files.
+    """
+
+    def __init__(self, cot_obj, osd_id: int, timeout: int = 1800, stop_on_error=False):
+        """
+        Args:
+            cot_obj: objectstoreToolWorkflows object
+            osd_id: daemon ID of target OSD
+            timeout: Maximum time allowed for executing a batch of commands
+            stop_on_error: skip the remaining commands of the batch on failure
+        """
+        self.cot_obj = cot_obj
+        self.osd_id = osd_id
+        self.timeout = timeout
+        self.stop_on_error = stop_on_error
+        self.queue = []
+        self.results = []
+        self.osd_node = None
+
+    def __enter__(self):
+        rados_obj = self.cot_obj.rados_obj
+        self.osd_node = rados_obj.fetch_host_node(
+            daemon_type="osd", daemon_id=str(self.osd_id)
+        )
+        if not self.cot_obj.nostop:
+            rados_obj.change_osd_state(action="stop", target=self.osd_id)
+        self.cot_obj._sessions[self.osd_id] = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None and self.queue:
+                self.execute()
+        finally:
+            self.cot_obj._sessions.pop(self.osd_id, None)
+            if not self.cot_obj.nostart:
+                self.cot_obj.rados_obj.change_osd_state(
+                    action="start", target=self.osd_id
+                )
+        return False
+
+    def add(self, cmd: str) -> int:
+        """Queue a ceph-objectstore-tool command i.e. the arguments of the tool
+        Args:
+            cmd: command that needs to be run
+        Returns:
+            index of the result of the command in the session results
+        """
+        self.queue.append(cmd)
+        return len(self.results) + len(self.queue) - 1
+
+    def _script(self, token):
+        """Returns the script executing the queued commands in the container"""
+        cot = f"ceph-objectstore-tool --data-path /var/lib/ceph/osd/ceph-{self.osd_id}"
+        script = ["o=$(mktemp); e=$(mktemp); trap 'rm -f $o $e' EXIT"]
+        for idx, cmd in enumerate(self.queue):
+            script.append(
+                f"( {cot} {cmd}\n) >$o 2>$e; rc=$?; "
+                f"echo {SESSION_MARKER}{token} {idx}; "
+                "base64 -w0 $o; echo; base64 -w0 $e; echo; "
+                f"echo {SESSION_MARKER}{token} {idx} $rc"
+            )
+            if self.stop_on_error:
+                script[-1] += "; [ $rc -eq 0 ] || exit 0"
+        return "\n".join(script)
+
+    @staticmethod
+    def _parse(out: str, token: str) -> dict:
+        """Returns the stdout, stderr and exit code of the commands by index"""
+        lines, results = out.splitlines(), {}
+        marker = f"{SESSION_MARKER}{token} "
+        for num, line in enumerate(lines):
+            if not line.startswith(marker):
+                continue
+
+            fields = line[len(marker) :].split()
+            if len(fields) != 2:
+                continue
+
+            idx, rc = int(fields[0]), int(fields[1])
+            _out, _err = lines[num - 2 : num]
+            results[idx] = (
+                base64.b64decode(_out).decode("utf-8", errors="replace"),
+                base64.b64decode(_err).decode("utf-8", errors="replace"),
+                rc,
+            )
+
+        return results
+
+    def execute(self, timeout: int = None) -> list:
+        """Runs the queued commands within a single container invocation
+        Args:
+            timeout: Maximum time allowed for the batch, default is the session timeout
+        Returns:
+            list of COTResult of the executed commands
+        """
+        if not self.queue:
+            return []
+
+        token = uuid4().hex
+        script = self._script(token)
+        _cmd = (
+            f"cephadm shell --name osd.{self.osd_id} --mount /tmp/ -- "
+            f"bash -c {shlex.quote(script)}"
+        )
+        log.info(
+            f"Executing {len(self.queue)} ceph-objectstore-tool commands on osd.{self.osd_id}"
+        )
+        out, _ = self.osd_node.exec_command(
+            sudo=True, cmd=_cmd, timeout=timeout or self.timeout, check_ec=False
+        )
+        parsed = self._parse(out, token)
+
+        batch = []
+        for idx, cmd in enumerate(self.queue):
+            if idx not in parsed:
+                # Skipped as an earlier command of the batch failed
+                batch.append(COTResult(cmd, "", "", None))
+                continue
+
+            _out, _err, rc = parsed[idx]
+            if rc != 0:
+                log.error(f"ceph-objectstore-tool {cmd} failed with {rc}: {_err}")
+            batch.append(COTResult(cmd, _out, _err, rc))
+
+        self.queue = []
+        self.results.extend(batch)
+        return batch
+
 
 class objectstoreToolWorkflows:
     """
@@ -76,6 +231,21 @@ class objectstoreToolWorkflows:
         self.client = node.cluster.get_nodes(role="client")[0]
         self.nostop = nostop
         self.nostart = nostart
+        self._sessions = {}
+
+    def session(self, osd_id: int, timeout: int = 1800, stop_on_error=False):
+        """Returns a session to run multiple commands with the OSD stopped once
+        Args:
+            osd_id: daemon ID of target OSD
+            timeout: Maximum time allowed for executing a batch of commands
+            stop_on_error: skip the remaining commands of the batch on failure
+        Returns:
+            COTSession context manager
+
+        Commands executed using the other methods of this class for the OSD
+        within the session do not stop and start the OSD either.
+        """
+        return COTSession(self, osd_id, timeout=timeout, stop_on_error=stop_on_error)
 
     def run_cot_command(
         self,
@@ -107,6 +277,21 @@ class objectstoreToolWorkflows:
         _cmd = f"{base_cmd} -- ceph-objectstore-tool --data-path /var/lib/ceph/osd/ceph-{osd_id} {cmd}"
         if file_redirect:
             _cmd = f"{_cmd} > /tmp/cot_stdout"
+
+        session = self._sessions.get(osd_id)
+        if session:
+            # OSD is already stopped, execute along with the queued commands.
+            # The /tmp directory of the host is mounted at /mnt in the container
+            if file_redirect:
+                cmd = f"{cmd} > /mnt/cot_stdout"
+            session.add(cmd)
+            result = session.execute(timeout=max(timeout, session.timeout))[-1]
+            if result.rc != 0:
+                raise CommandFailed(
+                    f"ceph-objectstore-tool {cmd} returned {result.err} and code {result.rc}"
+                )
+            return str(result.err) if return_err else str(result.out)
+
         try:
             if not self.nostop:
                 self.rados_obj.change_osd_state(action="stop", target=osd_id)
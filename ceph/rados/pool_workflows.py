@@ -125,11 +125,13 @@ class PoolFunctions:
             f"Writing {(obj_end - obj_start) * num_keys_obj} Key pairs"
             f" to increase the omap entries on pool {pool_name}"
         )
-        lx = "https://raw.githubusercontent.com/red-hat-storage/cephci/refs/heads/main/utility/generate_omap_entries.py"
-        client_node.exec_command(
-            sudo=True,
-            cmd=f"curl -k {lx} -O",
-        )
+        # generate_omap_entries.py imports the aio write pipeline from rados_aio.py
+        lx = "https://raw.githubusercontent.com/red-hat-storage/cephci/refs/heads/main/utility"
+        for script in ("generate_omap_entries.py", "rados_aio.py"):
+            client_node.exec_command(
+                sudo=True,
+                cmd=f"curl -k {lx}/{script} -O",
+            )
         # Setup Script pre-requisites : docopt
         client_node.exec_command(
             sudo=True, cmd="pip3 install docopt", long_running=True
@@ -141,7 +143,9 @@ class PoolFunctions:
 
         # removing the py file copied
         if not kwargs.get("retain_script", False):
-            client_node.exec_command(sudo=True, cmd="rm -rf generate_omap_entries.py")
+            client_node.exec_command(
+                sudo=True, cmd="rm -rf generate_omap_entries.py rados_aio.py"
+            )
 
         # Check if OMAP count verification is enabled (default: True)
         verify_omap_count = kwargs.get("verify_omap_count", True)
@@ -0,0 +1,150 @@
+"""
+query_cache module provides a read-through cache for the cluster state queries.
+
+RadosOrchestrator helpers fetch the complete osd map, pool details or daemon
+metadata to look up a single value and tests call them in loops. The cache
+serves the repeated queries from memory for a short duration and drops all the
+entries when any command which could modify the cluster state is executed on
+any node, i.e. a ceph, rados, rbd or cephadm command apart from the known
+read-only queries. The entries are dropped both before and after the execution,
+hence a query running along with the command does not cache the prior state.
+
+Example::
+
+    cache = QueryCache()
+    hit, out = cache.get("ceph osd dump -f json")
+    if not hit:
+        out = fetch()
+        cache.put("ceph osd dump -f json", out)
+"""
+
+import re
+import threading
+from copy import deepcopy
+from time import monotonic
+
+from ceph.ceph import register_command_observer
+from utility.log import Log
+
+log = Log(__name__)
+
+DEFAULT_TTL = 5
+
+# Queries whose output is cached along with the time to live in seconds.
+CACHEABLE_QUERIES = (
+    (re.compile(r"^ceph osd (dump|tree)$"), DEFAULT_TTL),
+    (re.compile(r"^ceph osd pool ls( detail)?$"), DEFAULT_TTL),
+    (re.compile(r"^ceph osd pool get \S+ \S+$"), DEFAULT_TTL),
+    (re.compile(r"^ceph osd map \S+ \S+( \S+)?$"), DEFAULT_TTL),
+    (re.compile(r"^ceph \S+ metadata( \S+)?$"), 60),
+)
+
+# Queries which do not modify the cluster state, hence do not invalidate the cache.
+READ_ONLY_QUERIES = re.compile(
+    r"^ceph ("
+    r"-s|status|health( detail)?|df( detail)?|versions?|report|fsid|"
+    r"\S+ metadata( \S+)?|"
+    r"osd (dump|tree|df|stat|ls|perf|getmaxosd|map \S+ \S+( \S+)?|find \S+)|"
+    r"osd (crush|erasure-code-profile) (ls|dump|get|tree|rule (ls|dump)).*|"
+    r"osd pool (ls( detail)?|get \S+ \S+|stats( \S+)?|autoscale-status|get-quota \S+)|"
+    r"pg (dump.*|ls.*|stat|map \S+|\S+ query)|"
+    r"(mon|mgr|mds|fs) (dump|stat|ls|services|module ls)|"
+    r"orch (ls|ps|status|host ls|device ls).*|"
+    r"config (get|show|dump|log).*|config-key (get|ls|dump).*|"
+    r"(auth|crash) (ls|get|info).*|balancer status"
+    r")$"
+)
+
+# Invocations of the tools modifying the cluster state, anywhere in the command
+CEPH_TOOLS = re.compile(r"(^|[\s;&|(`'\"])(ceph|rados|rbd|cephadm)\b")
+
+_PREFIX = re.compile(r"^(sudo )?(cephadm( \S+)* shell( \S+)* -- )?")
+_FORMAT = re.compile(r" (-f|--format)[ =]json(-pretty)?")
+
+
+def normalize(cmd: str) -> str:
+    """Strips the sudo/cephadm shell prefix and the output format of the command."""
+    cmd = " ".join(cmd.split())
+    return _FORMAT.sub("", _PREFIX.sub("", cmd)).strip()
+
+
+def is_read_only(cmd: str) -> bool:
+    """Checks whether the command is a known read-only ceph query."""
+    return bool(READ_ONLY_QUERIES.match(normalize(cmd)))
+
+
+def is_mutating(cmd: str) -> bool:
+    """Checks whether the command may modify the cluster state."""
+    return bool(CEPH_TOOLS.search(cmd)) and not is_read_only(cmd)
+
+
+def get_ttl(cmd: str):
+    """Returns the time to live of the command output or None if not cacheable."""
+    _cmd = normalize(cmd)
+    for pattern, ttl in CACHEABLE_QUERIES:
+        if pattern.match(_cmd):
+            return ttl
+    return None
+
+
+class QueryCache:
+    """Read-through cache of the cluster state queries."""
+
+    def __init__(self, enabled: bool = True):
+        """
+        Args:
+            enabled: flag to enable the cache
+        """
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = dict()
+        self._lock = threading.Lock()
+        register_command_observer(self)
+
+    @property
+    def stats(self) -> dict:
+        """Returns the hit, miss and invalidation counters."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+        }
+
+    def get(self, key):
+        """Returns a tuple of the hit flag and a copy of the cached output.
+
+        Args:
+            key: command string or tuple of command and execution details
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > monotonic():
+                self.hits += 1
+                log.debug(f"Query cache hit for {key}")
+                return True, deepcopy(entry[1])
+
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value, ttl: int = DEFAULT_TTL):
+        """Caches the output for the given time to live in seconds."""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._entries[key] = (monotonic() + ttl, deepcopy(value))
+
+    def invalidate(self):
+        """Drops all the cached entries."""
+        with self._lock:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+
+    def observe(self, node, cmd: str):
+        """Command observer invalidating the cache on state modifying commands."""
+        if is_mutating(cmd):
+            self.invalidate()
@@ -4,9 +4,20 @@ RADOS bench testing uses the rados binary that comes with the ceph-common packag
 It contains a benchmarking facility that exercises the cluster by way of librados,
 the low level native object storage API provided by Ceph.
 
+The output of the benchmark is parsed into BenchResult records which can be
+persisted to a local SQLite store keyed by the build, suite, pool profile and
+cluster shape. The results of a build are compared against a baseline build to
+flag the regressions, see utility/rados_bench_compare.py.
+
 """
 
+import os
+import re
+import sqlite3
+import threading
+from collections import namedtuple
 from concurrent.futures import ALL_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field, fields
 from time import time
 
 from ceph.ceph_admin.common import config_dict_to_string
@@ -31,6 +42,348 @@ class RadosBenchExecutionFailure(Exception):
     pass
 
 
+DEFAULT_RESULTS_DB = os.path.join(os.path.expanduser("~"), ".cephci", "rados_bench.db")
+DEFAULT_TOLERANCE = 0.1
+
+# Labels of the rados bench summary lines and the BenchResult attributes
+SUMMARY_FIELDS = {
+    "total time run": "total_time",
+    "total writes made": "ops",
+    "total reads made": "ops",
+    "write size": "op_size",
+    "read size": "op_size",
+    "object size": "object_size",
+    "bandwidth (mb/sec)": "bandwidth",
+    "stddev bandwidth": "bandwidth_stddev",
+    "max bandwidth (mb/sec)": "bandwidth_max",
+    "min bandwidth (mb/sec)": "bandwidth_min",
+    "average iops": "iops",
+    "stddev iops": "iops_stddev",
+    "max iops": "iops_max",
+    "min iops": "iops_min",
+    "average latency(s)": "latency",
+    "stddev latency(s)": "latency_stddev",
+    "max latency(s)": "latency_max",
+    "min latency(s)": "latency_min",
+}
+
+# Metrics compared against the baseline, 1 -> higher is better, -1 -> lower is better
+REGRESSION_METRICS = {
+    "bandwidth": 1,
+    "iops": 1,
+    "latency": -1,
+    "latency_stddev": -1,
+    "latency_max": -1,
+}
+
+_SUMMARY = re.compile(r"^\s*([A-Za-z][A-Za-z ()/]*?):\s+(-?[\d.]+(?:e[-+]?\d+)?)\s*$")
+_SAMPLE = re.compile(r"^\s*(\d+)" + r"\s+(-|[\d.]+(?:e[-+]?\d+)?)" * 7 + r"\s*$")
+
+BenchSample = namedtuple(
+    "BenchSample",
+    [
+        "sec",
+        "cur_ops",
+        "started",
+        "finished",
+        "avg_mbs",
+        "cur_mbs",
+        "last_lat",
+        "avg_lat",
+    ],
+)
+
+Regression = namedtuple("Regression", ["metric", "baseline", "current", "change"])
+
+
+@dataclass
+class BenchResult:
+    """
+    Parsed result of a rados bench run
+
+    Attributes:
+        mode: write, seq or rand
+        total_time: duration of the run in seconds
+        ops: number of objects written or read
+        op_size: size of each op in bytes
+        object_size: size of the objects in bytes
+        bandwidth: average bandwidth in MB/sec, along with its stddev, max and min
+        iops: average IOPS, along with its stddev, max and min
+        latency: average latency in seconds, along with its stddev, max and min
+        samples: per second series of BenchSample
+    """
+
+    mode: str
+    total_time: float = None
+    ops: int = None
+    op_size: int = None
+    object_size: int = None
+    bandwidth: float = None
+    bandwidth_stddev: float = None
+    bandwidth_max: float = None
+    bandwidth_min: float = None
+    iops: float = None
+    iops_stddev: float = None
+    iops_max: float = None
+    iops_min: float = None
+    latency: float = None
+    latency_stddev: float = None
+    latency_max: float = None
+    latency_min: float = None
+    samples: list = field(default_factory=list)
+
+    def metrics(self) -> dict:
+        """Returns the summary metrics of the run"""
+        _metrics = asdict(self)
+        _metrics.pop("samples")
+        _metrics.pop("mode")
+        return _metrics
+
+    def __str__(self):
+        return (
+            f"rados bench {self.mode}: {self.bandwidth} MB/sec, {self.iops} IOPS, "
+            f"latency avg {self.latency}s stddev {self.latency_stddev}s max {self.latency_max}s"
+        )
+
+
+METRIC_FIELDS = [
+    f.name for f in fields(BenchResult) if f.name not in ("mode", "samples")
+]
+
+
+def _number(value):
+    """Returns the int or float value of the field, None for '-'"""
+    if value == "-":
+        return None
+    number = float(value)
+    return int(number) if number.is_integer() and "." not in value else number
+
+
+def parse_bench_output(out, mode="write"):
+    """
+    Parses the output of rados bench into a BenchResult
+
+    The summary lines which are not present in the output e.g. the bandwidth
+    stddev of the read runs are left as None.
+
+    Args:
+        out (Str): stdout of the rados bench command
+        mode (Str): write, seq or rand
+
+    Returns:
+        BenchResult
+
+    Example::
+
+          sec Cur ops   started  finished  avg MB/s  cur MB/s last lat(s)  avg lat(s)
+            1      16        38        22   87.9917        88    0.521508    0.499339
+        Total time run:         10.2969
+        Bandwidth (MB/sec):     111.879
+        Average IOPS:           27
+        Average Latency(s):     0.570139
+    """
+    result = BenchResult(mode=mode)
+    for line in (out or "").splitlines():
+        sample = _SAMPLE.match(line)
+        if sample:
+            values = [_number(v) for v in sample.groups()]
+            if values[0] or values[3]:
+                result.samples.append(BenchSample(*values))
+            continue
+
+        summary = _SUMMARY.match(line)
+        if summary:
+            attr = SUMMARY_FIELDS.get(summary.group(1).strip().lower())
+            if attr:
+                setattr(result, attr, _number(summary.group(2)))
+
+    return result
+
+
+def compare_results(current, baseline, tolerance=DEFAULT_TOLERANCE, tolerances=None):
+    """
+    Returns the metrics of the current run which regressed beyond the tolerance
+
+    Args:
+        current (BenchResult): result to be verified
+        baseline (BenchResult): reference result
+        tolerance (Float): allowed relative degradation e.g. 0.1 for 10%
+        tolerances (Dict): per metric tolerance overriding the default
+
+    Returns:
+        list of Regression
+    """
+    tolerances = tolerances or {}
+    regressions = []
+    for metric, direction in REGRESSION_METRICS.items():
+        _base = getattr(baseline, metric)
+        _curr = getattr(current, metric)
+        if not _base or _curr is None:
+            continue
+
+        change = (_curr - _base) / _base
+        if change * direction < -tolerances.get(metric, tolerance):
+            regressions.append(Regression(metric, _base, _curr, change))
+
+    return regressions
+
+
+class BenchResultStore:
+    """
+    SQLite store of the rados bench results
+
+    Example::
+
+        store = BenchResultStore()
+        store.record(result, build="9.0", suite="rados-perf", pool_profile="ec-4-2",
+                     cluster_shape="hosts-4-osds-12")
+        store.compare(build="9.1", baseline="9.0")
+    """
+
+    KEYS = ["build", "suite", "pool_profile", "cluster_shape", "mode"]
+
+    def __init__(self, path=DEFAULT_RESULTS_DB):
+        """
+        Args:
+            path (Str): SQLite database file, created when not present
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        metrics = ", ".join(f"{m} REAL" for m in METRIC_FIELDS)
+        keys = ", ".join(f"{k} TEXT" for k in self.KEYS)
+        with self.conn:
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, "
+                f"created REAL, run_name TEXT, {keys}, {metrics})"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS samples (run_id INTEGER, "
+                + ", ".join(f"{s} REAL" for s in BenchSample._fields)
+                + ")"
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS runs_key ON runs "
+                f"({', '.join(self.KEYS)})"
+            )
+
+    def close(self):
+        self.conn.close()
+
+    def record(self, result, build, suite, pool_profile, cluster_shape, run_name=None):
+        """
+        Persists the result along with its per second series
+
+        Args:
+            result (BenchResult): parsed result
+            build (Str): build under test
+            suite (Str): name of the suite
+            pool_profile (Str): pool configuration e.g. replicated-3, ec-4-2
+            cluster_shape (Str): cluster configuration e.g. hosts-4-osds-12
+            run_name (Str): rados bench run name
+
+        Returns:
+            id of the stored run (Int)
+        """
+        keys = [build, suite, pool_profile, cluster_shape, result.mode]
+        metrics = result.metrics()
+        columns = ["created", "run_name"] + self.KEYS + METRIC_FIELDS
+        values = [time(), run_name] + keys + [metrics[m] for m in METRIC_FIELDS]
+
+        with self._lock, self.conn:
+            run_id = self.conn.execute(
+                f"INSERT INTO runs ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' * len(columns))})",
+                values,
+            ).lastrowid
+            self.conn.executemany(
+                f"INSERT INTO samples VALUES ({', '.join('?' * (len(BenchSample._fields) + 1))})",
+                [(run_id, *sample) for sample in result.samples],
+            )
+
+        LOG.info(f"Stored rados bench result {run_id} of {dict(zip(self.KEYS, keys))}")
+        return run_id
+
+    def samples(self, run_id):
+        """Returns the per second series of the stored run"""
+        rows = self.conn.execute(
+            f"SELECT {', '.join(BenchSample._fields)} FROM samples "
+            "WHERE run_id = ? ORDER BY sec",
+            (run_id,),
+        )
+        return [BenchSample(*row) for row in rows]
+
+    def aggregate(self, build, suite=None, **keys):
+        """
+        Returns the mean result of all the runs of the build per key
+
+        Args:
+            build (Str): build whose results are aggregated
+            suite (Str): restrict to the suite
+            keys (Dict): restrict to the pool_profile, cluster_shape or mode
+
+        Returns:
+            dict of (suite, pool_profile, cluster_shape, mode, op_size) and BenchResult
+        """
+        keys.update(build=build, suite=suite)
+        where = [(k, v) for k, v in keys.items() if v is not None]
+        # runs with different op sizes are not comparable
+        group = self.KEYS[1:] + ["op_size"]
+        rows = self.conn.execute(
+            f"SELECT {', '.join(group)}, COUNT(*), "
+            f"{', '.join(f'AVG({m})' for m in METRIC_FIELDS)} FROM runs "
+            f"WHERE {' AND '.join(f'{k} = ?' for k, _ in where)} "
+            f"GROUP BY {', '.join(group)}",
+            [v for _, v in where],
+        )
+
+        results = dict()
+        for row in rows:
+            key, count, metrics = (
+                row[: len(group)],
+                row[len(group)],
+                row[len(group) + 1 :],
+            )
+            results[key] = BenchResult(mode=key[3], **dict(zip(METRIC_FIELDS, metrics)))
+            LOG.debug(f"Aggregated {count} rados bench runs of {build} {key}")
+
+        return results
+
+    def compare(
+        self, build, baseline, tolerance=DEFAULT_TOLERANCE, tolerances=None, **keys
+    ):
+        """
+        Compares the results of the build against the baseline build
+
+        Only the keys i.e. suite, pool profile, cluster shape, mode and op size
+        for which both the builds have results are compared.
+
+        Args:
+            build (Str): build to be verified
+            baseline (Str): reference build
+            tolerance (Float): allowed relative degradation e.g. 0.1 for 10%
+            tolerances (Dict): per metric tolerance overriding the default
+            keys (Dict): restrict to the suite, pool_profile, cluster_shape or mode
+
+        Returns:
+            dict of (suite, pool_profile, cluster_shape, mode, op_size) and list of Regression
+        """
+        current = self.aggregate(build, **keys)
+        reference = self.aggregate(baseline, **keys)
+
+        report = dict()
+        for key, result in current.items():
+            if key not in reference:
+                LOG.info(f"No baseline result of {baseline} for {key}")
+                continue
+            report[key] = compare_results(result, reference[key], tolerance, tolerances)
+
+        return report
+
+
 def create_id(prefix=""):
     """
     Return unique name with prefix
@@ -110,6 +463,7 @@ class RadosBench:
         self.mon = mon_node
         self.clients = clients
         self.pools = []
+        self.results = []
 
     def fetch_client(self, node=""):
         """
@@ -155,9 +509,11 @@ class RadosBench:
                 reuse-bench (Str) : bench name (String value)
                 max-objects(Str) : max number of objects to be written
                 check_ec(bool): flag to control Exit code checks
+                results (List): the parsed BenchResult is appended (Optional)
 
         """
         base_cmd = ["rados", "bench"]
+        results = config.pop("results", None)
         seconds = str(config.pop("seconds"))
         _timeout = config.get("timeout", int(seconds) + 100)
         check_ec = config.get("check_ec", True)
@@ -171,9 +527,11 @@ class RadosBench:
         base_cmd.append(config_dict_to_string(config))
         base_cmd = " ".join(base_cmd)
 
-        client.exec_command(
+        out, _ = client.exec_command(
             cmd=base_cmd, sudo=True, timeout=_timeout, check_ec=check_ec
         )
+        if results is not None:
+            results.append(parse_bench_output(out, mode="write"))
         return run_name if run_name else None
 
     @staticmethod
@@ -200,11 +558,13 @@ class RadosBench:
                 no-hints:  no-hint option (Boolean value, Default: false(hints))
                 concurrent-ios: integer (String value)
                 reuse-bench: bench name (String value)
+                results (List): the parsed BenchResult is appended (Optional)
 
         :warning: there should be a write operation pre-executed.
 
         """
         base_cmd = ["rados", "bench"]
+        results = config.pop("results", None)
 
         run_name = config.get("run-name")
 
@@ -215,7 +575,9 @@ class RadosBench:
 
         base_cmd = " ".join(base_cmd)
 
-        client.exec_command(cmd=base_cmd, sudo=True)
+        out, _ = client.exec_command(cmd=base_cmd, sudo=True)
+        if results is not None:
+            results.append(parse_bench_output(out, mode="seq"))
         return run_name if run_name else None
 
     @staticmethod
@@ -269,9 +631,13 @@ class RadosBench:
                         "run-name": True,
                         "no-cleanup": True,
                     }
-                    run_name = self.write(client, pool_name, **config)
+                    run_name = self.write(
+                        client, pool_name, results=self.results, **config
+                    )
                     config["run-name"] = run_name
-                    self.sequential_read(client, pool_name, **config)
+                    self.sequential_read(
+                        client, pool_name, results=self.results, **config
+                    )
                 except Exception:  # no qa
                     raise RadosBenchExecutionFailure
                 finally:
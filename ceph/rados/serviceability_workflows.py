@@ -10,6 +10,7 @@ from ceph import utils
 from ceph.ceph_admin import CephAdmin
 from ceph.rados import utils as osd_utils
 from ceph.rados.core_workflows import RadosOrchestrator
+from ceph.waiter import ADAPTIVE, WaitUntil
 from tests.ceph_installer import test_cephadm
 from tests.cephadm.test_host import run as deploy_host
 from tests.rados import rados_test_util as rados_utils
@@ -92,15 +93,15 @@ class ServiceabilityMethods:
 
             ncount_pre = self.get_host_count()
             deploy_host(ceph_cluster=self.cluster, config=add_args)
-            time.sleep(30)
+            if not WaitUntil(
+                timeout=60, interval=10, name="host addition", **ADAPTIVE
+            ).poll(lambda: ncount_pre < self.get_host_count()):
+                log.error("New hosts are not added into the cluster")
+                raise Exception("Execution error")
+
             if crush_bucket_name:
                 cmd = f"ceph osd crush move {crush_bucket_name} {crush_bucket_type}={crush_bucket_val}"
                 self.rados_obj.run_ceph_command(cmd=cmd)
-                time.sleep(5)
-
-            if not ncount_pre < self.get_host_count():
-                log.error("New hosts are not added into the cluster")
-                raise Exception("Execution error")
 
             log.info("New hosts added to the cluster successfully.")
 
@@ -134,26 +135,21 @@ class ServiceabilityMethods:
                 # Wait for new OSDs to register in ceph osd ls (may take time after
                 # orchestrator shows them as running)
                 max_wait = 120  # seconds
-                wait_interval = 10
-                waited = 0
-                osd_registered = False
-
-                while waited < max_wait:
+                for w in WaitUntil(
+                    timeout=max_wait, interval=10, name="osd map", **ADAPTIVE
+                ):
                     current_count = self.get_osd_count()
                     if osdcount_pre < current_count:
                         log.info(
                             f"New OSDs registered: {osdcount_pre} -> {current_count}"
                         )
-                        osd_registered = True
                         break
                     log.info(
                         f"Waiting for OSDs to register in OSD map... "
-                        f"({waited}/{max_wait}s, current: {current_count})"
+                        f"({w.elapsed:.0f}/{max_wait}s, current: {current_count})"
                     )
-                    time.sleep(wait_interval)
-                    waited += wait_interval
 
-                if not osd_registered:
+                if w.expired:
                     log.error(
                         f"New OSDs were not added into the cluster after {max_wait}s. "
                         f"Pre-count: {osdcount_pre}, Current: {self.get_osd_count()}"
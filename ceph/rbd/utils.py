@@ -1,12 +1,18 @@
 import math
 import random
+import shlex
 import string
 
 from ceph.ceph import CommandFailed
+from ceph.parallel import parallel
 from utility.log import Log
 
 log = Log(__name__)
 
+# Size of the image extents hashed separately while streaming the export
+DIGEST_CHUNK_SIZE = 4 * 1024 * 1024
+EXPORT_TIMEOUT = 3600
+
 
 getdict = lambda x: {k: v for (k, v) in x.items() if isinstance(v, dict)}
 
@@ -52,6 +58,12 @@ def copy_file(file_name, src, dest, dest_file_name=None):
     key_file.flush()
 
 
+def _stream_export_cmd(rbd, image_spec, digest_cmd):
+    """Returns the command piping the image export to the digest command."""
+    cmd = f"set -o pipefail; {rbd.base_cmd} export {image_spec} - --no-progress | {digest_cmd}"
+    return f"bash -c {shlex.quote(cmd)}"
+
+
 def get_md5sum_rbd_image(**kw):
     """
     Get md5sum of an RBD image.
@@ -61,7 +73,22 @@ def get_md5sum_rbd_image(**kw):
         "rbd": <rbd_object>,
         "client": <client_node>
     }
+
+    When the exported file is not retained, the export is streamed to md5sum
+    without writing the image to the client disk.
     """
+    remove_file = kw.get("remove_file") or "remove_file" not in kw.keys()
+    if kw.get("image_spec") and remove_file:
+        try:
+            out, _ = kw["client"].exec_command(
+                sudo=True,
+                cmd=_stream_export_cmd(kw["rbd"], kw["image_spec"], "md5sum"),
+                timeout=kw.get("timeout", EXPORT_TIMEOUT),
+            )
+        except CommandFailed as e:
+            log.error(f"Export failed for image {kw.get('image_spec')}: {e}")
+            return None
+        return out.split()[0]
 
     if kw.get("image_spec"):
         export_spec = {
@@ -78,7 +105,7 @@ def get_md5sum_rbd_image(**kw):
         cmd=f"md5sum {kw['file_path']}",
         node=kw.get("client"),
     ).split()[0]
-    if kw.get("remove_file") or "remove_file" not in kw.keys():
+    if remove_file:
         exec_cmd(
             output=True,
             cmd=f"rm -f {kw['file_path']}",
@@ -87,6 +114,62 @@ def get_md5sum_rbd_image(**kw):
     return md5sum_hash
 
 
+def get_rbd_image_digests(**kw):
+    """
+    Get md5sum of every extent of an RBD image in a single sequential read.
+    The export is streamed through split which hashes the extents in flight,
+    hence no temporary file is written on the client.
+    kw: {
+        "image_spec": <pool/image> or <pool/image@snap> to be hashed,
+        "rbd": <rbd_object>,
+        "client": <client_node>,
+        "chunk_size": <size of the extent in bytes>, default 4MiB
+    }
+    Returns:
+        list of md5sum of the extents in the order of their offsets, None on failure
+    """
+    chunk_size = kw.get("chunk_size", DIGEST_CHUNK_SIZE)
+    digest_cmd = f"split -b {chunk_size} -a 8 --filter=md5sum -"
+    try:
+        out, _ = kw["client"].exec_command(
+            sudo=True,
+            cmd=_stream_export_cmd(kw["rbd"], kw["image_spec"], digest_cmd),
+            timeout=kw.get("timeout", EXPORT_TIMEOUT),
+        )
+    except CommandFailed as e:
+        log.error(f"Export failed for image {kw.get('image_spec')}: {e}")
+        return None
+
+    return [line.split()[0] for line in out.splitlines() if line.strip()]
+
+
+def find_first_mismatch(first, second, chunk_size=DIGEST_CHUNK_SIZE):
+    """
+    Returns the offset of the first extent differing between the two images
+    Args:
+        first: list of extent digests of the first image
+        second: list of extent digests of the second image
+        chunk_size: size of the extents in bytes
+    Returns:
+        offset in bytes, None if the images are identical
+    """
+    for idx, (digest_1, digest_2) in enumerate(zip(first, second)):
+        if digest_1 != digest_2:
+            return idx * chunk_size
+
+    if len(first) != len(second):
+        return min(len(first), len(second)) * chunk_size
+
+    return None
+
+
+def _can_stream(spec):
+    """Checks if the image can be hashed without exporting it to a file."""
+    return bool(spec.get("image_spec")) and (
+        spec.get("remove_file") or "remove_file" not in spec.keys()
+    )
+
+
 def check_data_integrity(**kw):
     """
     kw: {
@@ -103,7 +186,36 @@ def check_data_integrity(**kw):
             "client":<client_node>
         }
     }
+
+    When both the images are not retained as files, the extents of both the
+    images are hashed concurrently while streaming their export and the offset
+    of the first mismatching extent is reported.
     """
+    if _can_stream(kw["first"]) and _can_stream(kw["second"]):
+        with parallel() as p:
+            p.spawn(get_rbd_image_digests, **kw.get("first"))
+            p.spawn(get_rbd_image_digests, **kw.get("second"))
+        digests_first, digests_second = p.results
+
+        if digests_first is None or digests_second is None:
+            log.error("Error while fetching the image digests")
+            return 1
+
+        chunk_size = kw["first"].get("chunk_size", DIGEST_CHUNK_SIZE)
+        offset = find_first_mismatch(digests_first, digests_second, chunk_size)
+        if offset is not None:
+            log.error(
+                f"Data of {kw['first']['image_spec']} and {kw['second']['image_spec']} "
+                f"differ at offset {offset}"
+            )
+            return 1
+
+        log.info(
+            f"Data of {kw['first']['image_spec']} and {kw['second']['image_spec']} "
+            f"match across {len(digests_first)} extents"
+        )
+        return 0
+
     md5_sum_first = get_md5sum_rbd_image(**kw.get("first"))
     if not md5_sum_first:
         log.error("Error while fetching md5sum")
@@ -0,0 +1,366 @@
+"""
+Pool of SSH channels multiplexed over a bounded set of transports per node.
+
+Every command executed on a node opens a session channel on the transport of
+the node. sshd limits the number of sessions per connection (MaxSessions, 10 by
+default), hence the concurrent commands e.g. spawned by the parallel workflows
+fail with "ChannelException: (1, 'Administratively prohibited')" once the limit
+is reached. ChannelPool accounts for the sessions in use, opens additional
+transports up to ``max_transports`` when all of them are busy and blocks the
+callers once the pool is saturated instead of failing.
+
+The first transport of the pool is the connection of the SSHConnectionManager
+itself, hence the callers of ``rssh()`` and ``ssh()`` are not affected.
+
+Usage:
+    with node.root_connection.pool.session(timeout=600) as channel:
+        channel.exec_command("uptime")
+        rc = channel.recv_exit_status()
+
+    log.info(format_pool_stats())
+"""
+
+import random
+import threading
+import weakref
+from contextlib import contextmanager
+from time import monotonic
+
+import paramiko
+
+from utility.log import Log
+
+log = Log(__name__)
+
+DEFAULT_MAX_SESSIONS = 8
+DEFAULT_MAX_TRANSPORTS = 4
+
+BACKOFF_BASE = 1
+BACKOFF_MAX = 30
+
+# Time in seconds the session or transport limit learnt from a refusal is
+# honoured for
+CAPACITY_TTL = 60
+
+_defaults = {
+    "max_sessions": DEFAULT_MAX_SESSIONS,
+    "max_transports": DEFAULT_MAX_TRANSPORTS,
+}
+_pools = weakref.WeakSet()
+
+
+class PoolTimeout(Exception):
+    """Raised when no channel could be acquired within the timeout."""
+
+    pass
+
+
+def set_pool_defaults(max_sessions=None, max_transports=None):
+    """Configures the limits of the pools created thereafter.
+
+    Args:
+        max_sessions (int): channels opened per transport
+        max_transports (int): transports opened per connection
+    """
+    if max_sessions:
+        _defaults["max_sessions"] = max(int(max_sessions), 1)
+    if max_transports:
+        _defaults["max_transports"] = max(int(max_transports), 1)
+
+
+def backoff_delays(base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Yields exponentially increasing delays with full jitter.
+
+    Args:
+        base (int): delay of the first retry in seconds
+        cap (int): maximum delay in seconds
+    """
+    attempt = 0
+    while True:
+        yield random.uniform(0, min(cap, base * 2**attempt))
+        attempt += 1
+
+
+def is_healthy(client):
+    """Returns True if the transport of the client is usable."""
+    transport = client.get_transport() if client else None
+    if not (transport and transport.is_active()):
+        return False
+
+    try:
+        transport.send_ignore()
+    except Exception:
+        return False
+
+    return True
+
+
+class _Transport:
+    """Accounting of the sessions opened on a transport."""
+
+    def __init__(self, client=None, primary=False):
+        self.client = client
+        self.primary = primary
+        self.active = 0
+        # sessions allowed by the server, learnt when a channel is refused.
+        # The refusal may be due to sessions held outside of the pool, hence
+        # the limit expires and is learnt again on the next refusal.
+        self.capacity = None
+        self.capacity_expiry = 0
+
+    def limit(self, max_sessions):
+        if self.capacity and monotonic() >= self.capacity_expiry:
+            self.capacity = None
+        return min(self.capacity or max_sessions, max_sessions)
+
+
+class ChannelPool:
+    """Session channels of a connection spread across multiple transports."""
+
+    def __init__(
+        self,
+        name,
+        primary,
+        connect,
+        max_sessions=None,
+        max_transports=None,
+    ):
+        """
+        Args:
+            name (str): name of the pool used for reporting e.g. user@host
+            primary (callable): returns the connected client of the connection
+            connect (callable): returns a newly connected client
+            max_sessions (int): channels opened per transport
+            max_transports (int): transports opened in total
+        """
+        self.name = name
+        self._primary = primary
+        self._connect = connect
+        self.max_sessions = max(int(max_sessions or _defaults["max_sessions"]), 1)
+        self.max_transports = max(int(max_transports or _defaults["max_transports"]), 1)
+
+        self._transports = []
+        # transports accepted by the server, learnt when a connect fails
+        self._transport_limit = None
+        self._transport_limit_expiry = 0
+        self._cond = threading.Condition()
+        self._reconnect_lock = threading.Lock()
+        self.metrics = {
+            "opened": 0,
+            "peak": 0,
+            "waits": 0,
+            "wait_time": 0.0,
+            "saturations": 0,
+            "reconnects": 0,
+            "transports_opened": 0,
+        }
+        _pools.add(self)
+
+    @contextmanager
+    def session(self, timeout=None):
+        """Context manager providing a session channel of the pool.
+
+        The channel is closed and its slot released on exit.
+        """
+        slot, channel = self.acquire(timeout)
+        try:
+            yield channel
+        finally:
+            self.release(slot, channel)
+
+    def acquire(self, timeout=None):
+        """Opens a session channel on the least loaded transport.
+
+        Args:
+            timeout (int): maximum time to wait for a channel in seconds
+
+        Returns:
+            slot of the transport to be released and the channel
+
+        Raises:
+            PoolTimeout: when the pool stayed saturated until the timeout
+        """
+        deadline = monotonic() + timeout if timeout else None
+        refused = 0
+        while True:
+            slot = self._reserve(deadline)
+            try:
+                if slot.client is None and slot.primary:
+                    slot.client = self._primary()
+                    with self._cond:
+                        self._cond.notify_all()
+                elif slot.client is None:
+                    slot.client = self._connect()
+                    with self._cond:
+                        self.metrics["transports_opened"] += 1
+                elif slot.primary and not is_healthy(slot.client):
+                    self._reconnect(slot)
+
+                channel = slot.client.get_transport().open_session(timeout=timeout)
+            except paramiko.ChannelException as err:
+                # The server refused the session i.e. MaxSessions is reached
+                refused += 1
+                self._saturated(slot, err)
+                if refused > self.max_transports * self.max_sessions:
+                    raise
+                continue
+            except Exception:
+                self._discard(slot)
+                raise
+
+            with self._cond:
+                self.metrics["opened"] += 1
+            return slot, channel
+
+    def release(self, slot, channel):
+        """Closes the channel and frees its slot."""
+        try:
+            channel.close()
+        except Exception:
+            pass
+
+        with self._cond:
+            slot.active -= 1
+            self._cond.notify_all()
+
+    def _reserve(self, deadline):
+        """Returns the transport with a free slot, waits while saturated."""
+        _start = None
+        with self._cond:
+            while True:
+                self._prune()
+                if not self._transports:
+                    # Connected outside the lock by the caller, as the connect
+                    # backs off while the node is unreachable
+                    slot = _Transport(primary=True)
+                    self._transports.append(slot)
+                elif any(t.primary and t.client is None for t in self._transports):
+                    # Wait for the primary transport being connected
+                    slot = None
+                else:
+                    slot = self._least_loaded()
+                    if slot is None and len(self._transports) < self.transport_limit():
+                        # Connected outside the lock by the caller
+                        slot = _Transport()
+                        self._transports.append(slot)
+
+                if slot is not None:
+                    slot.active += 1
+                    self.metrics["peak"] = max(self.metrics["peak"], self.in_use)
+                    if _start is not None:
+                        self.metrics["wait_time"] += monotonic() - _start
+                    return slot
+
+                if _start is None:
+                    _start = monotonic()
+                    self.metrics["waits"] += 1
+
+                remaining = None if deadline is None else deadline - monotonic()
+                if remaining is not None and remaining <= 0:
+                    self.metrics["wait_time"] += monotonic() - _start
+                    raise PoolTimeout(
+                        f"No SSH channel available on {self.name}: {self.stats()}"
+                    )
+                self._cond.wait(remaining)
+
+    def transport_limit(self):
+        """Returns the number of transports which may be opened."""
+        if self._transport_limit and monotonic() >= self._transport_limit_expiry:
+            self._transport_limit = None
+        return min(self._transport_limit or self.max_transports, self.max_transports)
+
+    def _least_loaded(self):
+        candidates = [
+            t
+            for t in self._transports
+            if t.client is not None and t.active < t.limit(self.max_sessions)
+        ]
+        return min(candidates, key=lambda t: t.active) if candidates else None
+
+    def _prune(self):
+        """Drops the idle secondary transports which are no longer active."""
+        for slot in list(self._transports):
+            if slot.primary or slot.active or slot.client is None:
+                continue
+            if not is_healthy(slot.client):
+                slot.client.close()
+                self._transports.remove(slot)
+
+    def _reconnect(self, slot):
+        """Re-establishes the primary connection, once for all the waiters."""
+        with self._reconnect_lock:
+            if is_healthy(slot.client):
+                return
+            log.warning(f"Transport of {self.name} is inactive, reconnecting")
+            slot.client = self._primary()
+            self.metrics["reconnects"] += 1
+
+    def _saturated(self, slot, err):
+        with self._cond:
+            slot.active -= 1
+            slot.capacity = max(slot.active, 1)
+            slot.capacity_expiry = monotonic() + CAPACITY_TTL
+            self.metrics["saturations"] += 1
+            self._cond.notify_all()
+        log.debug(f"{self.name} refused a session with {slot.active} open: {err}")
+
+    def _discard(self, slot):
+        """Frees the slot, the transport is dropped if it never connected."""
+        with self._cond:
+            slot.active -= 1
+            if slot.client is None:
+                self._transports.remove(slot)
+                if not slot.primary:
+                    # Do not retry opening more transports than the server
+                    # accepts, until the failure may no longer be relevant
+                    self._transport_limit = max(len(self._transports), 1)
+                    self._transport_limit_expiry = monotonic() + CAPACITY_TTL
+            self._cond.notify_all()
+
+    @property
+    def in_use(self):
+        return sum(t.active for t in self._transports)
+
+    def stats(self):
+        """Returns the utilisation metrics of the pool."""
+        with self._cond:
+            capacity = sum(t.limit(self.max_sessions) for t in self._transports)
+            stats = dict(self.metrics)
+            stats.update(
+                {
+                    "transports": len(self._transports),
+                    "active": self.in_use,
+                    "capacity": capacity,
+                    "utilisation": round(self.in_use / capacity, 2) if capacity else 0,
+                }
+            )
+        stats["wait_time"] = round(stats["wait_time"], 3)
+        return stats
+
+    def close(self):
+        """Closes the secondary transports, the primary is owned by the caller."""
+        with self._cond:
+            for slot in self._transports:
+                if not slot.primary and slot.client is not None:
+                    try:
+                        slot.client.close()
+                    except Exception:
+                        pass
+            self._transports = []
+
+
+def pool_stats():
+    """Returns the metrics of the pools which opened at least a channel."""
+    return {p.name: p.stats() for p in list(_pools) if p.metrics["opened"]}
+
+
+def format_pool_stats():
+    """Returns a summary line per pool ordered by the time spent waiting."""
+    stats = sorted(pool_stats().items(), key=lambda x: -x[1]["wait_time"])
+    lines = [
+        f"{name}: {s['opened']} channels, peak {s['peak']}, {s['transports']} "
+        f"transports, {s['waits']} waits ({s['wait_time']}s), "
+        f"{s['saturations']} refused, {s['reconnects']} reconnects"
+        for name, s in stats
+    ]
+    return "\n".join(["SSH channel pool usage:"] + lines) if lines else ""
@@ -32,6 +32,7 @@ from compute.onecloud import (
     resolve_project_for_site,
 )
 from compute.openstack import CephVMNodeV2, NetworkOpFailure, NodeError, VolumeOpFailure
+from compute.scheduler import ProvisionScheduler
 from utility.log import Log
 from utility.retry import retry
 from utility.utils import (
@@ -41,7 +42,9 @@ from utility.utils import (
     parse_custom_config_list,
 )
 
-from .ceph import Ceph, CommandFailed, RolesContainer
+from . import inventory
+from .ceph import Ceph, RolesContainer
+from .health_watcher import find_watcher, pgs_active_clean
 from .parallel import parallel
 
 log = Log(__name__)
@@ -280,6 +283,9 @@ def create_ibmc_ceph_nodes(
         else:
             params["root-login"] = True
 
+        # Throttling the spawning of VSI's to avoid hammering of provisioner,
+        # the soft errors are retried by setup_vm_node_ibm itself.
+        scheduler = ProvisionScheduler.from_custom_config(custom_config, retries=0)
         with parallel() as p:
             for node in range(1, 100):
                 node = "node" + str(node)
@@ -312,11 +318,10 @@ def create_ibmc_ceph_nodes(
                 if node_dict.get("cloud-data"):
                     node_params["cloud-data"] = node_dict.get("cloud-data")
 
-                # Throttling the spawning of VSI's to avoid hammering of provisioner
-                sleep(node_count * 5)
                 node_count += 1
-
-                p.spawn(setup_vm_node_ibm, node, ceph_nodes, **node_params)
+                p.spawn(
+                    scheduler.run, setup_vm_node_ibm, node, ceph_nodes, **node_params
+                )
 
     if len(ceph_nodes) != node_count:
         log.error(
@@ -536,6 +541,7 @@ def create_onecloud_ceph_nodes(
         version_preference = str(version_preference).strip() or None
     excluded_images = []
     resp = None
+    scheduler = ProvisionScheduler.from_custom_config(custom_config)
     for _ in range(5):  # Max 5 image attempts
         image_id = resolve_image_for_site(
             client,
@@ -566,7 +572,7 @@ def create_onecloud_ceph_nodes(
             body["arch"] = arch
 
         log.info("Deploying OneCloud cluster with %d VMs", len(virtual_machines))
-        resp = client.post("/clusters", json=body)
+        resp = scheduler.run(client.post, "/clusters", json=body)
         if resp.status_code in (200, 201):
             break
         err_text = resp.text.lower()
@@ -776,9 +782,10 @@ def create_ceph_nodes(
         else:
             params["root-login"] = True
 
+        # Rate limited only, the soft errors are retried by the setup method
+        scheduler = ProvisionScheduler.from_custom_config(custom_config, retries=0)
         with parallel() as p:
             for node in range(1, 100):
-                sleep(10 * node)
                 node = "node" + str(node)
                 if not ceph_cluster.get(node):
                     break
@@ -815,7 +822,7 @@ def create_ceph_nodes(
                 if node_dict.get("cloud-data"):
                     node_params["cloud-data"] = node_dict.get("cloud-data")
                 node_count += 1
-                p.spawn(setup_vm_node, node, ceph_nodes, **node_params)
+                p.spawn(scheduler.run, setup_vm_node, node, ceph_nodes, **node_params)
 
     if len(ceph_nodes) != node_count:
         log.error(
@@ -960,6 +967,8 @@ def create_aws_ceph_nodes(
         else:
             params["root-login"] = True
 
+        # Rate limited only, the soft errors are retried by the setup method
+        scheduler = ProvisionScheduler.from_custom_config(custom_config, retries=0)
         with parallel() as p:
             for node in range(1, 100):
                 node_key = "node" + str(node)
@@ -995,9 +1004,14 @@ def create_aws_ceph_nodes(
                 if node_dict.get("cloud-data"):
                     node_params["cloud-data"] = node_dict.get("cloud-data")
 
-                sleep(node_count * 5)
                 node_count += 1
-                p.spawn(setup_vm_node_aws, node_key, ceph_nodes, **node_params)
+                p.spawn(
+                    scheduler.run,
+                    setup_vm_node_aws,
+                    node_key,
+                    ceph_nodes,
+                    **node_params,
+                )
 
     if node_count and len(ceph_nodes) != node_count:
         log.error(
@@ -1250,8 +1264,13 @@ def check_ceph_healthly(
     pending_states = ["peering", "activating", "creating"]
     valid_states = ["active+clean"]
 
-    out = None
-    while datetime.datetime.now() - starttime <= timeout:
+    # The ceph -w stream gets only part of the timeout, so that a ceph -s
+    # can still confirm it, or poll for the rest of the timeout.
+    watcher = find_watcher([ceph_mon])
+    if watcher:
+        watcher.wait_for(pgs_active_clean(), timeout.total_seconds() * 0.8)
+
+    while True:
         if mon_container:
             distro_info = ceph_mon.distro_info
             distro_ver = distro_info["VERSION_ID"]
@@ -1273,6 +1292,8 @@ def check_ceph_healthly(
         if not any(state in out for state in pending_states):
             if all(state in out for state in valid_states):
                 break
+        if datetime.datetime.now() - starttime > timeout:
+            break
         sleep(5)
     log.info(out)
     if not all(state in out for state in valid_states):
@@ -1498,6 +1519,9 @@ def get_ceph_versions(ceph_nodes, containerized=False):
     """
     Log and return the ceph or ceph-ansible versions for each node in the cluster.
 
+    The daemon versions are fetched from the cluster inventory, i.e. a single
+    orchestrator query or a single command per node executed concurrently.
+
     Args:
         ceph_nodes: nodes in the cluster
         containerized: is the cluster containerized or not
@@ -1505,75 +1529,7 @@ def get_ceph_versions(ceph_nodes, containerized=False):
     Returns:
         A dict of the name / version pair for each node or container in the cluster
     """
-    versions_dict = {}
-
-    for node in ceph_nodes:
-        try:
-            if node.role == "installer":
-                if node.pkg_type == "rpm":
-                    out, rc = node.exec_command(cmd="rpm -qa | grep ceph-ansible")
-                else:
-                    out, rc = node.exec_command(cmd="dpkg -s ceph-ansible")
-                log.info(out)
-                versions_dict.update({node.shortname: out.rstrip()})
-
-            else:
-                if containerized:
-                    containers = []
-                    # client and grafana role not supported for ceph commands
-                    if node.role == "client" or node.role == "grafana":
-                        pass
-                    else:
-                        distro_info = node.distro_info
-                        distro_ver = distro_info["VERSION_ID"]
-                        if distro_ver.startswith("8"):
-                            out, rc = node.exec_command(
-                                sudo=True, cmd='podman ps --format "{{.Names}}"'
-                            )
-                        else:
-                            out, rc = node.exec_command(
-                                sudo=True, cmd='docker ps --format "{{.Names}}"'
-                            )
-                        containers = [
-                            container
-                            for container in out.split("\n")
-                            if container != ""
-                        ]
-                        log.info("Containers: {}".format(containers))
-
-                    for container_name in containers:
-                        # node-exporter container not supported for ceph commands
-                        if container_name != "node-exporter":
-                            if distro_ver.startswith("8"):
-                                out, rc = node.exec_command(
-                                    sudo=True,
-                                    cmd="sudo podman exec {container} ceph --version".format(
-                                        container=container_name
-                                    ),
-                                )
-                            else:
-                                out, rc = node.exec_command(
-                                    sudo=True,
-                                    cmd="sudo docker exec {container} ceph --version".format(
-                                        container=container_name
-                                    ),
-                                )
-                        log.info(out)
-                        versions_dict.update({container_name: out.rstrip()})
-
-                else:
-                    #  client and grafana role not supported for ceph commands
-                    if node.role == "client" or node.role == "grafana":
-                        pass
-                    out, rc = node.exec_command(cmd="ceph --version")
-                    output = out.rstrip()
-                    log.info(output)
-                    versions_dict.update({node.shortname: output})
-
-        except CommandFailed:
-            log.info("No ceph versions on {}".format(node.shortname))
-
-    return versions_dict
+    return inventory.get_ceph_versions(ceph_nodes, containerized)
 
 
 def hard_reboot(gyaml, name=None):
@@ -2043,7 +1999,7 @@ def get_daemon_versions(node, daemon_type: str, daemon_id: str = None):
     if daemon_id:
         out = get_daemon_metadata(node, daemon_type, daemon_id)
     else:
-        out, _ = node.exec_command(sudo=True, cmd="cephadm shell ceph versions -f json")
+        out = inventory.query(node, "cephadm shell -- ceph versions -f json")
     try:
         ceph_versions = json.loads(out)
     except json.JSONDecodeError as e:
@@ -2073,13 +2029,10 @@ def get_daemon_metadata(node, daemon_type: str, daemon_id: str = None):
         None if metadata is not found
     """
     log.debug("Passed daemon type : %s, Daemon ID : %s", daemon_type, daemon_id)
-    base_cmd = f"cephadm shell ceph {daemon_type} metadata "
-    if daemon_id is not None:
-        base_cmd += daemon_id
-
     for _ in range(3):
         try:
-            out, _ = node.exec_command(cmd=base_cmd, sudo=True)
+            # Served from the cluster inventory cache when recently fetched
+            out = inventory.get_metadata(node, daemon_type, daemon_id)
             break
         except Exception as e:
             debug_msg = f"Passed daemon type : {daemon_type}, Daemon ID : {daemon_id}, Error : {e}"
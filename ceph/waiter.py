@@ -1,7 +1,39 @@
-"""Helper object to encapsulate waiting for timeouts"""
+"""Helper object to encapsulate waiting for timeouts
 
+WaitUntil is an iterable yielding the attempts of a wait-retry loop. The first
+attempt is immediate and the next ones are made every ``interval``. The last
+attempt is made at the deadline, never past it.
+
+With a ``backoff`` above 1, the delay between the attempts grows exponentially
+from ``initial`` up to ``interval`` with a random ``jitter``, hence a condition
+which settles quickly is detected quickly while long waits still poll at the
+given interval. The adaptive mode is opted in by passing ADAPTIVE as kwargs.
+
+Usage:
+    for w in WaitUntil(timeout=600, interval=30):
+        if is_ready():
+            break
+    if w.expired:
+        raise Exception("Not ready")
+
+    # Or with a condition, returns its last result
+    if not WaitUntil(timeout=600, interval=30).poll(is_ready):
+        raise Exception("Not ready")
+
+    # Adaptive delays, 1s after the first attempt growing up to 30s
+    WaitUntil(timeout=600, interval=30, **ADAPTIVE).poll(is_ready)
+"""
+
+import random
 import time
 
+from utility.log import Log
+
+log = Log(__name__)
+
+# Opt-in adaptive delays
+ADAPTIVE = {"initial": 1, "backoff": 1.5, "jitter": 0.1}
+
 
 class WaitUntil(object):
     """A wait-retry loop as iterable.
@@ -10,12 +42,43 @@ class WaitUntil(object):
     to write the retry logic in a for-loop.
     """
 
-    def __init__(self, timeout=60, interval=1):
+    def __init__(
+        self,
+        timeout=60,
+        interval=1,
+        initial=None,
+        backoff=1,
+        jitter=0,
+        condition=None,
+        name=None,
+    ):
+        """
+        Args:
+            timeout (int): deadline of the wait in seconds
+            interval (int): maximum delay between two attempts in seconds
+            initial (int): delay before the second attempt, capped by interval,
+                interval when not provided
+            backoff (float): growth factor of the delay, 1 (default) for a fixed
+                interval
+            jitter (float): fraction of the delay randomized
+            condition (callable): checked before every attempt, stops the
+                iteration once it returns a truthy value e.g. an abort check
+            name (str): name of the wait used in the metrics log
+        """
         self.timeout = timeout
         self.interval = interval
+        self.backoff = max(backoff, 1)
+        fixed = not initial or self.backoff == 1
+        self.initial = interval if fixed else min(initial, interval)
+        self.jitter = jitter
+        self.condition = condition
+        self.name = name
         self.expired = False
+        self.result = None
+        self.time_to_condition = None
         self._attempt = 0
         self._start = None
+        self._delay = self.initial
 
     def __iter__(self):
         return self
@@ -23,10 +86,85 @@ class WaitUntil(object):
     def __next__(self):
         if self._start is None:
             self._start = time.time()
-        if time.time() - self._start > self.timeout:
-            self.expired = True
+
+        if self.condition and self._check():
             raise StopIteration()
+
         if self._attempt != 0:
-            time.sleep(self.interval)
+            remaining = max(self.remaining, 0)
+            if remaining <= 0:
+                self._expire()
+            time.sleep(min(self._next_delay(), remaining))
+
         self._attempt += 1
         return self
+
+    def _next_delay(self):
+        delay = self._delay
+        self._delay = min(self._delay * self.backoff, self.interval)
+        if self.jitter:
+            delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        return max(delay, 0)
+
+    def _check(self):
+        self.result = self.condition()
+        if self.result:
+            self.time_to_condition = self.elapsed
+            self._log()
+        return bool(self.result)
+
+    def _expire(self):
+        self.expired = True
+        self._log()
+        raise StopIteration()
+
+    def _log(self):
+        log.debug(
+            f"Wait {self.name or ''} {'expired' if self.expired else 'completed'} "
+            f"after {self._attempt} attempts in {self.elapsed:.2f}s"
+        )
+
+    @property
+    def attempts(self):
+        return self._attempt
+
+    @property
+    def elapsed(self):
+        return 0.0 if self._start is None else time.time() - self._start
+
+    @property
+    def remaining(self):
+        return self.timeout - self.elapsed
+
+    def metrics(self):
+        """Returns the attempts and timings of the wait."""
+        return {
+            "name": self.name,
+            "attempts": self._attempt,
+            "elapsed": round(self.elapsed, 3),
+            "expired": self.expired,
+            "time_to_condition": (
+                round(self.time_to_condition, 3)
+                if self.time_to_condition is not None
+                else None
+            ),
+        }
+
+    def poll(self, condition):
+        """Checks the condition until it holds or the deadline.
+
+        The first check is immediate.
+
+        Args:
+            condition (callable): returns a truthy value once satisfied
+
+        Returns:
+            the last result of the condition
+        """
+        for _ in self:
+            self.result = condition()
+            if self.result:
+                self.time_to_condition = self.elapsed
+                self._log()
+                break
+        return self.result
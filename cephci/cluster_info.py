@@ -2,20 +2,15 @@ import json
 import os
 import pickle
 import re
+import shlex
+from time import time
 
 import yaml
 from docopt import docopt
 
+from ceph.ceph import stream_channel
+from ceph.parallel import parallel
 from cli.cephadm.cephadm import CephAdm
-from cli.utilities.packages import Rpm, SubscriptionManager
-from cli.utilities.utils import (
-    exec_command_on_container,
-    get_container_images,
-    get_disk_list,
-    get_kernel_version,
-    get_release_info,
-    get_running_containers,
-)
 from utility.log import Log
 
 log = Log(__name__)
@@ -23,6 +18,13 @@ log = Log(__name__)
 CEPH_VAR_LOG_DIR = "/var/log/ceph"
 _CEPH_VAR_LOG_DIR = "var/log/ceph"
 CEPH_COREDUMP_DIR = "/var/lib/systemd/coredump/"
+_CEPH_COREDUMP_DIR = "var/lib/systemd/coredump"
+
+# Maximum number of nodes probed concurrently
+MAX_WORKERS = 16
+INSTALLED_PACKAGES = ["cephadm", "ansible", "cephadm-ansible", "podman"]
+PROBE_MARKER = "### cephci-probe"
+STREAM_CHUNK_SIZE = 1048576
 
 doc = """
 Utility to gather cluster information
@@ -53,21 +55,6 @@ def _load_cluster_config(config):
     return cluster
 
 
-def get_node_details(node):
-    """Gather node details"""
-    kernel_ver, _ = get_kernel_version(sudo=True, node=node)
-    release_info, _ = get_release_info(sudo=True, node=node)
-
-    repos = SubscriptionManager(node).repos.list("enabled")
-    repos = re.findall(r"Repo ID:(.*)(\s+)", repos)
-
-    return {
-        "Linux_kernel_version": kernel_ver.strip(),
-        "RedHat_release_info": release_info.strip(),
-        "Repos_enabled": [repo.strip() for repo, _ in repos],
-    }
-
-
 def get_cluster_details(node):
     """Gather cluster cluster details"""
     ceph, kw = CephAdm(node).ceph, {"format": "json"}
@@ -79,87 +66,183 @@ def get_cluster_details(node):
     return details
 
 
-def get_osd_host_disks(node):
-    """Gather OSD host disks details"""
-    disks, _ = get_disk_list(sudo=True, check_ec=False, node=node, expr="ceph-")
-    if disks:
-        disks = disks.strip().split("\n")
+def _probe_script(node):
+    """Returns the script gathering all the node details in one invocation.
+
+    The output of every probe is preceded by a marker line holding its name.
+    """
+    probes = [
+        ("kernel", "uname -a"),
+        ("release", "cat /etc/redhat-release"),
+        ("repos", "subscription-manager repos --list-enabled"),
+        ("packages", f"rpm --query {' '.join(INSTALLED_PACKAGES)}"),
+    ]
+    if node.role != "client":
+        probes.extend(
+            [
+                (
+                    "images",
+                    'podman images --noheading --format "{{.Repository}} {{.Tag}}"',
+                ),
+                (
+                    "containers",
+                    'podman ps --noheading --format "{{.ID}} {{.Image}} {{.Names}}"',
+                ),
+            ]
+        )
 
-    return disks
+    if node.role == "osd":
+        probes.append(("disks", "lsblk -ln -o name | grep ceph-"))
 
+    script = [
+        f"echo '{PROBE_MARKER} {name}'; {cmd} 2>/dev/null" for name, cmd in probes
+    ]
+    if node.role != "client":
+        script.append(
+            "for ctr in $(podman ps --noheading --format '{{.ID}}' 2>/dev/null); do "
+            f'echo "{PROBE_MARKER} container $ctr"; '
+            "podman exec $ctr /bin/sh -c 'rpm -qa | grep ceph' 2>/dev/null; done"
+        )
 
-def get_installed_packages(node):
-    """Gether ceph installed package details"""
-    packages = ["cephadm", "ansible", "cephadm-ansible", "podman"]
-    rpm, installed = Rpm(node), []
-    for pkg in packages:
-        version = rpm.query(pkg)
-        if version:
-            installed.append(version)
+    return "; ".join(script)
 
-    return installed
 
+def _parse_probes(out):
+    """Returns the output of the probes keyed by the probe name."""
+    probes, name = {}, None
+    for line in out.splitlines():
+        if line.startswith(PROBE_MARKER):
+            name = line[len(PROBE_MARKER) :].strip()
+            probes[name] = []
+        elif name and line.strip():
+            probes[name].append(line.strip())
 
-def get_container_images_details(node):
-    """Gather container image details"""
-    images, _ = get_container_images(
-        sudo=True, node=node, format="{{.Repository}} {{.Tag}}"
-    )
+    return probes
 
-    if not images:
-        return []
 
-    details = []
-    for image in images.strip().split("\n"):
-        name, tag = image.split()
-        details.append({"Name": name, "Tag": tag})
+def probe_node(node):
+    """Gather the node details using a single batched remote script"""
+    out, _ = node.exec_command(
+        sudo=True, cmd=f"bash -c {shlex.quote(_probe_script(node))}", check_ec=False
+    )
+    probes = _parse_probes(out)
 
-    return details
+    repos = re.findall(r"Repo ID:(.*)(\s+)", "\n".join(probes.get("repos", [])) + "\n")
+    info = {
+        "Linux_kernel_version": "\n".join(probes.get("kernel", [])),
+        "RedHat_release_info": "\n".join(probes.get("release", [])),
+        "Repos_enabled": [repo.strip() for repo, _ in repos],
+        "List_of_packages": [
+            pkg for pkg in probes.get("packages", []) if "is not installed" not in pkg
+        ],
+    }
 
+    if node.role == "installer":
+        info["Cluster_details"] = get_cluster_details(node)
 
-def get_container_details(node):
-    """Gather container information"""
-    ctrs, _ = get_running_containers(
-        sudo=True, node=node, format="{{.ID}} {{.Image}} {{.Names}}"
-    )
-    if not ctrs:
-        return []
+    if node.role != "client":
+        info["List_of_images"] = [
+            {"Name": name, "Tag": tag}
+            for name, tag in (i.split() for i in probes.get("images", []))
+        ]
 
-    _info = []
-    for ctr in ctrs.strip().split("\n"):
-        id, image, name = ctr.split()
-        details = {"ID": id, "Image": image, "Name": name}
+        containers = []
+        for ctr in probes.get("containers", []):
+            id, image, name = ctr.split()
+            details = {"ID": id, "Image": image, "Name": name}
+            pkgs = probes.get(f"container {id}")
+            if pkgs:
+                details["Packages"] = pkgs
+            containers.append(details)
+        info["List_of_containers"] = containers
 
-        pkgs, _ = exec_command_on_container(
-            sudo=True, check_ec=False, node=node, ctr=id, cmd="rpm -qa | grep ceph"
-        )
-        if pkgs:
-            details["Packages"] = pkgs.strip().split("\n")
+    if node.role == "osd":
+        info["List_of_host_ceph_disks"] = probes.get("disks", [])
 
-        _info.append(details)
+    return node.hostname, info
 
-    return _info
 
+def gather_info(cluster, workers=MAX_WORKERS):
+    """Gather cluster configuration info
 
-def gather_info(cluster):
-    """Gather cluster configuration info"""
+    All the nodes are probed concurrently using a bounded pool of workers.
+    """
     info, nodes = {}, cluster.get_nodes()
+    with parallel(max_workers=workers) as p:
+        for node in nodes:
+            p.spawn(probe_node, node)
+
+    details = dict(p.results)
     for node in nodes:
-        _info = get_node_details(node)
-        _info.update({"List_of_packages": get_installed_packages(node)})
-        if node.role == "installer":
-            _info.update({"Cluster_details": get_cluster_details(node)})
+        info.update({node.hostname: details[node.hostname]})
 
-        if node.role != "client":
-            _info.update({"List_of_images": get_container_images_details(node)})
-            _info.update({"List_of_containers": get_container_details(node)})
+    return info
 
-        if node.role == "osd":
-            _info.update({"List_of_host_ceph_disks": get_osd_host_disks(node)})
 
-        info.update({node.hostname: _info})
+def stream_tarball(node, paths, dst, cwd="/", timeout=3600):
+    """Download a tarball of the remote paths compressed on the fly.
+
+    The archive is written to the standard output of tar and streamed over the
+    SSH channel to the local file, nothing is staged on the node. The warnings
+    of tar are drained while streaming so they cannot stall the archive.
+
+    Args:
+        node (CephNode): node hosting the files
+        paths (list): paths relative to cwd to be archived
+        dst (str): local path of the tarball
+        cwd (str): directory of the node the paths are relative to
+        timeout (int): maximum time allowed between two reads in seconds
+
+    Returns:
+        size of the tarball in bytes
+    """
+    cmd = (
+        f"tar -C {shlex.quote(cwd)} --warning=no-file-changed --ignore-failed-read "
+        f"-czf - {' '.join(shlex.quote(p) for p in paths)}"
+    )
+    log.info(f"Streaming {paths} from {node.hostname} to {dst}")
+    pool = node.root_connection.pool
+    slot, channel = pool.acquire(timeout=timeout)
+    channel.settimeout(timeout)
+    channel.exec_command(cmd)
+
+    _start, size, err = time(), 0, bytearray()
+    try:
+        with open(dst, "wb") as fh:
+            for data in stream_channel(channel, err, timeout, STREAM_CHUNK_SIZE):
+                fh.write(data)
+                size += len(data)
+
+        # tar returns 1 when files changed while being archived
+        rc = channel.recv_exit_status()
+        if rc > 1:
+            err = err.decode(errors="replace")
+            log.error(f"Archiving {paths} failed on {node.hostname} with {rc}: {err}")
+    finally:
+        pool.release(slot, channel)
+
+    log.info(
+        f"Downloaded {size} bytes from {node.hostname} in {time() - _start:.2f} seconds"
+    )
+    return size
 
-    return info
+
+def _collect_tarballs(cluster, paths, download_dir, suffix, workers=MAX_WORKERS):
+    """Stream the tarballs of all the nodes concurrently.
+
+    Collection is best effort, failure on a node does not affect the others.
+    """
+
+    def _collect(node):
+        tar_file = f"{node.hostname}-{suffix}.tar"
+        try:
+            stream_tarball(node, paths, os.path.join(download_dir, tar_file))
+        except Exception as err:
+            log.error(f"Failed to download {tar_file} from {node.hostname}: {err}")
+
+    with parallel(max_workers=workers) as p:
+        for node in cluster.get_nodes():
+            p.spawn(_collect, node)
 
 
 def get_ceph_var_logs(cluster, log_dir):
@@ -169,19 +252,7 @@ def get_ceph_var_logs(cluster, log_dir):
     """
     download_dir = os.path.join(log_dir, "ceph_logs")
     os.makedirs(download_dir, exist_ok=True)
-    for node in cluster.get_nodes():
-        tar_file = f"{node.hostname}-cephlog.tar"
-        node.exec_command(
-            cmd=f"tar -C / --warning=no-file-changed -cvzf {tar_file} {_CEPH_VAR_LOG_DIR}",
-            sudo=True,
-        )
-
-        node.download_file(
-            src=tar_file,
-            dst=os.path.join(download_dir, tar_file),
-            sudo=True,
-        )
-        log.info(f"Downloading {tar_file} from {node.hostname} to {download_dir}")
+    _collect_tarballs(cluster, [_CEPH_VAR_LOG_DIR], download_dir, "cephlog")
 
 
 def collect_ceph_coredumps(cluster, _dir):
@@ -191,16 +262,7 @@ def collect_ceph_coredumps(cluster, _dir):
     """
     download_dir = os.path.join(_dir, "ceph_coredumps")
     os.makedirs(download_dir, exist_ok=True)
-    for node in cluster.get_nodes():
-        tar_file = f"{node.hostname}-coredump.tar"
-        node.exec_command(cmd=f"tar -cvzf {tar_file} {CEPH_COREDUMP_DIR}", sudo=True)
-
-        node.download_file(
-            src=tar_file,
-            dst=os.path.join(download_dir, tar_file),
-            sudo=True,
-        )
-        log.info(f"Downloading {tar_file} from {node.hostname} to {download_dir}")
+    _collect_tarballs(cluster, [_CEPH_COREDUMP_DIR], download_dir, "coredump")
 
 
 def write_output(data, output):
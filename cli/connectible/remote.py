@@ -1,7 +1,9 @@
+import asyncio
 import socket
 
 import paramiko
 
+from ceph.async_exec import read_channel
 from cli.exceptions import RemoteConnectionError, UnexpectedStateError
 from cli.utilities.waiter import WaitUntil
 from utility.log import Log
@@ -80,6 +82,40 @@ class Remote:
 
         return stdout, stderr
 
+    async def arun(self, cmd, timeout=600):
+        """Execute command on host from an event loop
+
+        Args:
+            cmd (str): Command to be executed
+            timeout (int): Command timeout
+        """
+        LOG.info(f"[{self._host}] Executing command - {cmd}")
+
+        def _open():
+            channel = self._client.get_transport().open_session()
+            channel.exec_command(command=cmd)
+            return channel
+
+        try:
+            channel = await asyncio.get_running_loop().run_in_executor(None, _open)
+        except Exception as e:
+            LOG.error(f"Command '{cmd}' execution failed with error -\n{e}")
+            raise RemoteConnectionError(e)
+
+        try:
+            stdout, stderr, _ = await read_channel(channel, timeout)
+        except asyncio.TimeoutError:
+            raise UnexpectedStateError(
+                f"Failed to complete command within {timeout} sec"
+            )
+        finally:
+            channel.close()
+
+        # Format command output
+        stdout = "\n".join(map(lambda x: x.strip(), stdout.splitlines()))
+        stderr = "\n".join(map(lambda x: x.strip(), stderr.splitlines()))
+        return stdout, stderr
+
     def run_async(self, cmd, interval=10, timeout=300):
         """Execute command in background on host
 
@@ -1,6 +1,7 @@
 import itertools
 
 from cli import Cli
+from utility.fio_results import collect_fio_results
 
 
 class Fio(Cli):
@@ -13,6 +14,7 @@ class Fio(Cli):
         self.sizes = None
         self.iodepth_values = None
         self.numjobs = None
+        self.outputs = {}
 
     def create_config(self):
         """
@@ -96,10 +98,17 @@ iodepth= {iodepth}
                 )
                 self.execute(long_running=True, cmd=cmd)
             else:
-                cmd = (
-                    f"fio {file} --output-format=json "
-                    f"--output={file}_{self.ctx.hostname}_{mount_dir.replace('/', '')}.json"
-                )
+                output = f"{file}_{self.ctx.hostname}_{mount_dir.replace('/', '')}.json"
+                cmd = f"fio {file} --output-format=json --output={output}"
                 self.execute(sudo=True, long_running=True, cmd=cmd)
+                self.outputs[output] = f"{mount_dir}:{file}"
 
         return True
+
+    def collect_results(self, save_dir=None):
+        """
+        Pulls the JSON reports of the runs and returns the fio records
+        Args:
+            save_dir (str): local directory to store the raw reports
+        """
+        return collect_fio_results(self.ctx, self.outputs, save_dir=save_dir)
@@ -0,0 +1,204 @@
+"""Rate limited scheduler for cloud provisioning requests.
+
+Spawning all the nodes of a cluster at once hammers the cloud provisioner and
+results in quota or throttling errors whereas staggering them with fixed sleeps
+wastes time. The scheduler bounds the request rate using a token bucket,
+optionally limits the number of requests in flight and retries throttled
+requests with an exponential backoff having full jitter.
+
+The calls already wrapped by a retry decorator, like setup_vm_node, are only
+rate limited so that a single layer retries them.
+
+Example::
+
+    scheduler = ProvisionScheduler.from_custom_config(custom_config, retries=0)
+    with parallel() as p:
+        for node in nodes:
+            p.spawn(scheduler.run, setup_vm_node, node, ceph_nodes, **params)
+"""
+
+import random
+import threading
+from contextlib import nullcontext
+from time import monotonic, sleep
+
+from utility.log import Log
+from utility.utils import parse_custom_config_list
+
+LOG = Log(__name__)
+
+THROTTLE_STATUS_CODES = (429,)
+THROTTLE_PATTERNS = (
+    "too many requests",
+    "rate limit",
+    "ratelimit",
+    "throttl",
+    "requestlimitexceeded",
+    "insufficientinstancecapacity",
+)
+
+
+class ProvisionThrottled(Exception):
+    """Raised when the cloud API keeps throttling the provisioning request."""
+
+    pass
+
+
+class TokenBucket:
+    """Thread safe token bucket controlling the request rate."""
+
+    def __init__(self, rate, burst=1):
+        """
+        Args:
+            rate (float): tokens added per second
+            burst (int): maximum number of tokens in the bucket
+        """
+        self.rate = float(rate)
+        self.burst = max(int(burst), 1)
+        self._tokens = float(self.burst)
+        self._updated = monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Blocks until a token is available and consumes it."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                _wait = (1 - self._tokens) / self.rate
+
+            sleep(_wait)
+
+
+def is_throttled(response=None, error=None):
+    """Checks whether the response or the exception denotes API throttling.
+
+    Args:
+        response: HTTP response like object having status_code attribute
+        error (Exception): exception raised by the cloud API call
+
+    Returns:
+        True if the request was rejected due to rate limits.
+    """
+    if response is not None:
+        return getattr(response, "status_code", None) in THROTTLE_STATUS_CODES
+
+    if error is None:
+        return False
+
+    for attr in ("status_code", "code", "http_code"):
+        if getattr(error, attr, None) in THROTTLE_STATUS_CODES:
+            return True
+
+    _msg = f"{type(error).__name__} {error}".lower()
+    return any(pattern in _msg for pattern in THROTTLE_PATTERNS)
+
+
+class ProvisionScheduler:
+    """Bounds the rate and concurrency of provisioning requests."""
+
+    def __init__(
+        self,
+        rate=0.5,
+        burst=2,
+        max_in_flight=None,
+        retries=5,
+        base_delay=5,
+        max_delay=120,
+    ):
+        """
+        Args:
+            rate (float): provisioning requests allowed per second
+            burst (int): requests allowed to be issued back to back
+            max_in_flight (int): maximum number of calls being processed, not
+                                 bounded by default. The whole call is bounded
+                                 i.e. including the boot of the VM.
+            retries (int): number of retries on throttling errors
+            base_delay (int): initial backoff in seconds
+            max_delay (int): upper bound of the backoff in seconds
+        """
+        self.bucket = TokenBucket(rate, burst)
+        self.max_in_flight = max(int(max_in_flight), 1) if max_in_flight else None
+        self.retries = int(retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._slots = (
+            threading.BoundedSemaphore(self.max_in_flight)
+            if self.max_in_flight
+            else nullcontext()
+        )
+
+    @classmethod
+    def from_custom_config(cls, custom_config=None, **kwargs):
+        """Returns a scheduler configured using --custom-config overrides.
+
+        Supported keys are provision_rate, provision_burst,
+        provision_max_in_flight and provision_retries. The given keyword
+        arguments take precedence over the overrides.
+        """
+        overrides = parse_custom_config_list(custom_config)
+        for key, _type in (
+            ("rate", float),
+            ("burst", int),
+            ("max_in_flight", int),
+            ("retries", int),
+        ):
+            if key not in kwargs and overrides.get(f"provision_{key}"):
+                kwargs[key] = _type(overrides[f"provision_{key}"])
+
+        return cls(**kwargs)
+
+    def backoff(self, attempt):
+        """Returns the delay for the given attempt using full jitter."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def run(self, func, *args, **kwargs):
+        """Execute the provisioning call honouring the rate and in-flight limits.
+
+        Args:
+            func: provisioning method to be executed
+            args: positional arguments of the method
+            kwargs: keyword arguments of the method
+
+        Returns:
+            the value returned by the method
+
+        Raises:
+            ProvisionThrottled: when the response is throttled even after retries
+        """
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            with self._slots:
+                try:
+                    result = func(*args, **kwargs)
+                    if not is_throttled(response=result):
+                        return result
+                    error = None
+                except Exception as e:
+                    if not is_throttled(error=e):
+                        raise
+                    error = e
+
+            if attempt >= self.retries:
+                if error is not None:
+                    raise error
+                raise ProvisionThrottled(
+                    f"{getattr(func, '__name__', func)} throttled after {attempt} retries"
+                )
+
+            _delay = self.backoff(attempt)
+            attempt += 1
+            LOG.warning(
+                f"{getattr(func, '__name__', func)} was throttled, retrying in "
+                f"{_delay:.1f} seconds (Attempt {attempt}/{self.retries})"
+            )
+            sleep(_delay)
@@ -7,6 +7,7 @@ import sys
 
 import yaml
 from docopt import docopt
+from stage_planner import load_history, load_or_plan, plan_stages
 
 log = logging.getLogger(__name__)
 doc = """
@@ -15,6 +16,7 @@ This script fetches all the tests to be run for a pipeline based on the RHCS ver
     Usage:
         getPipelineStages.py --rhcephVersion <VER> --tags <tags>
                   [--overrides <str>]
+                  [--quota <nodes>] [--history <dir>] [--plan-file <file>]
 
         getPipelineStages.py (-h | --help)
 
@@ -23,6 +25,12 @@ This script fetches all the tests to be run for a pipeline based on the RHCS ver
         -v --rhcephVersion VER     The rhcephVersion for which test stages need to be fetched
         -t --tags <str>    tags to be used for filtering test scripts
         -o --overrides <str>       Overrides to be considered for execution
+        --quota <nodes>            Plan the stages from the suite durations, with
+                                   at most the given number of nodes at once
+        --history <dir>            Directory holding the xunit results of the
+                                   previous runs used by the planner
+        --plan-file <file>         Plan reused by the next stages, defaults to
+                                   <workspace>/stage-plan.json
 """
 
 
@@ -31,6 +39,54 @@ def generate_random_string(length):
     return "".join(random.choices(string.ascii_lowercase + string.digits, k=length))
 
 
+def plan_pipeline(args, data, tags, overrides):
+    """
+    Plan the stages of the suites matching the tags, regardless of their stage tag
+    Args:
+        args: arguments of fetch_stages, with the quota
+        data: suites of the metadata file
+        tags: tags provided, the stage-N tag selects the planned stage
+        overrides: overrides provided, the plan is stored in the workspace
+
+    Returns:
+        the suites of the requested stage, whether it is the final stage, the lane of
+        each suite and the timeline of all the stages
+    """
+    stage_tags = [tag for tag in tags if tag.startswith("stage-")]
+    suite_tags = [tag for tag in tags if not tag.startswith("stage-")]
+    number = int(stage_tags[0].split("-")[1]) if stage_tags else 1
+    suites = [d for d in data if all(tag in d["metadata"] for tag in suite_tags)]
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    repo_dir = os.path.abspath(f"{current_dir}/../../..")
+    history = load_history(args["history"]) if args.get("history") else dict()
+    workspace = overrides.get("workspace")
+    plan_file = args.get("plan_file") or (
+        f"{workspace}/stage-plan.json" if workspace else ""
+    )
+    key = ":".join(
+        [
+            str(args["rhcephVersion"]),
+            ",".join(sorted(suite_tags)),
+            str(overrides.get("build_number", "")),
+        ]
+    )
+    timeline = load_or_plan(
+        plan_file,
+        key,
+        lambda: plan_stages(suites, history, int(args["quota"]), repo_dir),
+    )
+
+    lanes = dict()
+    if number <= len(timeline):
+        for lane in timeline[number - 1]["lanes"]:
+            for suite in lane["suites"]:
+                lanes[suite["name"]] = lane["lane"]
+
+    selected = [d for d in suites if d["name"] in lanes]
+    return selected, number >= len(timeline), lanes, timeline
+
+
 def fetch_stages(args):
     """
     Fetch test stages to be executed based on the input provided
@@ -44,6 +100,9 @@ def fetch_stages(args):
                 "tags": comma separated string containing the tags based on which the stages should be filtered,
                 "overrides": <overrides in json format, all keys accepted by run.py are supported to be overridden
                             if any key similar to --store which does not have a value it can be passed as "store": ""
+                "quota": <nodes deployed at once, the stages are planned from the durations when provided>,
+                "history": <directory of the xunit results of the previous runs>,
+                "plan_file": <file storing the plan for the next stages>
             }
 
             Example:
@@ -59,6 +118,10 @@ def fetch_stages(args):
                 "execute_cli": ".venv/bin/python run.py ......",
                  "cleanup_cli": "...."
             .....
+
+        With a quota, the scripts also hold their lane, the suites of a lane
+        being executed one after the other, and the predicted timeline of all
+        the stages is added.
     """
     final_stage = False
     next_stage_data = []
@@ -96,6 +159,13 @@ def fetch_stages(args):
     if not next_stage_data:
         final_stage = True
 
+    # The stages planned from the durations take over the stage tags
+    lanes, timeline = dict(), None
+    if args.get("quota"):
+        filtered_data, final_stage, lanes, timeline = plan_pipeline(
+            args, data, tags, overrides
+        )
+
     test_scripts = dict()
     workspace = overrides.pop("workspace", "")
     build_number = overrides.pop("build_number", "")
@@ -142,8 +212,13 @@ def fetch_stages(args):
                 }
             }
         )
+        if script_name in lanes:
+            test_scripts[script_name]["lane"] = lanes[script_name]
 
     test_stages = {"scripts": test_scripts, "final_stage": final_stage}
+    if timeline:
+        test_stages["timeline"] = timeline
+        test_stages["predicted_duration"] = timeline[-1]["end"]
 
     return test_stages
 
@@ -156,6 +231,9 @@ if __name__ == "__main__":
         "tags": cli_args.get("--tags"),
         "overrides": cli_args.get("--overrides"),
         "metadata": cli_args.get("--metadata"),
+        "quota": cli_args.get("--quota"),
+        "history": cli_args.get("--history"),
+        "plan_file": cli_args.get("--plan-file"),
     }
     try:
         testStages = fetch_stages(arguments)
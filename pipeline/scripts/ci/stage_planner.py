@@ -0,0 +1,215 @@
+"""
+Plans the stages of a pipeline from the historical durations of its suites.
+
+The suites used to be grouped by their stage-N tags, hence every stage lasted
+as long as its slowest suite while the expensive suites piled up in the same
+stages. The planner packs the suites into sequential stages of parallel lanes,
+the suites of a lane being executed one after the other:
+
+    - the durations are the median of the xunit results written by run.py
+      with --xunit-results, the execution_time of the metadata or a default
+    - the cost of a suite is the number of nodes of its global-conf, the cost
+      of a lane its most expensive suite and the lanes of a stage must fit in
+      the cloud quota
+    - the longest pending suite opens a stage and sets its makespan, the next
+      longest suites are chained in the lanes with enough time left or open a
+      new lane while the quota allows it, the others wait for the next stage
+
+The plan is written to a file on the first call, so that the stages fetched
+one at a time by the pipeline are taken from the same plan even though the
+results of the previous stages are added to the history in between.
+"""
+
+import glob
+import json
+import os
+import re
+import statistics
+import xml.etree.ElementTree as ElementTree
+
+import yaml
+
+DEFAULT_DURATION = 3600
+HISTORY_RUNS = 5
+_TIME_UNITS = {"h": 3600, "m": 60, "s": 1}
+
+
+def parse_execution_time(value):
+    """Returns the seconds of a metadata execution_time e.g. "1h 26m 32s"."""
+    if not value:
+        return None
+    seconds = sum(
+        int(num) * _TIME_UNITS[unit]
+        for num, unit in re.findall(r"(\d+)\s*([hms])", str(value))
+    )
+    return seconds or None
+
+
+def load_history(history_dir, runs=HISTORY_RUNS):
+    """Returns the median duration of the last runs of every suite.
+
+    Args:
+        history_dir (str): directory searched recursively for xunit.xml files
+        runs (int): number of the most recent runs considered per suite
+
+    Returns:
+        a dict of the suite file and its duration in seconds
+    """
+    samples = dict()
+    files = glob.glob(os.path.join(history_dir, "**", "xunit.xml"), recursive=True)
+    for xml_file in sorted(files, key=os.path.getmtime):
+        try:
+            root = ElementTree.parse(xml_file).getroot()
+        except (ElementTree.ParseError, OSError):
+            continue
+
+        for suite in root.iter("testsuite"):
+            props = {
+                p.get("name"): (p.get("value") or "").strip()
+                for p in suite.iter("property")
+            }
+            name = props.get("suite-name") or suite.get("name")
+            duration = sum(float(tc.get("time") or 0) for tc in suite.iter("testcase"))
+            if name and duration:
+                samples.setdefault(name, list()).append(duration)
+
+    return {
+        name: statistics.median(durations[-runs:])
+        for name, durations in samples.items()
+    }
+
+
+def count_nodes(global_conf, repo_dir):
+    """Returns the number of nodes of all the clusters of the global-conf."""
+    try:
+        with open(os.path.join(repo_dir, global_conf)) as fh:
+            conf = yaml.safe_load(fh)
+    except (OSError, yaml.YAMLError, TypeError):
+        return 1
+
+    nodes = 0
+    for cluster in (conf or {}).get("globals", []):
+        nodes += sum(
+            1 for key in cluster.get("ceph-cluster", {}) if key.startswith("node")
+        )
+    return nodes or 1
+
+
+def _suite_duration(suite, history, default):
+    # run.py records the "::" joined suite files as the suite-name of the run
+    name = suite.get("suite", "")
+    for name in [name] + name.split("::"):
+        if name in history:
+            return history[name]
+    return parse_execution_time(suite.get("execution_time")) or default
+
+
+def plan_stages(suites, history, quota, repo_dir, default=DEFAULT_DURATION):
+    """Packs the suites into stages of lanes within the quota.
+
+    Args:
+        suites (list): suites of the metadata to be executed
+        history (dict): suite file and duration in seconds
+        quota (int): maximum number of nodes deployed at once
+        repo_dir (str): root of the repo holding the global-confs
+        default (int): duration of the suites without history
+
+    Returns:
+        the stages, a list of lanes each holding the suite names
+        along with the predicted timeline
+    """
+    known = [_suite_duration(s, history, None) for s in suites]
+    known = [d for d in known if d]
+    default = statistics.median(known) if known else default
+
+    pending = sorted(
+        (
+            {
+                "name": suite["name"],
+                "duration": round(_suite_duration(suite, history, default)),
+                "nodes": count_nodes(suite.get("global-conf"), repo_dir),
+            }
+            for suite in suites
+        ),
+        key=lambda s: (-s["duration"], s["name"]),
+    )
+
+    stages, start = list(), 0
+    while pending:
+        first = pending.pop(0)
+        makespan = first["duration"]
+        lanes = [{"suites": [first], "nodes": first["nodes"], "end": makespan}]
+
+        for suite in list(pending):
+            used = sum(lane["nodes"] for lane in lanes)
+            for lane in lanes:
+                extra = max(suite["nodes"] - lane["nodes"], 0)
+                if (
+                    lane["end"] + suite["duration"] <= makespan
+                    and used + extra <= quota
+                ):
+                    lane["suites"].append(suite)
+                    lane["nodes"] += extra
+                    lane["end"] += suite["duration"]
+                    break
+            else:
+                if used + suite["nodes"] > quota:
+                    continue
+                lanes.append(
+                    {
+                        "suites": [suite],
+                        "nodes": suite["nodes"],
+                        "end": suite["duration"],
+                    }
+                )
+            pending.remove(suite)
+
+        stages.append(_timeline(len(stages) + 1, lanes, start, makespan))
+        start += makespan
+
+    return stages
+
+
+def _timeline(number, lanes, start, makespan):
+    stage = {
+        "stage": f"stage-{number}",
+        "start": start,
+        "end": start + makespan,
+        "nodes": sum(lane["nodes"] for lane in lanes),
+        "lanes": list(),
+    }
+    for idx, lane in enumerate(lanes, start=1):
+        offset, suites = start, list()
+        for suite in lane["suites"]:
+            suites.append(
+                {
+                    "name": suite["name"],
+                    "start": offset,
+                    "end": offset + suite["duration"],
+                    "nodes": suite["nodes"],
+                }
+            )
+            offset += suite["duration"]
+        stage["lanes"].append({"lane": f"lane-{idx}", "suites": suites})
+    return stage
+
+
+def load_or_plan(plan_file, key, plan):
+    """Returns the plan stored for the key, the planned one stored otherwise.
+
+    Args:
+        plan_file (str): path of the stored plan, not stored if empty
+        key (str): identifies the pipeline e.g. its version and tags
+        plan (callable): returns the stages when no plan is stored
+    """
+    if plan_file and os.path.exists(plan_file):
+        with open(plan_file) as fh:
+            stored = json.load(fh)
+        if stored.get("key") == key:
+            return stored["stages"]
+
+    stages = plan()
+    if plan_file:
+        with open(plan_file, "w") as fh:
+            json.dump({"key": key, "stages": stages}, fh, indent=2)
+    return stages
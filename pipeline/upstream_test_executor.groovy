@@ -7,6 +7,8 @@ def testStages = [:]
 def testResults = [:]
 def upstreamVersion = "${params.Upstream_Version}"
 def currentStage = "${params.Current_Stage}"
+def stageQuota = params.Stage_Quota ?: null
+def stageHistory = params.Stage_History ?: null
 def buildType = "upstream"
 def yamlData
 def cephVersion
@@ -60,7 +62,9 @@ node('ceph-qe-ci || rhel-9-medium') {
             yamlData = readYaml file: "/ceph/cephci-jenkins/latest-rhceph-container-info/${buildType}.yaml"
             cephVersion = yamlData[upstreamVersion]["ceph-version"]
             currentBuild.description = "${upstreamVersion} - ${currentStage} - ${cephVersion}"
-            fetchStages = sharedLib.fetchStages(tags, overrides, testResults, null, null, upstreamVersion)
+            fetchStages = sharedLib.fetchStages(
+                tags, overrides, testResults, null, null, upstreamVersion, stageQuota, stageHistory
+            )
             testStages = fetchStages["testStages"]
             if ( testStages.isEmpty() ) {
                 currentBuild.result = "FAILURE"
@@ -185,14 +189,18 @@ node('ceph-qe-ci || rhel-9-medium') {
         stage('Post Build Action') {
             nextStage = "stage-" + ((currentStage.split('-')[-1] as int) + 1)
             tags = "${buildType},${nextStage}"
-            fetchStages = sharedLib.fetchStages(tags, overrides, testResults, null, null, upstreamVersion)
+            fetchStages = sharedLib.fetchStages(
+                tags, overrides, testResults, null, null, upstreamVersion, stageQuota, stageHistory
+            )
             testStages = fetchStages["testStages"]
             if ( testStages.isEmpty() && upstreamVersion == "main" ) {
                 upstreamVersion = "quincy"
                 nextStage = "stage-1"
                 tags = "${buildType},${nextStage}"
                 overrides["upstream-build"] = upstreamVersion
-                fetchStages = sharedLib.fetchStages(tags, overrides, testResults, null, null, upstreamVersion)
+                fetchStages = sharedLib.fetchStages(
+                    tags, overrides, testResults, null, null, upstreamVersion, stageQuota, stageHistory
+                )
                 testStages = fetchStages["testStages"]
             }
             if ( !testStages.isEmpty() ) {
@@ -200,7 +208,9 @@ node('ceph-qe-ci || rhel-9-medium') {
                     wait: false,
                     job: "rhceph-upstream-test-executor",
                     parameters: [string(name: 'Upstream_Version', value: upstreamVersion.toString()),
-                                string(name: 'Current_Stage', value: nextStage.toString())]
+                                string(name: 'Current_Stage', value: nextStage.toString()),
+                                string(name: 'Stage_Quota', value: (stageQuota ?: "").toString()),
+                                string(name: 'Stage_History', value: (stageHistory ?: "").toString())]
                 ])
             }
         }
@@ -831,7 +831,8 @@ def executeTestScript(def script) {
 
 def fetchStages(
     def tags, def overrides, def testResults, def rhcephversion=null,
-    def metadataFilePath=null, def upstreamVersion=null
+    def metadataFilePath=null, def upstreamVersion=null, def quota=null,
+    def history=null
     ) {
     /*
         Return all the scripts found under
@@ -842,6 +843,9 @@ def fetchStages(
         MAJOR   -   RHceph major version (ex., 5)
         MINOR   -   RHceph minor version (ex., 0)
         upstreamVersion - ex: pacific | quincy
+        quota   -   nodes deployed at once, the upstream stages are planned
+                    from the suite durations when provided
+        history -   directory holding the xunit results of the previous runs
     */
     println("Inside fetch stages from runner")
 
@@ -867,6 +871,14 @@ def fetchStages(
     else {
         rhcephVersion = upstreamVersion
         runnerCLI = "${runnerCLI} ${env.WORKSPACE}/.venv/bin/python getPipelineStages.py"
+
+        // Only the upstream stages are planned within the quota
+        if ( quota ) {
+            runnerCLI = "${runnerCLI} --quota ${quota}"
+        }
+        if ( history ) {
+            runnerCLI = "${runnerCLI} --history ${history}"
+        }
     }
 
     def overridesStr = writeJSON returnText: true, json: overrides
@@ -892,15 +904,30 @@ def fetchStages(
         return testStages
     }
 
+    // Scripts sharing a lane of a planned stage are executed one after the other
+    def lanes = [:]
     testScripts["scripts"].each{scriptName, scriptData->
         testResults[scriptName] = [:]
-        testStages[scriptName] = {
-            stage(scriptName){
-                testResults[scriptName]["status"] = executeTestScript(scriptData)
-                testResults[scriptName]["logdir"] = scriptData["log_dir"]
+        def laneName = scriptData.lane ?: scriptName
+        if ( ! lanes.containsKey(laneName) ) {
+            lanes[laneName] = []
+        }
+        lanes[laneName].add(scriptName)
+    }
+    lanes.each{laneName, scriptNames->
+        testStages[laneName] = {
+            scriptNames.each{scriptName->
+                def scriptData = testScripts["scripts"][scriptName]
+                stage(scriptName){
+                    testResults[scriptName]["status"] = executeTestScript(scriptData)
+                    testResults[scriptName]["logdir"] = scriptData["log_dir"]
+                }
             }
         }
     }
+    if ( testScripts["timeline"] ) {
+        println("Predicted duration: ${testScripts['predicted_duration']}s")
+    }
     def final_stage = testScripts["final_stage"]
     println("Final Stage after : ${final_stage}")
     println "Test Stages - ${testStages}"
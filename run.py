@@ -7,6 +7,7 @@ import os
 import pickle
 import re
 import sys
+import threading
 import time
 import traceback
 from copy import deepcopy
@@ -20,6 +21,8 @@ from libcloud.common.types import LibcloudError
 import init_suite
 from ceph.ceph import Ceph, CephNode
 from ceph.clients import WinNode
+from ceph.health_watcher import flush_timelines, stop_watchers
+from ceph.ssh_pool import format_pool_stats, set_pool_defaults
 from ceph.utils import (
     cleanup_ceph_nodes,
     cleanup_ibmc_ceph_nodes,
@@ -38,8 +41,14 @@ from cli.performance.memory_and_cpu_utils import (
 )
 from compute.aws_ec2 import cleanup_aws_ceph_nodes
 from compute.onecloud import cleanup_onecloud_ceph_nodes, expand_private_key_path
-from utility import sosreport
-from utility.log import Log
+from utility import sosreport, test_scheduler
+from utility.command_profile import profiler
+from utility.log import (
+    Log,
+    clear_thread_test,
+    enable_log_pipeline,
+    set_thread_test,
+)
 from utility.polarion import post_to_polarion
 from utility.retry import retry
 from utility.utils import (  # ReportPortal,
@@ -98,6 +107,7 @@ A simple test suite wrapper that executes tests based on yaml test configuration
         [--monitor-performance]
         [--disable-console-log]
         [--product <community> | <redhat> | <ibm>]
+        [--test-workers <n>]
   run.py --cleanup=name --osp-cred <file> [--cloud <str>]
         [--log-level <LEVEL>]
         [--custom-config <key>=<value>]...
@@ -169,6 +179,10 @@ Options:
                                     [default: false]
   --product <product>               The edition of Ceph. Accepted values are
                                     community, redhat and ibm
+  --test-workers <n>                Number of tests executed concurrently based on
+                                    the resources and depends-on of the suite tests,
+                                    the health timelines of the clusters are then
+                                    written once for all the tests [default: 1]
 """
 log = Log()
 test_names = []
@@ -546,6 +560,8 @@ def run(args):
 
     run_dir = create_run_dir(run_id, log_directory)
 
+    # Log files are written off the command execution threads
+    log_pipeline = enable_log_pipeline()
     log.configure_logger("startup", run_dir, disable_console_log)
 
     if console_log_level:
@@ -711,6 +727,12 @@ def run(args):
     if "collect-ceph-logs" in custom_config_dict.keys():
         collect_ceph_logs = bool(custom_config_dict["collect-ceph-logs"])
 
+    # Limits of the SSH channel pool of the nodes
+    set_pool_defaults(
+        max_sessions=custom_config_dict.get("ssh-max-sessions"),
+        max_transports=custom_config_dict.get("ssh-max-transports"),
+    )
+
     # load config, suite and inventory yaml files
     conf = load_file(glb_file)
     suite = init_suite.load_suites(suite_files)
@@ -916,8 +938,6 @@ def run(args):
     # Adding processed custom_config
     ceph_test_data["custom_config_dict"] = deepcopy(custom_config_dict)
 
-    # Initialize test return code
-    rc = 0
     run_config = {
         "log_dir": run_dir,
         "run_id": run_id,
@@ -925,18 +945,54 @@ def run(args):
     download_path = run_dir if not log_directory else log_directory
     cluster_info = []
 
-    for test in tests:
-        test = test.get("test")
-        tc = fetch_test_details(test)
+    # Commands executed during the cluster creation and setup
+    profiler.flush(os.path.join(run_dir, "startup"))
+
+    test_workers = int(args.get("--test-workers") or 1)
+    concurrent_run = test_workers > 1
+
+    # Guards the run state shared by the tests executed concurrently
+    state_lock = threading.Lock()
+
+    def execute_test(test, tc, unique_test_name):
+        """
+        Executes the test on its clusters and updates the test details.
+
+        :param test: the test collected from the suite file
+        :param tc: the test details returned by fetch_test_details
+        :param unique_test_name: unique name of the test in the run
+        :return: the return code of the test and the parallel test details
+        """
+        nonlocal enable_perf_mon, skip_version_compare, _rhcs_version
+
+        # The test works on a snapshot of the run state, its changes are
+        # carried over to the tests started after it completes.
+        with state_lock:
+            perf_mon, version_compare, rhcs_version = (
+                enable_perf_mon,
+                skip_version_compare,
+                _rhcs_version,
+            )
+
+        rc = 0
+        parallel_tcs = []
         do_not_skip_test = test.get("do-not-skip-tc", False)
         test_file = tc["file"]
-        unique_test_name = create_unique_test_name(tc["name"], test_names)
-        test_names.append(unique_test_name)
 
-        tc["log-link"] = log.configure_logger(
-            unique_test_name, run_dir, disable_console_log
-        )
-        run_config.update({"test_name": unique_test_name, "log_link": tc["log-link"]})
+        if concurrent_run:
+            # Records of the worker threads are routed to the test log files
+            set_thread_test(unique_test_name)
+            tc["log-link"] = log.configure_logger(
+                unique_test_name, run_dir, disable_console_log, concurrent=True
+            )
+            _run_config = dict(run_config)
+        else:
+            tc["log-link"] = log.configure_logger(
+                unique_test_name, run_dir, disable_console_log
+            )
+            _run_config = run_config
+
+        _run_config.update({"test_name": unique_test_name, "log_link": tc["log-link"]})
         mod_file_name = os.path.splitext(test_file)[0]
         test_mod = importlib.import_module(mod_file_name)
         print("\nRunning test: {test_name}".format(test_name=tc["name"]))
@@ -949,11 +1005,12 @@ def run(args):
 
         for cluster_name in test.get("clusters", ceph_cluster_dict):
             # Add cluster names
-            if cluster_name not in cluster_info:
-                cluster_info.append(cluster_name)
+            with state_lock:
+                if cluster_name not in cluster_info:
+                    cluster_info.append(cluster_name)
 
             # If Performance and CPU usage monitoring is enabled, perform pre-reqs
-            if enable_perf_mon:
+            if perf_mon:
                 if not upload_mem_and_cpu_logger_script(
                     ceph_cluster_dict[cluster_name]
                 ):
@@ -961,7 +1018,7 @@ def run(args):
                         "Failed to upload Memory and CPU monitoring scripts to nodes. "
                         "The tests will proceed without monitoring"
                     )
-                    enable_perf_mon = False
+                    perf_mon = False
 
             if test.get("clusters"):
                 config = test.get("clusters").get(cluster_name).get("config", {})
@@ -983,7 +1040,7 @@ def run(args):
                 config["skip_subscription"] = True
 
             if config.get("skip_version_compare"):
-                skip_version_compare = config.get("skip_version_compare")
+                version_compare = config.get("skip_version_compare")
 
             if args.get("--add-repo"):
                 repo = args.get("--add-repo")
@@ -995,7 +1052,7 @@ def run(args):
             config["enable_eus"] = enable_eus
             config["skip_enabling_rhel_rpms"] = skip_enabling_rhel_rpms
             config["docker-insecure-registry"] = docker_insecure_registry
-            config["skip_version_compare"] = skip_version_compare
+            config["skip_version_compare"] = version_compare
             config["container_image"] = "%s/%s:%s" % (
                 docker_registry,
                 docker_image,
@@ -1046,7 +1103,7 @@ def run(args):
                 config["kernel-repo"] = os.environ.get("KERNEL-REPO-URL")
 
             # Start performance and Cpu usage monitoring
-            if enable_perf_mon:
+            if perf_mon:
                 logging_process, tracker = start_logging_processes(
                     ceph_cluster_dict[cluster_name], unique_test_name
                 )
@@ -1055,10 +1112,10 @@ def run(args):
                 # FixMe: I don't think we use `build` as part of test data
                 # configuration. This needs to investigated and fixed.
                 if "build" in config.keys():
-                    _rhcs_version = config["build"]
+                    rhcs_version = config["build"]
 
                 # Initialize the cluster with the expected rhcs_version
-                ceph_cluster_dict[cluster_name].rhcs_version = _rhcs_version
+                ceph_cluster_dict[cluster_name].rhcs_version = rhcs_version
                 if mod_file_name not in skip_tc_list or do_not_skip_test:
                     if parallel:
                         parallel_tcs, rc = test_mod.run(
@@ -1069,7 +1126,7 @@ def run(args):
                             test_data=ceph_test_data,
                             ceph_cluster_dict=ceph_cluster_dict,
                             clients=clients,
-                            run_config=run_config,
+                            run_config=_run_config,
                             tc=tc,
                         )
 
@@ -1083,7 +1140,6 @@ def run(args):
                                     minutes=int(mins),
                                     seconds=float(secs),
                                 )
-                        tcs.extend(parallel_tcs)
                     else:
                         rc = test_mod.run(
                             ceph_cluster=ceph_cluster_dict[cluster_name],
@@ -1093,7 +1149,7 @@ def run(args):
                             test_data=ceph_test_data,
                             ceph_cluster_dict=ceph_cluster_dict,
                             clients=clients,
-                            run_config=run_config,
+                            run_config=_run_config,
                         )
                 else:
                     rc = -1
@@ -1112,7 +1168,7 @@ def run(args):
 
             finally:
                 # Stop performance and Cpu usage monitoring
-                if enable_perf_mon:
+                if perf_mon:
                     stop_logging_process(
                         ceph_cluster_dict[cluster_name],
                         logging_process,
@@ -1121,7 +1177,8 @@ def run(args):
                     )
                 collect_recipe(ceph_cluster_dict[cluster_name])
                 if store:
-                    store_cluster_state(ceph_cluster_dict, ceph_clusters_file)
+                    with state_lock:
+                        store_cluster_state(ceph_cluster_dict, ceph_clusters_file)
 
                 # Artifacts from test appended to comments
                 if config.get("artifacts"):
@@ -1144,9 +1201,23 @@ def run(args):
 
                 break
 
+        with state_lock:
+            enable_perf_mon = enable_perf_mon and perf_mon
+            skip_version_compare = version_compare
+            _rhcs_version = rhcs_version
+
         # Calculate test execution time
         elapsed = datetime.datetime.now() - start
         tc["duration"] = elapsed
+        if concurrent_run:
+            # The health timelines are of the clusters shared by the tests,
+            # hence are written once for all the tests at the end.
+            profiler.flush(
+                os.path.join(run_dir, unique_test_name), test=unique_test_name
+            )
+        else:
+            profiler.flush(os.path.join(run_dir, unique_test_name))
+            flush_timelines(os.path.join(run_dir, unique_test_name))
 
         # Reset errors list
         if _object:
@@ -1155,35 +1226,28 @@ def run(args):
         if rc == 0:
             tc["status"] = "Pass"
             msg = "Test {} passed".format(test_mod)
-            log.info(msg)
-            print(msg)
-
-            if post_results:
-                post_to_polarion(tc=tc)
-
         elif rc == -1:
             tc["status"] = "Skipped"
             msg = "Test {} Skipped".format(test_mod)
-            log.info(msg)
-            print(msg)
-
-            if post_results:
-                post_to_polarion(tc=tc)
-
         else:
             tc["status"] = "Failed"
             msg = "Test {} failed".format(test_mod)
-            log.info(msg)
-            print(msg)
-            jenkins_rc = 1
 
-            if post_results:
-                post_to_polarion(tc=tc)
+        log.info(msg)
+        print(msg)
 
-            if test.get("abort-on-fail", False):
-                log.info("Aborting on test failure")
-                tcs.append(tc)
-                break
+        if post_results:
+            post_to_polarion(tc=tc)
+
+        if concurrent_run:
+            log.close_and_remove_filehandlers(unique_test_name)
+            clear_thread_test()
+
+        return rc, parallel_tcs
+
+    def reset_clusters(test):
+        """Destroys or recreates the clusters as requested by the test."""
+        nonlocal ceph_cluster_dict, clients
 
         if test.get("destroy-cluster") is True:
             if cloud_type == "openstack":
@@ -1209,7 +1273,70 @@ def run(args):
                 platform=platform,
             )
 
-        tcs.append(tc)
+    if not concurrent_run:
+        for test in tests:
+            test = test.get("test")
+            tc = fetch_test_details(test)
+            unique_test_name = create_unique_test_name(tc["name"], test_names)
+            test_names.append(unique_test_name)
+
+            _, parallel_tcs = execute_test(test, tc, unique_test_name)
+            tcs.extend(parallel_tcs)
+
+            if tc["status"] == "Failed":
+                jenkins_rc = 1
+
+                if test.get("abort-on-fail", False):
+                    log.info("Aborting on test failure")
+                    tcs.append(tc)
+                    break
+
+            reset_clusters(test)
+            tcs.append(tc)
+    else:
+        suite_tests = [test.get("test") for test in tests]
+        test_nodes = test_scheduler.plan(suite_tests, list(ceph_cluster_dict))
+        log.info(f"Executing the tests using {test_workers} workers")
+
+        # Test names and details are generated in the suite order
+        for node in test_nodes:
+            node.tc = fetch_test_details(node.test)
+            node.unique_name = create_unique_test_name(node.tc["name"], test_names)
+            test_names.append(node.unique_name)
+            log.debug(f"{node.unique_name} depends on {sorted(node.depends_on)}")
+
+        def execute_node(node):
+            rc, parallel_tcs = execute_test(node.test, node.tc, node.unique_name)
+            abort = rc not in (0, -1) and node.test.get("abort-on-fail", False)
+
+            # Tests resetting the clusters are barriers, hence run exclusively
+            if not abort:
+                reset_clusters(node.test)
+
+            return parallel_tcs + [node.tc]
+
+        def skip_node(node):
+            node.tc["status"] = "Skipped"
+            node.tc["comments"] += "\nNot executed as its dependencies did not pass"
+            return [node.tc]
+
+        scheduler = test_scheduler.TestScheduler(test_nodes, workers=test_workers)
+        results = scheduler.run(
+            execute_node,
+            succeeded=lambda result: result[-1]["status"] == "Pass",
+            abort=lambda node, _: node.test.get("abort-on-fail", False),
+            skip=skip_node,
+        )
+        for _, result in results:
+            tcs.extend(result)
+
+        if any(tc["status"] == "Failed" for tc in tcs):
+            jenkins_rc = 1
+
+        profiler.flush(os.path.join(run_dir, "tests"))
+        flush_timelines(os.path.join(run_dir, "tests"))
+
+    stop_watchers()
 
     url_base = (
         magna_url + run_dir.split("/")[-1]
@@ -1244,6 +1371,9 @@ def run(args):
 
     print("\nAll test logs located here: {base}".format(base=url_base))
     print_results(tcs)
+    print(profiler.summary())
+    print(format_pool_stats())
+    print(f"Log pipeline: {log_pipeline.stats()}")
     send_to_cephci = post_results  # or post_to_report_portal
     run_end_time = datetime.datetime.now()
     duration = divmod((run_end_time - run_start_time).total_seconds(), 60)
@@ -0,0 +1,71 @@
+from time import time
+
+from ceph.ceph_admin import CephAdmin
+from ceph.ceph_admin.shell import close_shell_sessions
+from utility.log import Log
+
+log = Log(__name__)
+
+
+def measure(instance, args, iterations):
+    """
+    Method executes the command the given number of times using cephadm shell
+    Args:
+        instance: CephAdmin object
+        args: command arguments
+        iterations: number of executions
+    Returns:
+        tuple of average latency in seconds and the last output
+    """
+    out = None
+    start = time()
+    for _ in range(iterations):
+        out, _ = instance.shell(args, print_output=False)
+    return (time() - start) / iterations, out
+
+
+def run(ceph_cluster, **kw):
+    """Benchmark the persistent cephadm shell session against one-shot invocations
+    Args:
+        **kw: Key/value pairs of configuration information to be used in the test.
+    Returns:
+        0 - if test case pass
+        1 - it test case fails
+
+    Example::
+
+        config:
+            command: ceph fsid
+            iterations: 10
+    Test Case Flow:
+    1. Execute the command with one-shot cephadm shell invocations
+    2. Execute the command with the persistent cephadm shell session
+    3. Verify both outputs are the same and report the per-command latency
+    """
+    config = kw.get("config", {})
+    args = config.get("command", "ceph fsid").split()
+    iterations = int(config.get("iterations", 10))
+
+    try:
+        one_shot = CephAdmin(cluster=ceph_cluster, **config)
+        one_shot.config["persistent_shell"] = False
+        one_shot_time, one_shot_out = measure(one_shot, args, iterations)
+
+        session = CephAdmin(cluster=ceph_cluster, **config)
+        session.config["persistent_shell"] = True
+        session_time, session_out = measure(session, args, iterations)
+    except Exception as e:
+        log.error(e)
+        return 1
+    finally:
+        close_shell_sessions()
+
+    log.info(
+        f"Per-command latency of '{' '.join(args)}' over {iterations} executions: "
+        f"one-shot {one_shot_time:.3f}s, session {session_time:.3f}s"
+    )
+    if one_shot_out != session_out:
+        log.error(f"Output mismatch: {one_shot_out} != {session_out}")
+        return 1
+
+    return 0
@@ -6,6 +6,7 @@ from datetime import datetime
 
 from ceph.ceph import CommandFailed
 from tests.cephfs.cephfs_utilsV1 import FsUtils
+from utility.fio_results import collect_fio_results, write_fio_report
 from utility.log import Log
 
 log = Log(__name__)
@@ -119,6 +120,8 @@ def run(ceph_cluster, **kw):
 
 
 def run_fio(mount_points, config, client, log_dir, fs_util, fs_name):
+    hostname = client.node.hostname
+    reports = {}
     for mount in mount_points:
         start_time = datetime.now()
         fio_filenames = fs_util.generate_all_combinations(
@@ -137,10 +140,10 @@ def run_fio(mount_points, config, client, log_dir, fs_util, fs_name):
             .get("numjobs", ["4"]),
         )
         for file in fio_filenames:
+            output = f"{file}_{hostname}_{mount.replace('/', '')}_{fs_name}.json"
             client.exec_command(
                 sudo=True,
-                cmd=f"fio {file} --output-format=json "
-                f"--output={file}_{client.node.hostname}_{mount.replace('/', '')}_{fs_name}.json",
+                cmd=f"fio {file} --output-format=json --output={output}",
                 long_running=True,
                 timeout="notimeout",
             )
@@ -151,10 +154,10 @@ def run_fio(mount_points, config, client, log_dir, fs_util, fs_name):
                 f"Export name created : {mount}\n"
                 f"Time Taken for the Iteration : {exec_time}\n"
             )
-            os.makedirs(f"{log_dir}/{client.node.hostname}", exist_ok=True)
-            client.download_file(
-                src=f"/root/{file}_{client.node.hostname}_{mount.replace('/', '')}_{fs_name}.json",
-                dst=f"{log_dir}/{client.node.hostname}/{file}_{client.node.hostname}"
-                f"_{mount.replace('/', '')}.json",
-                sudo=True,
-            )
+            reports[f"/root/{output}"] = f"{mount}:{file}"
+
+    # Reports of all the runs are pulled using a single command
+    save_dir = f"{log_dir}/{hostname}"
+    os.makedirs(save_dir, exist_ok=True)
+    records = collect_fio_results(client, reports, save_dir=save_dir)
+    write_fio_report(records, f"{save_dir}/fio_results_{fs_name}.json")
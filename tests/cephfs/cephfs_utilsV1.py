@@ -31,6 +31,10 @@ from cli.cephadm.cephadm import CephAdm
 from cli.utilities.filesys import Mount
 from compute.openstack import get_openstack_driver
 from tests.cephfs.exceptions import ValueMismatchError
+from tests.cephfs.lib.cephfs_checksum_lib import (
+    diff_tree_checksums,
+    get_tree_checksums,
+)
 from utility.log import Log
 from utility.retry import retry
 
@@ -2555,24 +2559,28 @@ os.system('sudo systemctl start  network')
             cmd=f"cd {directory};echo {data * random.randint(100, 500)} | tee {' '.join(files)}",
         )
 
-    def get_files_and_checksum(self, client, directory):
+    def get_files_and_checksum(self, client, directory, recursive=False):
         """
         This will collect the filenames and their respective checksums and returns the dictionary
+        The checksums of all the files are computed by a single command on the client.
         :param client:
         :param directory:
+        :param recursive: include the files of the sub directories using relative paths
         :return:
         """
-        out, rc = client.exec_command(
-            sudo=True, cmd=f"find {directory} -maxdepth 1 -type f -printf '%f\n'"
-        )
+        return get_tree_checksums(client, directory, recursive=recursive)
 
-        file_list = out.strip().split()
-        file_dict = {}
-        for file in file_list:
-            out, rc = client.exec_command(sudo=True, cmd=f"md5sum {directory}/{file}")
-            md5sum = out.strip().split()
-            file_dict[file] = md5sum[0]
-        return file_dict
+    def compare_checksums(self, client, source, target, recursive=True):
+        """
+        Compares the file contents of two directories e.g. snapshot and clone on the client.
+        Only the files which differ are returned by the client.
+        :param client:
+        :param source: reference directory
+        :param target: directory to be verified
+        :param recursive:
+        :return: dict with the modified, missing and extra files of the target
+        """
+        return diff_tree_checksums(client, source, target, recursive=recursive)
 
     def set_xattrs(
         self,
@@ -0,0 +1,207 @@
+"""
+Bulk checksum engine for the CephFS data integrity checks.
+
+The digests of a complete directory tree are computed by a single remote
+invocation i.e. find piped to a batched md5sum, instead of a command per file.
+The NUL delimited records are streamed back over the SSH channel and parsed
+incrementally, hence the cost of the verification scales with the size of the
+data rather than the number of files times the round trip time.
+
+Two trees e.g. a snapshot and the live mount or the source and the clone can be
+compared on the client itself. Only the records which differ are sent back.
+
+Usage:
+    checksums = get_tree_checksums(client, "/mnt/cephfs/dir1")
+    diff = diff_tree_checksums(client, "/mnt/cephfs/.snap/snap1", "/mnt/cephfs")
+    if any(diff.values()):
+        log.error(f"Data mismatch {diff}")
+"""
+
+import shlex
+import socket
+from time import time
+
+from ceph.ceph import CommandFailed, stream_channel
+from utility.command_profile import profiler
+from utility.log import Log
+
+log = Log(__name__)
+
+SUPPORTED_ALGORITHMS = ("md5sum", "sha1sum", "sha256sum", "b2sum")
+CHUNK_SIZE = 65536
+
+
+class ChecksumParser:
+    """Incremental parser of the NUL delimited "<digest>  <path>" records."""
+
+    def __init__(self):
+        self._buffer = b""
+
+    def feed(self, data):
+        """Yields the (path, digest) of the complete records in the data.
+
+        Args:
+            data (bytes): chunk of the command output
+
+        Yields:
+            path (str), digest (str)
+        """
+        self._buffer += data
+        *records, self._buffer = self._buffer.split(b"\0")
+        for record in records:
+            yield self.parse_record(record)
+
+    def close(self):
+        """Yields the trailing record which is not NUL terminated."""
+        if self._buffer.strip():
+            yield self.parse_record(self._buffer)
+        self._buffer = b""
+
+    @staticmethod
+    def parse_record(record):
+        """Returns the path relative to the tree root and the digest."""
+        digest, _, path = record.decode("utf-8", errors="surrogateescape").partition(
+            "  "
+        )
+        if not path:
+            raise ValueError(f"Malformed checksum record: {record}")
+
+        if path.startswith("./"):
+            path = path[2:]
+
+        return path, digest
+
+
+def _find_cmd(directory, recursive, algorithm):
+    """Returns the command printing the checksum records of the tree."""
+    if algorithm not in SUPPORTED_ALGORITHMS:
+        raise ValueError(f"Unsupported checksum algorithm {algorithm}")
+
+    depth = "" if recursive else "-maxdepth 1 "
+    return (
+        f"cd {shlex.quote(directory)} && "
+        f"find . {depth}-type f -print0 | xargs -0 -r -n 1024 {algorithm} -z"
+    )
+
+
+def stream_tree_checksums(
+    client, directory, recursive=True, algorithm="md5sum", timeout=3600
+):
+    """Streams the checksums of the files in the tree computed by a single command.
+
+    Args:
+        client: CephNode where the file system is mounted
+        directory (str): root of the tree
+        recursive (bool): include the files of the sub directories
+        algorithm (str): checksum utility, md5sum by default
+        timeout (int): maximum time allowed for a read in seconds
+
+    Yields:
+        path relative to the directory (str), digest (str)
+
+    Raises:
+        CommandFailed: when the checksums could not be computed
+    """
+    cmd = _find_cmd(directory, recursive, algorithm)
+    yield from _stream(client, f"set -o pipefail; {cmd}", timeout)
+
+
+def _stream(client, cmd, timeout):
+    """Executes the command and yields the parsed records as they arrive."""
+    log.info(f"Execute {cmd} on {client.hostname}")
+    pool = client.root_connection.pool
+    slot, channel = pool.acquire(timeout=timeout)
+    channel.settimeout(timeout)
+    channel.exec_command(f"bash -c {shlex.quote(cmd)}")
+
+    parser = ChecksumParser()
+    _start, _bytes, _count, rc, err = time(), 0, 0, None, bytearray()
+    try:
+        for data in stream_channel(channel, err, timeout, CHUNK_SIZE):
+            _bytes += len(data)
+            for record in parser.feed(data):
+                _count += 1
+                yield record
+
+        for record in parser.close():
+            _count += 1
+            yield record
+
+        rc = channel.recv_exit_status()
+    except socket.timeout:
+        raise CommandFailed(
+            f"{cmd} did not send any data within {timeout}s on {client.hostname}"
+        )
+    finally:
+        pool.release(slot, channel)
+        _time = time() - _start
+        profiler.record(client.hostname, cmd, _time, len(cmd), _bytes, rc)
+
+    log.info(f"Received {_count} checksum records in {_time:.2f} seconds")
+    if rc != 0:
+        raise CommandFailed(
+            f"{cmd} returned {err.decode(errors='replace')} and code {rc} on {client.hostname}"
+        )
+
+
+def get_tree_checksums(client, directory, recursive=True, algorithm="md5sum"):
+    """Returns the checksums of all the files in the tree.
+
+    Args:
+        client: CephNode where the file system is mounted
+        directory (str): root of the tree
+        recursive (bool): include the files of the sub directories
+        algorithm (str): checksum utility, md5sum by default
+
+    Returns:
+        dict of path relative to the directory and its digest
+    """
+    return dict(stream_tree_checksums(client, directory, recursive, algorithm))
+
+
+def diff_tree_checksums(client, source, target, recursive=True, algorithm="md5sum"):
+    """Compares the file contents of two trees on the client.
+
+    The sorted checksum records of both the trees are compared remotely using
+    comm and only the records unique to either of the trees are returned.
+
+    Args:
+        client: CephNode where both the trees are accessible
+        source (str): reference tree e.g. the snapshot
+        target (str): tree to be verified e.g. the clone
+        recursive (bool): include the files of the sub directories
+        algorithm (str): checksum utility, md5sum by default
+
+    Returns:
+        dict with the list of paths
+            modified: present in both with different contents
+            missing: present only in the source
+            extra: present only in the target
+    """
+    src_cmd = _find_cmd(source, recursive, algorithm)
+    tgt_cmd = _find_cmd(target, recursive, algorithm)
+    cmd = (
+        "set -o pipefail; tmp=$(mktemp -d) && trap 'rm -rf $tmp' EXIT && "
+        f"( {src_cmd} ) | sort -z > $tmp/src && "
+        f"( {tgt_cmd} ) | sort -z > $tmp/tgt && "
+        "comm -3 -z $tmp/src $tmp/tgt | sed -z 's/^\\t/T/; t; s/^/S/'"
+    )
+
+    src_only, tgt_only = dict(), dict()
+    for path, digest in _stream(client, cmd, timeout=3600):
+        # The records are tagged with S or T denoting the tree
+        if digest.startswith("T"):
+            tgt_only[path] = digest[1:]
+        else:
+            src_only[path] = digest[1:]
+
+    diff = {
+        "modified": sorted(p for p in src_only if p in tgt_only),
+        "missing": sorted(p for p in src_only if p not in tgt_only),
+        "extra": sorted(p for p in tgt_only if p not in src_only),
+    }
+    log.info(
+        f"Checksum diff of {source} and {target}: "
+        + ", ".join(f"{len(v)} {k}" for k, v in diff.items())
+    )
+    return diff
@@ -11,7 +11,7 @@ from ceph.ceph import Ceph
 from ceph.ceph_admin.common import fetch_method
 from ceph.parallel import parallel
 from ceph.utils import get_node_by_id
-from tests.nvmeof.workflows.gateway_entities import teardown
+from tests.nvmeof.workflows.gateway_entities import rbd_create_image_cmd, teardown
 from tests.nvmeof.workflows.initiator import NVMeInitiator
 from tests.nvmeof.workflows.nvme_service import NVMeService
 from tests.nvmeof.workflows.nvme_utils import check_and_set_nvme_cli_image
@@ -111,6 +111,7 @@ def configure_namespaces(config, _cls, command, rbd_obj):
     image_size = config["args"].pop("image_size", None)
     group = config["args"].pop("group", None)
     pool = config["args"].pop("pool", None)
+    bulk = config["args"].pop("bulk", None)
     if namespaces_per_subsystem is not None:
         namespaces_sub = int(namespaces_per_subsystem)
     else:
@@ -119,6 +120,33 @@ def configure_namespaces(config, _cls, command, rbd_obj):
     if command != "add":
         return
 
+    if bulk:
+        # Images and namespaces are created within batched cephadm shell invocations
+        bulk = bulk if isinstance(bulk, dict) else {}
+        with _cls.base.bulk(**bulk) as provisioner:
+            for sub_num in range(1, subsystems + 1):
+                name = generate_unique_id(length=4)
+                subnqn = (
+                    f"nqn.2016-06.io.spdk:cnode{sub_num}{f'.{group}' if group else ''}"
+                )
+                for num in range(1, namespaces_sub + 1):
+                    image = f"{name}-image{num}"
+                    provisioner.add(
+                        _cls.name,
+                        command,
+                        pre_cmd=rbd_create_image_cmd(rbd_obj, pool, image, image_size),
+                        base_cmd_args={"format": "json"},
+                        args={
+                            "rbd_image_name": image,
+                            "rbd_pool": pool,
+                            "nqn": subnqn,
+                            "force": True,
+                        },
+                    )
+        provisioner.raise_on_error()
+        LOG.info(provisioner.summary())
+        return
+
     namespace_func = fetch_method(_cls, command)
     for sub_num in range(1, subsystems + 1):
         LOG.info("Subsystem %s", sub_num)
@@ -193,9 +221,30 @@ def _add_hosts_for_subsystem_namespaces(
             )
 
 
+def _bulk_add_hosts_for_subsystem_namespaces(
+    _cls, bulk, subsystem_nqn, ns_list, host_nqn_list
+):
+    """Add all host NQNs to every namespace under one subsystem in batches."""
+    with _cls.base.bulk(**bulk) as provisioner:
+        for ns in ns_list:
+            for host_nqn in host_nqn_list:
+                provisioner.add(
+                    _cls.name,
+                    "add_host",
+                    args={
+                        "nqn": subsystem_nqn,
+                        "nsid": ns["nsid"],
+                        "host_nqn": host_nqn,
+                    },
+                )
+    provisioner.raise_on_error()
+    LOG.info(provisioner.summary())
+
+
 def add_host(config, _cls, nvmegwcli, ceph_cluster, init_config):
     """Add host to namespaces and run IO."""
     config["args"].pop("subsystems", None)
+    bulk = config["args"].pop("bulk", None)
     host_nqn_list = []
     initiator_list = []
     for init_entry in init_config:
@@ -226,16 +275,31 @@ def add_host(config, _cls, nvmegwcli, ceph_cluster, init_config):
         by_subsystem[namespace["ns_subsystem_nqn"]].append(namespace)
     all_subsystem_nqns = set(by_subsystem.keys())
 
-    # Configure hosts for subsystems in parallel
-    with parallel() as p:
-        for subsystem_nqn, ns_list in by_subsystem.items():
-            p.spawn(
-                _add_hosts_for_subsystem_namespaces,
-                subsystem_nqn,
-                ns_list,
-                add_host_func,
-                host_nqn_list,
-            )
+    if bulk:
+        # Hosts of a subsystem are added serially, one provisioner per subsystem
+        bulk = dict(bulk) if isinstance(bulk, dict) else {}
+        bulk["concurrency"] = 1
+        with parallel() as p:
+            for subsystem_nqn, ns_list in by_subsystem.items():
+                p.spawn(
+                    _bulk_add_hosts_for_subsystem_namespaces,
+                    _cls,
+                    bulk,
+                    subsystem_nqn,
+                    ns_list,
+                    host_nqn_list,
+                )
+    else:
+        # Configure hosts for subsystems in parallel
+        with parallel() as p:
+            for subsystem_nqn, ns_list in by_subsystem.items():
+                p.spawn(
+                    _add_hosts_for_subsystem_namespaces,
+                    subsystem_nqn,
+                    ns_list,
+                    add_host_func,
+                    host_nqn_list,
+                )
 
     initiator = initiator_list[0]
     first_init = init_config[0]
@@ -290,6 +354,16 @@ def run(ceph_cluster: Ceph, **kwargs) -> int:
                             nodes:
                               - node7
                               - node8
+                      - config:
+                          service: namespace
+                          command: add
+                          args:
+                            subsystems: 2
+                            namespaces: 2048
+                            image_size: 1G
+                            pool: rbd
+                            bulk:
+                              concurrency: 32
                     initiators:
                       listener_port: 4420
                       node: node11
@@ -320,6 +320,60 @@ def validate_namespaces(gateway, expected_namespaces, nqn):
             )
 
 
+def rbd_create_image_cmd(rbd_obj, pool, image, size):
+    """Returns the rbd command creating the image, used along with bulk provisioning."""
+    cmd = f"rbd create {pool}/{image} --size {size}"
+    if rbd_obj and rbd_obj.ceph_version > 2 and rbd_obj.k_m:
+        cmd += f" --data-pool {rbd_obj.datapool}"
+    return cmd
+
+
+def configure_namespaces_bulk(gateway, nqn, namespace_args, bdev_cfg, rbd_obj, bulk):
+    """
+    Configure the namespaces of the bdev config using the bulk provisioner.
+    The rbd images are created along with the namespaces within the same
+    cephadm shell invocation, hence the pool is created only once.
+    Args:
+        gateway: NVMeGateway instance
+        nqn: The NQN of the subsystem
+        namespace_args: namespace add arguments
+        bdev_cfg: bdev config i.e. count, size, pool, ns_create_image
+        rbd_obj: RBD object used for creating the pool
+        bulk: bulk provisioning config i.e. concurrency, batch_size
+    Returns:
+        list of rbd images of the namespaces
+    """
+    bulk = bulk if isinstance(bulk, dict) else {}
+    pool = namespace_args["rbd-pool"]
+    name = generate_unique_id(length=4)
+    create_image = not bdev_cfg.get("ns_create_image")
+    if create_image:
+        if not rbd_obj:
+            raise ValueError("RBD object not provided for pre-creating RBD image")
+        rbd_obj.create_pool(poolname=pool)
+
+    images = []
+    with gateway.bulk(**bulk) as provisioner:
+        for num in range(bdev_cfg["count"]):
+            rbd_image = f"{name}-image{num}"
+            pre_cmd = None
+            if create_image:
+                pre_cmd = rbd_create_image_cmd(
+                    rbd_obj, pool, rbd_image, bdev_cfg.get("size", "1G")
+                )
+            provisioner.add(
+                "ns",
+                "add",
+                pre_cmd=pre_cmd,
+                args={**namespace_args, "rbd-image": rbd_image},
+            )
+            images.append(rbd_image)
+
+    provisioner.raise_on_error()
+    LOG.info(f"Namespaces of {nqn} provisioned, {provisioner.summary()}")
+    return images
+
+
 def configure_namespaces(gateway, config, opt_args={}, rbd_obj=None):
     """
     Configure namespaces for this specific gateway.
@@ -327,8 +381,15 @@ def configure_namespaces(gateway, config, opt_args={}, rbd_obj=None):
     Args:
         gateway: NVMeGateway instance
         config: test config
+            bulk: provision the namespaces in batches per cephadm shell invocation,
+                True or dict of concurrency, batch_size and timeout (v2 CLI only)
         opt_args: Optional arguments to pass to namespace creation in key value form.
     """
+    bulk = config.get("bulk")
+    if bulk and not hasattr(gateway, "bulk"):
+        LOG.warning("Bulk provisioning is not supported by the gateway CLI")
+        bulk = None
+
     # Configure namespaces if specified
     subsystem_config = config.get("subsystems", [])
     for sub_cfg in subsystem_config:
@@ -358,6 +419,22 @@ def configure_namespaces(gateway, config, opt_args={}, rbd_obj=None):
                 if bdev_cfg.get("pool"):
                     namespace_args.update({"rbd-pool": bdev_cfg["pool"]})
 
+                if bulk and not namespace_args.get("lb_groups"):
+                    namespace_args.pop("ceph_cluster", None)
+                    if bdev_cfg.get("ns_create_image"):
+                        namespace_args.update(
+                            {
+                                "size": bdev_cfg.get("size", "1G"),
+                                "rbd-create-image": True,
+                            }
+                        )
+                    expected_namespaces.extend(
+                        configure_namespaces_bulk(
+                            gateway, nqn, namespace_args, bdev_cfg, rbd_obj, bulk
+                        )
+                    )
+                    continue
+
                 # consider adding option to create pool and image if it doesn't exist
                 # and also ns_create_image is false
                 if bdev_cfg.get("ns_create_image"):
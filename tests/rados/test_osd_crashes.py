@@ -135,12 +135,13 @@ def run(ceph_cluster, **kw):
                 # pull script to write fragmented objects
                 script_loc = (
                     "https://raw.githubusercontent.com/red-hat-storage/cephci/"
-                    "main/utility/generate_frag_objs.py"
-                )
-                client_node.exec_command(
-                    sudo=True,
-                    cmd=f"curl -k {script_loc} -O",
+                    "main/utility"
                 )
+                for script in ("generate_frag_objs.py", "rados_aio.py"):
+                    client_node.exec_command(
+                        sudo=True,
+                        cmd=f"curl -k {script_loc}/{script} -O",
+                    )
                 # Setup Script pre-requisites : docopt
                 client_node.exec_command(
                     sudo=True, cmd="pip3 install docopt", long_running=True
@@ -26,7 +26,7 @@ TEST WORKFLOW:
     ├── THRASHING PHASE (dynamically configured parallel threads)
     │   ├── io_workload_burst: rados bench 30s write bursts (64K blocks) [always]
     │   ├── comprehensive_io_workload: Various object sizes + overwrites + appends [always]
-    │   ├── monitor_cluster_health: Periodic ceph health detail + ceph -s logging [always]
+    │   ├── monitor_cluster_health: ceph -w health timeline, polls while down [always]
     │   ├── _run_fio_workload (CephFS): FIO with snapshots on work directory [if enabled]
     │   ├── _run_fio_workload (RBD): FIO on mounted RBD image [if enabled]
     │   ├── thrash_cephfs_snapshots: 5 snaps/iter, parallel writes, ~20% deletion [if enabled]
@@ -111,6 +111,7 @@ import yaml
 
 from ceph import utils
 from ceph.ceph_admin import CephAdmin
+from ceph.health_watcher import watch_cluster
 from ceph.rados.core_workflows import NFS_RDMA_DEFAULT_BASE_PORT, RadosOrchestrator
 from ceph.rados.mgr_workflows import MgrWorkflows
 from ceph.rados.monitor_workflows import MonitorWorkflows
@@ -1762,7 +1763,11 @@ def monitor_cluster_health(
     client_node, start_time: str, duration: int, stop_flag: dict, interval: int = 30
 ) -> int:
     """
-    Periodically log `ceph health detail` and `ceph -s` with elapsed time.
+    Periodically log the cluster health with elapsed time.
+
+    The health is taken from the ceph -w stream of the cluster, which records
+    every health and PG state transition in the health timeline of the test.
+    `ceph health detail` and `ceph -s` are polled while the stream is down.
 
     Args:
         client_node: Client node to execute ceph commands
@@ -1789,6 +1794,7 @@ def monitor_cluster_health(
         ("ceph health detail", "ceph -s"),
     )
 
+    watcher = watch_cluster(client_node)
     while time.time() < end_time and not stop_flag.get("stop"):
         now = datetime.now()
         elapsed = str(now - test_start_dt).split(".")[0]
@@ -1799,12 +1805,14 @@ def monitor_cluster_health(
             f"Elapsed: {elapsed}\n"
         )
 
-        for cmd in commands:
+        for cmd in () if watcher.alive else commands:
             try:
                 out, _ = client_node.exec_command(cmd=cmd, sudo=True, timeout=60)
                 log.info(f"[{cmd}]\n{out.strip()}")
             except Exception as e:
                 log.warning(f"Failed '{cmd}': {e}")
+        if watcher.alive:
+            log.info(f"[ceph -w] {watcher.summary()}")
 
         log.info(f"\n{'=' * 60}\n")
         check_count += 1
@@ -49,6 +49,10 @@ Below configs are needed in order to run the tests
                             extra-pkgs:
                                 - pkg1
                                 - pkg2
+        tool-bundle (optional):
+                    true (default) to push ceph-qe-scripts along with its
+                    venv as a prebuilt bundle cached on the controller,
+                    false to clone and pip install on the node
 
 """
 
@@ -58,6 +62,7 @@ import yaml
 
 from utility import utils
 from utility.log import Log
+from utility.tool_bundle import ToolBundle
 from utility.utils import (
     config_keystone_ldap,
     configure_kafka_security,
@@ -85,6 +90,26 @@ DIR = {
 }
 
 
+def deploy_tool_bundle(config, nodes, test_folder):
+    """Deploys the ceph-qe-scripts repo and its venv bundle on the nodes.
+
+    Returns:
+        True when the bundle is deployed, False otherwise
+    """
+    bundle = ToolBundle(
+        name=test_folder,
+        repo_url=config["git-url"],
+        branch=config.get("branch", "master"),
+        requirements="rgw/requirements.txt",
+    )
+    try:
+        log.info(f"Tool bundle deployment: {bundle.deploy(nodes)}")
+        return True
+    except Exception as err:
+        log.warning(f"Unable to deploy the tool bundle, falling back to clone: {err}")
+        return False
+
+
 def run(ceph_cluster, **kw):
     """
 
@@ -151,6 +176,12 @@ def run(ceph_cluster, **kw):
     # Clone the repository once for the entire test suite (clone done as root; execution later by other user)
     pip_cmd = "venv/bin/pip"
     python_cmd = "venv/bin/python"
+    # Push the repo along with its venv as a prebuilt bundle to the nodes the
+    # tests of the suite are executed from, the clone and the venv creation
+    # below only take place when the bundle could not be deployed
+    if config.get("tool-bundle", True):
+        deploy_tool_bundle(config, [exec_from, rgw_node, client_node], test_folder)
+
     out, err = exec_from.exec_command(cmd=f"ls -l {test_folder}", check_ec=False)
     if not out:
         exec_from.exec_command(cmd=f"sudo mkdir {test_folder}")
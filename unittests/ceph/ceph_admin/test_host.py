@@ -0,0 +1,83 @@
+import json
+
+import mock
+import pytest
+
+from ceph.ceph_admin.host import Host, HostOpFailure
+
+
+def _node(num, roles):
+    node = mock.Mock(hostname=f"ceph-node{num}-x", ip_address=f"10.0.0.{num}")
+    node.role.role_list = roles
+    return node
+
+
+class MockHost(Host):
+    def __init__(self, nodes, listed=None):
+        self.config = dict()
+        self.cluster = mock.Mock()
+        self.cluster.get_nodes.return_value = nodes
+        self.installer = mock.Mock()
+        self.spec = mock.Mock()
+        self.installer.node.remote_file.return_value = self.spec
+        self.commands = list()
+        self.listed = nodes if listed is None else listed
+
+    def shell(self, args, **kw):
+        self.commands.append(" ".join(args))
+        if "ls" in args:
+            hosts = [
+                {"hostname": n.hostname, "addr": n.ip_address, "labels": []}
+                for n in self.listed
+            ]
+            return json.dumps(hosts), ""
+        return "Added hosts", ""
+
+
+@pytest.fixture
+def nodes():
+    return [
+        _node(1, ["_admin", "mon", "installer"]),
+        _node(2, ["osd"]),
+        _node(3, ["client"]),
+    ]
+
+
+def _config(**kw):
+    config = {
+        "bulk": True,
+        "args": {"labels": "apply-all-labels", "attach_ip_address": True},
+    }
+    config.update(kw)
+    return config
+
+
+@mock.patch("ceph.ceph_admin.host.monitoring_file_existence", return_value=True)
+def test_bulk_add_single_spec_and_listing(file_exists, nodes):
+    host = MockHost(nodes)
+    host.add_hosts(_config(validate_admin_keyring=True))
+
+    assert len(host.commands) == 2
+    assert "apply -i /tmp/" in host.commands[0]
+    assert host.commands[1] == "ceph orch host ls --format=json"
+
+    spec = host.spec.write.call_args.args[0]
+    assert spec.count("service_type: host") == 2
+    assert "hostname: ceph-node2-x" in spec and "addr: 10.0.0.2" in spec
+    assert "ceph-node3-x" not in spec
+
+    # keyring and ceph.conf of the single _admin node
+    assert [c.args[0] for c in file_exists.call_args_list] == [nodes[0], nodes[0]]
+
+
+def test_bulk_add_missing_host(nodes):
+    host = MockHost(nodes, listed=nodes[:1])
+    with pytest.raises(HostOpFailure, match="ceph-node2-x"):
+        host.add_hosts(_config())
+
+
+@mock.patch("ceph.ceph_admin.host.monitoring_file_existence", return_value=False)
+def test_bulk_add_missing_keyring(_, nodes):
+    host = MockHost(nodes)
+    with pytest.raises(HostOpFailure, match="ceph-node1-x"):
+        host.add_hosts(_config(validate_admin_keyring=True))
@@ -0,0 +1,150 @@
+import base64
+import re
+
+import mock
+import pytest
+
+from ceph.ceph import CommandFailed
+from ceph.ceph_admin import shell as shell_module
+from ceph.ceph_admin.shell import ShellMixin, ShellSession
+
+FRAME = re.compile(r"\( (?P<cmd>.*)\n\).*echo (?P<marker>__CEPHCI_SHELL__\w+);", re.S)
+
+
+class FakeChannel:
+    """Stand-in for the paramiko channel running ``bash -s`` in a container."""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.closed = False
+        self.commands = []
+        self.timeouts = []
+        self._pending = b""
+
+    def exec_command(self, cmd):
+        self.commands.append(cmd)
+
+    def exit_status_ready(self):
+        return self.closed
+
+    def settimeout(self, timeout):
+        self.timeouts.append(timeout)
+
+    def sendall(self, data):
+        match = FRAME.match(data.decode())
+        if not match:
+            return
+        out, err, rc = self.responses.get(match["cmd"], ("", "", 0))
+        self._pending += (
+            f"{match['marker']}\n"
+            f"{base64.b64encode(out.encode()).decode()}\n"
+            f"{base64.b64encode(err.encode()).decode()}\n"
+            f"{match['marker']} {rc}\n"
+        ).encode()
+
+    def recv(self, size):
+        data, self._pending = self._pending[:size], self._pending[size:]
+        return data
+
+    def shutdown_write(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class MockShell(ShellMixin):
+    def __init__(self, channel, persistent=True):
+        node = mock.Mock()
+        node.hostname = "installer"
+        node.root_connection.pool.acquire.return_value = ("slot", channel)
+        self.installer = mock.Mock()
+        self.installer.node = node
+        self.config = {"persistent_shell": persistent}
+
+
+class TestShellSession:
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        yield
+        shell_module.close_shell_sessions()
+
+    def test_session_reused(self):
+        channel = FakeChannel({"ceph fsid": ("abcd\n", "", 0)})
+        _shell = MockShell(channel)
+
+        assert _shell.shell(["ceph", "fsid"]) == ("abcd\n", "")
+        assert _shell.shell(["ceph", "fsid"]) == ("abcd\n", "")
+        assert len(channel.commands) == 1
+        assert channel.commands[0].endswith("-- bash --norc --noprofile -s")
+        _shell.installer.exec_command.assert_not_called()
+
+    def test_session_holds_pool_slot(self):
+        channel = FakeChannel({})
+        _shell = MockShell(channel)
+        pool = _shell.installer.node.root_connection.pool
+
+        _shell.shell(["ceph", "fsid"])
+        pool.acquire.assert_called_once()
+        pool.release.assert_not_called()
+
+        shell_module.close_shell_sessions()
+        pool.release.assert_called_once_with("slot", channel)
+
+    def test_timeout_reset_without_deadline(self):
+        channel = FakeChannel({})
+        session = ShellSession(MockShell(channel).installer.node)
+        session.open()
+
+        session.run("ceph fsid", timeout=5)
+        session.run("ceph fsid", timeout=None)
+        assert channel.timeouts[-1] is None
+        assert 0 < channel.timeouts[-2] <= 5
+
+    def test_exit_code_preserved(self):
+        channel = FakeChannel({"ceph osd pool get x": ("", "no pool", 2)})
+        _shell = MockShell(channel)
+
+        with pytest.raises(CommandFailed):
+            _shell.shell(["ceph", "osd", "pool", "get", "x"])
+
+        out = _shell.shell(["ceph", "osd", "pool", "get", "x"], check_status=False)
+        assert out == ("", "no pool")
+
+    def test_fallback_on_session_failure(self):
+        channel = FakeChannel({})
+        channel.recv = mock.Mock(return_value=b"")
+        _shell = MockShell(channel)
+        _shell.installer.exec_command.return_value = ("out", "")
+
+        assert _shell.shell(["ceph", "-s"]) == ("out", "")
+        assert _shell.shell(["ceph", "-s"]) == ("out", "")
+        assert _shell.installer.exec_command.call_count == 2
+        assert len(channel.commands) == 1
+
+    def test_no_replay_once_command_sent(self):
+        channel = FakeChannel({})
+        _shell = MockShell(channel)
+        assert _shell.shell(["ceph", "fsid"]) == ("", "")
+
+        channel.recv = mock.Mock(return_value=b"")
+        with pytest.raises(CommandFailed, match="outcome unknown"):
+            _shell.shell(["ceph", "osd", "pool", "create", "x"])
+        _shell.installer.exec_command.assert_not_called()
+
+        # the broken session is no longer used
+        _shell.installer.exec_command.return_value = ("out", "")
+        assert _shell.shell(["ceph", "-s"]) == ("out", "")
+        assert len(channel.commands) == 1
+
+    def test_one_shot_when_disabled(self):
+        channel = FakeChannel({})
+        _shell = MockShell(channel, persistent=False)
+        _shell.installer.exec_command.return_value = ("out", "")
+
+        assert _shell.shell(["ceph", "-s"]) == ("out", "")
+        assert not channel.commands
+
+    def test_parse_frame(self):
+        frame = "noise\n__CEPHCI_SHELL__x\nb2s=\n\n__CEPHCI_SHELL__x 0\n"
+        assert ShellSession._parse_frame(frame, "x") == ("ok", "", 0)
@@ -0,0 +1,75 @@
+import subprocess
+
+import mock
+import pytest
+
+from ceph.nvmeof.cli.v2 import NVMeGWCLIV2
+from ceph.nvmeof.cli.v2.bulk import BulkProvisioningError
+
+# Stand-in for the NVMe CLI tracking the concurrency and failing the "bad" namespace
+FAKE_CEPH = """
+ceph(){
+  touch "$STATE/run.$BASHPID"; ls "$STATE" | grep -c '^run[.]' >> "$STATE/peak"
+  sleep 0.05; rm -f "$STATE/run.$BASHPID"
+  case "$*" in *bad*) echo "rbd image not found" >&2; return 2;; esac
+  echo "added $*"
+}
+"""
+
+
+class FakeShell:
+    """Runs the shell commands with local bash in place of cephadm shell"""
+
+    def __init__(self, state):
+        self.state = state
+        self.calls = 0
+
+    def __call__(self, args, check_status=True, timeout=600, **kwargs):
+        self.calls += 1
+        script = f"{FAKE_CEPH}STATE={self.state}\neval {' '.join(args[2:])}"
+        proc = subprocess.run(
+            ["bash", "-c", script], capture_output=True, text=True, timeout=timeout
+        )
+        return proc.stdout, proc.stderr
+
+
+@pytest.fixture
+def gateway(tmp_path):
+    node = mock.MagicMock(hostname="gw1", ip_address="10.0.0.1")
+    cli = NVMeGWCLIV2(node, shell=FakeShell(tmp_path))
+    cli.ceph_version = "20.2.0"
+    cli.gateway_group = "group1"
+    return cli, tmp_path
+
+
+def test_bulk_add_namespaces(gateway):
+    cli, state = gateway
+    with cli.bulk(concurrency=4, batch_size=10) as bulk:
+        for num in range(12):
+            image = "bad" if num == 5 else f"image{num}"
+            args = {"subsystem": "nqn.1", "rbd-image": image}
+            assert bulk.add("ns", "add", args=args) == num
+
+    assert cli.shell.calls == 2
+    assert len(bulk.results) == 12
+    assert bulk.results[0].out.startswith("added nvmeof ns add --nqn nqn.1")
+    assert "--server_address 10.0.0.1" in bulk.results[0].cmd
+    assert [r.rc for r in bulk.failures] == [2]
+    assert bulk.failures[0].err == "rbd image not found\n"
+
+    peak = max(int(n) for n in (state / "peak").read_text().split())
+    assert 1 < peak <= 4
+
+    with pytest.raises(BulkProvisioningError, match="1 of 12"):
+        bulk.raise_on_error()
+    assert "12 NVMe CLI commands" in bulk.summary()
+
+
+def test_bulk_pre_cmd(gateway):
+    cli, _ = gateway
+    with cli.bulk() as bulk:
+        bulk.add("ns", "add", pre_cmd="false", args={"rbd-image": "image0"})
+        bulk.add_command("echo ok")
+
+    assert [r.rc for r in bulk.results] == [1, 0]
+    assert bulk.results[1].out == "ok\n"
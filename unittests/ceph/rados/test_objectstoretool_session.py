@@ -0,0 +1,70 @@
+import subprocess
+
+import mock
+
+from ceph.rados.objectstoretool_workflows import COTSession
+
+# Stand-in for the tool echoing the arguments and failing the "--op fail" command
+FAKE_COT = (
+    'ceph-objectstore-tool(){ shift 2; [ "$2" = fail ] && '
+    '{ echo bad >&2; return 3; }; echo "args:$*"; }\n'
+)
+
+
+def _bash(sudo, cmd, timeout, check_ec):
+    script = cmd.split(" -- bash -c ", 1)[1]
+    out = subprocess.run(
+        f"{FAKE_COT}eval {script}",
+        shell=True,
+        executable="/bin/bash",
+        capture_output=True,
+        text=True,
+    ).stdout
+    return out, ""
+
+
+def _session(stop_on_error=False):
+    cot_obj = mock.MagicMock(nostop=None, nostart=None, _sessions={})
+    cot_obj.rados_obj.fetch_host_node.return_value.exec_command.side_effect = _bash
+    return cot_obj, COTSession(cot_obj, 3, stop_on_error=stop_on_error)
+
+
+def test_session_stops_osd_once():
+    cot_obj, session = _session()
+    with session:
+        assert session.add("--op list") == 0
+        assert session.add("'obj 1' list-attrs") == 1
+        assert session.add("--op fail") == 2
+        assert cot_obj._sessions[3] is session
+
+    assert cot_obj._sessions == {}
+    calls = cot_obj.rados_obj.change_osd_state.call_args_list
+    assert [c.kwargs["action"] for c in calls] == ["stop", "start"]
+
+    node = cot_obj.rados_obj.fetch_host_node.return_value
+    assert node.exec_command.call_count == 1
+    assert [r.rc for r in session.results] == [0, 0, 3]
+    assert session.results[1].out == "args:obj 1 list-attrs\n"
+    assert session.results[2].err == "bad\n"
+
+
+def test_session_stop_on_error():
+    _, session = _session(stop_on_error=True)
+    with session:
+        for cmd in ("--op list", "--op fail", "--op list-pgs"):
+            session.add(cmd)
+        results = session.execute()
+
+    assert [r.rc for r in results] == [0, 3, None]
+
+
+def test_session_mount_and_timeout():
+    cot_obj, session = _session()
+    with session:
+        session.add("--op list")
+        session.execute(timeout=3600)
+
+    node = cot_obj.rados_obj.fetch_host_node.return_value
+    kwargs = node.exec_command.call_args.kwargs
+    assert kwargs["cmd"].startswith("cephadm shell --name osd.3 --mount /tmp/ -- ")
+    assert kwargs["timeout"] == 3600
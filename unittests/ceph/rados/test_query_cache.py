@@ -0,0 +1,110 @@
+import mock
+import pytest
+
+from ceph.ceph import CephNode, CommandFailed, notify_command_observers
+from ceph.rados.core_workflows import RadosOrchestrator
+from ceph.rados.query_cache import QueryCache, get_ttl, is_mutating, is_read_only
+
+
+@pytest.mark.parametrize(
+    "cmd",
+    [
+        "ceph osd dump -f json",
+        "cephadm shell -- ceph osd tree -f json",
+        "sudo cephadm shell --mount /tmp:/tmp -- ceph osd pool get test size -f json",
+        "ceph osd metadata osd.1 -f json",
+        "ceph -s",
+        "ceph pg 1.0 query -f json",
+        "ceph orch ps --daemon_type osd --format json",
+    ],
+)
+def test_read_only(cmd):
+    assert is_read_only(cmd)
+
+
+@pytest.mark.parametrize(
+    "cmd",
+    [
+        "ceph osd pool set test-get-pool size 2",
+        "ceph osd out 1",
+        "cephadm shell -- ceph orch apply -i /tmp/spec.yaml",
+        "systemctl stop ceph-osd@1",
+        "rados bench -p test 10 write",
+    ],
+)
+def test_mutating(cmd):
+    assert not is_read_only(cmd)
+    assert is_mutating(cmd)
+
+
+@pytest.mark.parametrize(
+    "cmd",
+    ["ls -l /var/lib/ceph", "fio --name=test", "sleep 10", "rm -f /tmp/x"],
+)
+def test_not_ceph_command(cmd):
+    assert not is_mutating(cmd)
+
+
+def test_ttl():
+    assert get_ttl("ceph osd dump -f json") == 5
+    assert get_ttl("ceph mon metadata -f json") == 60
+    assert get_ttl("ceph df -f json") is None
+    assert get_ttl("ceph osd pool set test size 2") is None
+
+
+def test_cache_hit_and_invalidation():
+    cache = QueryCache()
+    assert cache.get("ceph osd dump -f json") == (False, None)
+
+    cache.put("ceph osd dump -f json", {"epoch": 10})
+    hit, out = cache.get("ceph osd dump -f json")
+    assert hit and out == {"epoch": 10}
+
+    # Cached entries are returned as copies
+    out["epoch"] = 11
+    assert cache.get("ceph osd dump -f json") == (True, {"epoch": 10})
+
+    notify_command_observers(mock.Mock(), "ceph osd tree -f json")
+    assert cache.get("ceph osd dump -f json")[0]
+
+    notify_command_observers(mock.Mock(), "rm -rf /tmp/data")
+    assert cache.get("ceph osd dump -f json")[0]
+
+    notify_command_observers(mock.Mock(), "ceph osd out 1")
+    assert cache.get("ceph osd dump -f json") == (False, None)
+    assert cache.stats == {"hits": 4, "misses": 2, "invalidations": 1, "entries": 0}
+
+
+def test_cache_invalidated_before_the_command():
+    cache = QueryCache()
+    cache.put("ceph osd dump -f json", {"epoch": 10})
+    node = mock.Mock(run_once=False)
+
+    def _run(**kw):
+        # A query racing with the command does not find the prior state
+        assert cache.get("ceph osd dump -f json") == (False, None)
+        return "", "", 0, 0
+
+    node.long_running.side_effect = _run
+    CephNode.exec_command(node, cmd="ceph osd out 1", sudo=True)
+    assert cache.stats["invalidations"] == 1
+
+
+@mock.patch("ceph.rados.query_cache.monotonic")
+def test_cache_expiry(monotonic_mock):
+    monotonic_mock.return_value = 100
+    cache = QueryCache()
+    cache.put("ceph osd dump -f json", {"epoch": 10}, ttl=5)
+    monotonic_mock.return_value = 106
+    assert cache.get("ceph osd dump -f json") == (False, None)
+
+
+def test_get_pool_id():
+    rados_obj = RadosOrchestrator.__new__(RadosOrchestrator)
+    rados_obj.run_ceph_command = mock.Mock(
+        return_value=[{"pool_name": "rbd", "pool_id": 3}]
+    )
+
+    assert rados_obj.get_pool_id(pool_name="rbd") == 3
+    with pytest.raises(CommandFailed, match="pool missing"):
+        rados_obj.get_pool_id(pool_name="missing")
@@ -0,0 +1,85 @@
+import mock
+
+from ceph.rados.core_workflows import RadosOrchestrator
+from ceph.rados.rados_bench import (
+    BenchResultStore,
+    compare_results,
+    parse_bench_output,
+)
+
+WRITE_OUTPUT = """hints = 1
+Maintaining 16 concurrent writes of 4194304 bytes to objects of size 4194304 for up to 3 seconds or 0 objects
+Object prefix: benchmark_data_ceph-client_4821
+  sec Cur ops   started  finished  avg MB/s  cur MB/s last lat(s)  avg lat(s)
+    0       0         0         0         0         0           -           0
+    1      16        38        22   87.9917        88    0.521508    0.499339
+    2      16        70        54   107.985       128    0.308765    0.523105
+    3      16       104        88   117.319       136    0.420077    0.511921
+Total time run:         3.32
+Total writes made:      104
+Write size:             4194304
+Object size:            4194304
+Bandwidth (MB/sec):     125.3
+Stddev Bandwidth:       25.7
+Max bandwidth (MB/sec): 136
+Min bandwidth (MB/sec): 88
+Average IOPS:           31
+Stddev IOPS:            6.4
+Max IOPS:               34
+Min IOPS:               22
+Average Latency(s):     0.51
+Stddev Latency(s):      0.13
+Max latency(s):         1.13563
+Min latency(s):         0.259032
+"""
+
+
+def test_parse_bench_output():
+    result = parse_bench_output(WRITE_OUTPUT)
+    assert result.mode == "write"
+    assert (result.ops, result.op_size, result.bandwidth) == (104, 4194304, 125.3)
+    assert (result.iops, result.latency_max) == (31, 1.13563)
+    assert [s.sec for s in result.samples] == [1, 2, 3]
+    assert result.samples[0].cur_mbs == 88
+    assert parse_bench_output("", mode="seq").bandwidth is None
+
+
+def test_store_compare(tmp_path):
+    store = BenchResultStore(str(tmp_path / "bench.db"))
+    keys = dict(suite="perf", pool_profile="replicated-3", cluster_shape="hosts-3")
+
+    baseline = parse_bench_output(WRITE_OUTPUT)
+    run_id = store.record(baseline, build="8.1", **keys)
+    assert len(store.samples(run_id)) == 3
+
+    current = parse_bench_output(WRITE_OUTPUT)
+    current.bandwidth, current.latency = 100.0, 0.53
+    store.record(current, build="9.0", **keys)
+
+    report = store.compare("9.0", "8.1")
+    assert list(report) == [("perf", "replicated-3", "hosts-3", "write", 4194304)]
+    regressions = report[("perf", "replicated-3", "hosts-3", "write", 4194304)]
+    assert [r.metric for r in regressions] == ["bandwidth"]
+    assert not compare_results(current, baseline, tolerances={"bandwidth": 0.25})
+    assert store.compare("9.0", "7.0") == {}
+    store.close()
+
+
+def test_record_bench_result_keyed_by_ceph_build(tmp_path):
+    rados_obj = RadosOrchestrator.__new__(RadosOrchestrator)
+    rados_obj.rhbuild = "8.1"
+    rados_obj.run_ceph_command = mock.Mock(
+        return_value={
+            "version": "ceph version 18.2.1-229.el9cp (abc) reef (stable)",
+        }
+    )
+    db = str(tmp_path / "bench.db")
+    keys = dict(suite="perf", pool_profile="replicated-3", cluster_shape="hosts-3")
+
+    result = parse_bench_output(WRITE_OUTPUT)
+    assert rados_obj.record_bench_result(result, "rbd", db=db, **keys)
+
+    store = BenchResultStore(db)
+    assert store.aggregate("18.2.1-229.el9cp")
+    assert not store.aggregate("8.1")
+    store.close()
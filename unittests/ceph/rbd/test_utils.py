@@ -0,0 +1,39 @@
+import mock
+
+from ceph.rbd.utils import check_data_integrity, find_first_mismatch
+
+
+def _spec(image_spec, digests):
+    client = mock.MagicMock()
+    client.exec_command.return_value = ("".join(f"{d}  -\n" for d in digests), "")
+    rbd = mock.MagicMock(base_cmd="rbd")
+    return {"image_spec": image_spec, "rbd": rbd, "client": client}
+
+
+def test_find_first_mismatch():
+    assert find_first_mismatch(["a", "b"], ["a", "b"], 4) is None
+    assert find_first_mismatch(["a", "b", "c"], ["a", "x", "y"], 4) == 4
+    assert find_first_mismatch(["a", "b"], ["a", "b", "c"], 4) == 8
+
+
+def test_check_data_integrity_streams_export():
+    first = _spec("pool/image", ["a", "b"])
+    second = _spec("pool/clone", ["a", "b"])
+    assert check_data_integrity(first=first, second=second) == 0
+
+    cmd = first["client"].exec_command.call_args.kwargs["cmd"]
+    assert "rbd export pool/image - --no-progress | split" in cmd
+    first["rbd"].export.assert_not_called()
+
+    second = _spec("pool/clone", ["a", "c"])
+    assert check_data_integrity(first=first, second=second) == 1
+
+
+def test_check_data_integrity_retained_files():
+    first = dict(_spec("pool/image", []), file_path="/tmp/first", remove_file=False)
+    first["rbd"].export.return_value = ("", "Exporting image: 100% complete...done.")
+    first["client"].exec_command.return_value = ("d41d8cd9  /tmp/first", "")
+    second = dict(first, file_path="/tmp/second")
+
+    assert check_data_integrity(first=first, second=second) == 0
+    assert first["rbd"].export.call_count == 2
@@ -0,0 +1,181 @@
+import asyncio
+import threading
+
+import pytest
+from paramiko.buffered_pipe import BufferedPipe
+from paramiko.pipe import make_or_pipe, make_pipe
+
+from ceph.async_exec import exec_on_nodes, gather_exec, read_channel, run_sync
+from ceph.ceph import CephNode, CommandFailed
+from ceph.ssh_pool import ChannelPool
+
+
+class FakeChannel:
+    """Channel completing the command from a timer, "hang" never completes"""
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.in_buffer = BufferedPipe()
+        self.in_stderr_buffer = BufferedPipe()
+        self.status_event = threading.Event()
+        self.eof_received = False
+        self.rc = None
+
+    def fileno(self):
+        pipe = make_pipe()
+        p1, p2 = make_or_pipe(pipe)
+        self.in_buffer.set_event(p1)
+        self.in_stderr_buffer.set_event(p2)
+        return pipe.fileno()
+
+    def exec_command(self, cmd):
+        with self.transport.lock:
+            self.transport.running += 1
+            self.transport.peak = max(self.transport.peak, self.transport.running)
+        if cmd != "hang":
+            threading.Timer(0.01, self._complete, args=(cmd,)).start()
+
+    def _complete(self, cmd):
+        # The command ends before its completion is observed by the reader
+        with self.transport.lock:
+            self.transport.running -= 1
+        if cmd == "fail":
+            self.in_stderr_buffer.feed(b"bad\n")
+            self.rc = 2
+        else:
+            self.in_buffer.feed(f"{cmd}\n".encode())
+            self.rc = 0
+        self.status_event.set()
+        self.eof_received = True
+        self.in_buffer.close()
+        self.in_stderr_buffer.close()
+
+    def recv_ready(self):
+        return self.in_buffer.read_ready()
+
+    def recv(self, nbytes):
+        return self.in_buffer.read(nbytes)
+
+    def recv_stderr_ready(self):
+        return self.in_stderr_buffer.read_ready()
+
+    def recv_stderr(self, nbytes):
+        return self.in_stderr_buffer.read(nbytes)
+
+    def exit_status_ready(self):
+        return self.status_event.is_set()
+
+    def recv_exit_status(self):
+        self.status_event.wait()
+        return self.rc
+
+    def close(self):
+        pass
+
+
+class FakeTransport:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+
+    def is_active(self):
+        return True
+
+    def send_ignore(self):
+        pass
+
+    def open_session(self, timeout=None):
+        return FakeChannel(self)
+
+
+class RacyChannel(FakeChannel):
+    """Channel receiving its last data and EOF right after being drained"""
+
+    def recv_stderr_ready(self):
+        ready = super().recv_stderr_ready()
+        if not ready and not self.eof_received:
+            self.in_buffer.feed(b"tail\n")
+            self.rc = 0
+            self.status_event.set()
+            self.eof_received = True
+        return ready
+
+
+class FakeClient:
+    def __init__(self):
+        self.transport = FakeTransport()
+
+    def get_transport(self):
+        return self.transport
+
+
+class FakeConnection:
+    def __init__(self, name):
+        client = FakeClient()
+        self.transport = client.transport
+        self.pool = ChannelPool(
+            name, lambda: client, lambda: client, max_sessions=4, max_transports=1
+        )
+
+
+def _node(name):
+    node = CephNode.__new__(CephNode)
+    node.hostname, node.ip_address = name, "10.0.0.1"
+    node.root_connection = FakeConnection(f"root@{name}")
+    node.connection = FakeConnection(f"cephuser@{name}")
+    return node
+
+
+def test_gather_bounded_per_host():
+    nodes = [_node(f"node{i}") for i in range(4)]
+
+    async def _fan_out():
+        return await asyncio.gather(
+            *(n.aexec(f"echo {i}", sudo=True) for n in nodes for i in range(50))
+        )
+
+    results = asyncio.run(_fan_out())
+    assert len(results) == 200
+    assert results[0] == ("echo 0\n", "")
+    for node in nodes:
+        assert 1 <= node.root_connection.transport.peak <= 4
+        assert node.root_connection.pool.stats()["active"] == 0
+        assert node.connection.transport.peak == 0
+
+
+def test_aexec_check_ec_and_verbose():
+    node = _node("node0")
+    with pytest.raises(CommandFailed, match="bad"):
+        asyncio.run(node.aexec("fail"))
+
+    out, err, rc, _ = asyncio.run(node.aexec("fail", check_ec=False, verbose=True))
+    assert (out, err, rc) == ("", "bad\n", 2)
+    assert node.exit_status == 2
+
+
+def test_aexec_timeout():
+    node = _node("node0")
+    with pytest.raises(CommandFailed, match="exceeded"):
+        asyncio.run(node.aexec("hang", timeout=0.2))
+    assert node.connection.pool.stats()["active"] == 0
+
+
+def test_sync_shim():
+    nodes = [_node("node0"), _node("node1")]
+    results = exec_on_nodes(nodes, lambda n: f"echo {n.hostname}")
+    assert [out for out, _ in results] == ["echo node0\n", "echo node1\n"]
+
+    failures = exec_on_nodes(nodes, "fail", return_exceptions=True)
+    assert all(isinstance(f, CommandFailed) for f in failures)
+
+    async def _nested():
+        return run_sync(gather_exec(nodes[:1], "echo nested"))
+
+    assert asyncio.run(_nested()) == [("echo nested\n", "")]
+
+
+def test_read_channel_keeps_data_fed_with_eof():
+    channel = RacyChannel(FakeTransport())
+    channel.in_buffer.feed(b"head\n")
+    assert asyncio.run(read_channel(channel, timeout=5)) == ("head\ntail\n", "", 0)
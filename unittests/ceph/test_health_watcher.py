@@ -0,0 +1,135 @@
+import asyncio
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+import mock
+import pytest
+
+from ceph import health_watcher
+from ceph.health_watcher import (
+    ClusterWatcher,
+    check_cleared,
+    check_raised,
+    flush_timelines,
+    health_is,
+    no_degraded_pgs,
+    pgs_active_clean,
+)
+
+PREFIX = "2024-05-01T10:00:00.000000+0000 mon.a (mon.0) 12 : cluster"
+
+STATUS = {
+    "health": {
+        "status": "HEALTH_WARN",
+        "checks": {
+            "OSD_DOWN": {"severity": "HEALTH_WARN", "summary": {"message": "1 down"}}
+        },
+    },
+    "pgmap": {
+        "num_pgs": 33,
+        "pgs_by_state": [
+            {"state_name": "active+clean", "count": 30},
+            {"state_name": "active+undersized+degraded", "count": 3},
+        ],
+    },
+}
+
+STREAM = [
+    json.dumps(STATUS),
+    f"{PREFIX} [INF] Health check cleared: OSD_DOWN (was: 1 osds down)",
+    f"{PREFIX} [DBG] pgmap v10: 33 pgs: 33 active+clean; 449 KiB data",
+    f"{PREFIX} [INF] Cluster is now healthy",
+]
+
+
+def _node(lines=()):
+    node = mock.Mock(hostname="node1", ip_address="10.0.0.1")
+    channel = mock.Mock()
+    channel.makefile.return_value = iter(f"{line}\r\n" for line in lines)
+
+    @contextmanager
+    def _session(timeout=None):
+        yield channel
+
+    node.root_connection.pool.session = _session
+    return node
+
+
+@pytest.fixture(autouse=True)
+def _clear_watchers():
+    yield
+    health_watcher.stop_watchers()
+
+
+def test_transitions():
+    watcher = ClusterWatcher(_node())
+    watcher.feed(STREAM[0])
+    state = watcher.state
+
+    assert state.status == "HEALTH_WARN"
+    assert check_raised("OSD_DOWN")(state) and not no_degraded_pgs()(state)
+
+    for line in STREAM[1:]:
+        watcher.feed(line)
+
+    assert health_is("HEALTH_OK")(state) and check_cleared("OSD_DOWN")(state)
+    assert pgs_active_clean()(state) and no_degraded_pgs()(state)
+    assert [e.kind for e in watcher.timeline] == [
+        "status",
+        "check_cleared",
+        "pg_states",
+        "status",
+    ]
+
+    watcher.feed(f"{PREFIX} [ERR] Health check failed: 1 pg damaged (PG_DAMAGED)")
+    assert state.status == "HEALTH_ERR" and "PG_DAMAGED" in state.checks
+
+
+def test_only_first_document_seeds_state():
+    watcher = ClusterWatcher(_node())
+    watcher.feed(STREAM[0])
+    watcher.feed(json.dumps({"health": {"status": "HEALTH_ERR"}}))
+
+    assert watcher.state.status == "HEALTH_WARN"
+    assert [e.kind for e in watcher.timeline] == ["status"]
+
+
+def test_wait_wakes_on_event():
+    watcher = ClusterWatcher(_node())
+    watcher.feed(STREAM[0])
+    timer = threading.Timer(0.1, watcher.feed, args=(STREAM[1],))
+    timer.start()
+
+    start = time.monotonic()
+    assert watcher.wait_for(check_cleared("OSD_DOWN"), timeout=5)
+    assert time.monotonic() - start < 1
+    assert not watcher.wait_for(health_is("HEALTH_ERR"), timeout=0.1)
+
+
+def test_await_for():
+    watcher = ClusterWatcher(_node())
+    threading.Timer(0.1, watcher.feed, args=(STREAM[0],)).start()
+    assert asyncio.run(watcher.await_for(check_raised("OSD_DOWN"), timeout=5))
+
+
+def test_stream_and_timeline_artifact(tmp_path):
+    node = _node(STREAM)
+    watcher = health_watcher.watch_cluster(node)
+    assert watcher.wait_for(lambda _: len(watcher.timeline) == 4, timeout=5)
+    assert health_is("HEALTH_OK")(watcher.state)
+    assert health_watcher.watch_cluster(node) is watcher
+
+    channel = node.root_connection.pool.session().__enter__()
+    channel.exec_command.assert_called_with("ceph -w -f json --watch-debug")
+
+    prefix = str(tmp_path / "test")
+    assert flush_timelines(prefix) == 4
+    with open(f"{prefix}.health.json") as fh:
+        timeline = json.load(fh)
+    assert timeline[0]["node"] == "node1"
+    assert timeline[0]["events"][-1]["status"] == "HEALTH_OK"
+
+    # only the events since the previous flush are written
+    assert flush_timelines(prefix) == 0
@@ -0,0 +1,106 @@
+import json
+import subprocess
+
+import mock
+import pytest
+
+from ceph import inventory
+from ceph.ceph import CommandFailed, notify_command_observers
+from ceph.utils import get_ceph_versions, get_daemon_versions
+
+FAKE_PODMAN = """
+podman(){
+  case $1 in
+    ps) printf 'ceph-mon-node1\\nnode-exporter\\nceph-osd-0\\n';;
+    exec) echo "ceph version 17.2.6 ($2)";;
+  esac
+}
+"""
+
+ORCH_PS = [
+    {"daemon_type": "mon", "daemon_id": "node1", "version": "19.2.1"},
+    {"daemon_name": "osd.0", "daemon_type": "osd", "version": "19.2.1"},
+    {"daemon_type": "node-exporter", "daemon_id": "node1", "version": ""},
+]
+
+VERSIONS = {"mgr": {"ceph version 19.2.1-10.el9cp (abc) squid 9.9.1.0 (stable)": 2}}
+
+
+def _bash(cmd, sudo=False, **kw):
+    script = cmd.split("bash -c ", 1)[1]
+    out = subprocess.run(
+        f"{FAKE_PODMAN}eval {script}",
+        shell=True,
+        executable="/bin/bash",
+        capture_output=True,
+        text=True,
+    ).stdout
+    return out, ""
+
+
+def _node(name, role, exec_command):
+    node = mock.MagicMock(shortname=name, ip_address=f"10.0.0.{len(name)}")
+    node.role = role
+    node.pkg_type = "rpm"
+    node.exec_command.side_effect = exec_command
+    return node
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    inventory.inventory_cache.invalidate()
+
+
+def _installer(orchestrator=True):
+    def _exec(cmd, sudo=False, **kw):
+        if "orch ps" in cmd:
+            if not orchestrator:
+                raise CommandFailed("cephadm: command not found")
+            return json.dumps(ORCH_PS), ""
+        if "ceph versions" in cmd:
+            return json.dumps(VERSIONS), ""
+        return "ceph-ansible-6.0.28\n", ""
+
+    return _node("installer", "installer", _exec)
+
+
+def test_versions_from_orchestrator():
+    installer = _installer()
+    osd = _node("node2", "osd", _bash)
+    versions = get_ceph_versions([installer, osd], containerized=True)
+
+    assert versions == {
+        "installer": "ceph-ansible-6.0.28",
+        "mon.node1": "ceph version 19.2.1",
+        "osd.0": "ceph version 19.2.1",
+    }
+    assert osd.exec_command.call_count == 0
+
+
+def test_versions_fallback_one_command_per_node():
+    installer = _installer(orchestrator=False)
+    nodes = [_node(f"node{i}", "osd", _bash) for i in range(3)]
+    client = _node("client", "client", _bash)
+    versions = get_ceph_versions([installer, client] + nodes, containerized=True)
+
+    assert versions["installer"] == "ceph-ansible-6.0.28"
+    assert versions["ceph-osd-0"] == "ceph version 17.2.6 (ceph-osd-0)"
+    assert "node-exporter" not in versions
+    assert all(n.exec_command.call_count == 1 for n in nodes)
+    assert client.exec_command.call_count == 0
+
+
+def test_daemon_versions_cached_until_invalidated():
+    installer = _installer()
+    for _ in range(3):
+        assert get_daemon_versions(installer, "mgr") == ("19.2.1", "9.9.1.0")
+    assert installer.exec_command.call_count == 1
+
+    # read-only queries keep the cache, anything else drops it
+    notify_command_observers(installer, "ceph -s")
+    get_daemon_versions(installer, "mgr")
+    assert installer.exec_command.call_count == 1
+
+    notify_command_observers(installer, "ceph orch upgrade start --image x")
+    get_daemon_versions(installer, "mgr")
+    assert installer.exec_command.call_count == 2
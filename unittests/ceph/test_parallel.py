@@ -0,0 +1,65 @@
+from time import monotonic, sleep
+
+import pytest
+
+from ceph.parallel import parallel
+
+
+def task(delay, value=None, fail=False):
+    sleep(delay)
+    if fail:
+        raise ValueError(value)
+    return value
+
+
+def test_results_in_submission_order():
+    start = monotonic()
+    with parallel() as p:
+        p.spawn(task, 0.2, "slow")
+        p.spawn(task, 0.01, "fast")
+
+    assert p.results == ["slow", "fast"]
+    assert monotonic() - start < 1
+
+
+def test_failure_waits_for_siblings():
+    with pytest.raises(ValueError):
+        with parallel() as p:
+            p.spawn(task, 0.01, "boom", fail=True)
+            p.spawn(task, 0.2, "slow")
+
+    assert [s["state"] for s in p.stats] == ["failed", "passed"]
+
+
+def test_fail_fast_cancels_pending():
+    start = monotonic()
+    with pytest.raises(ValueError):
+        with parallel(max_workers=1, fail_fast=True) as p:
+            p.spawn(task, 0.01, "boom", fail=True)
+            p.spawn(task, 1, "running")
+            p.spawn(task, 1, "pending")
+
+    assert monotonic() - start < 0.5
+    assert p.stats[0]["state"] == "failed"
+    assert p.stats[-1]["state"] == "cancelled"
+
+
+def test_as_completed_streams_results():
+    with pytest.raises(ValueError):
+        with parallel() as p:
+            p.spawn(task, 0.2, "slow")
+            p.spawn(task, 0.01, "fast")
+            p.spawn(task, 0.01, "boom", fail=True)
+            results = list(p.as_completed())
+
+    assert results[-1] == "slow"
+    assert "fast" in results
+    assert any(isinstance(r, ValueError) for r in results)
+
+
+def test_stats():
+    with parallel() as p:
+        p.spawn(task, 0.1, "value")
+
+    assert p.stats[0]["name"] == "task"
+    assert p.stats[0]["duration"] >= 0.1
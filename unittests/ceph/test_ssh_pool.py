@@ -0,0 +1,203 @@
+import pickle
+import threading
+import time
+
+import mock
+import paramiko
+import pytest
+
+from ceph.ceph import SSHConnectionManager
+from ceph.ssh_pool import CAPACITY_TTL, ChannelPool, PoolTimeout, backoff_delays
+
+
+class FakeChannel:
+    def __init__(self, transport):
+        self.transport = transport
+
+    def close(self):
+        with self.transport.lock:
+            self.transport.sessions -= 1
+
+
+class FakeTransport:
+    """Transport refusing the sessions beyond the server MaxSessions"""
+
+    def __init__(self, max_sessions):
+        self.max_sessions = max_sessions
+        self.sessions = 0
+        self.active = True
+        self.lock = threading.Lock()
+
+    def is_active(self):
+        return self.active
+
+    def send_ignore(self):
+        pass
+
+    def open_session(self, timeout=None):
+        with self.lock:
+            if self.sessions >= self.max_sessions:
+                raise paramiko.ChannelException(1, "Administratively prohibited")
+            self.sessions += 1
+        return FakeChannel(self)
+
+
+class FakeClient:
+    def __init__(self, max_sessions):
+        self.transport = FakeTransport(max_sessions)
+
+    def get_transport(self):
+        return self.transport
+
+    def close(self):
+        self.transport.active = False
+
+
+def _pool(server_sessions=10, **kw):
+    clients = []
+
+    def connect():
+        clients.append(FakeClient(server_sessions))
+        return clients[-1]
+
+    primary = FakeClient(server_sessions)
+    return ChannelPool("root@node", lambda: primary, connect, **kw), primary, clients
+
+
+def _run(pool, workers, hold=0.02):
+    errors = []
+
+    def _work():
+        try:
+            with pool.session(timeout=10):
+                time.sleep(hold)
+        except Exception as err:
+            errors.append(err)
+
+    threads = [threading.Thread(target=_work) for _ in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return errors
+
+
+def test_sessions_spread_across_transports():
+    pool, _, clients = _pool(max_sessions=2, max_transports=3)
+    assert _run(pool, 20) == []
+
+    stats = pool.stats()
+    assert stats["opened"] == 20
+    assert stats["transports"] == 3 and len(clients) == 2
+    assert stats["peak"] <= 6
+    assert stats["active"] == 0 and stats["waits"] > 0
+
+
+def test_server_session_limit_is_learnt():
+    pool, primary, _ = _pool(server_sessions=2, max_sessions=8, max_transports=1)
+    assert _run(pool, 12) == []
+
+    stats = pool.stats()
+    assert stats["saturations"] >= 1
+    assert stats["capacity"] == 2
+    assert primary.transport.sessions == 0
+
+
+def test_learnt_session_limit_expires():
+    pool, primary, _ = _pool(server_sessions=2, max_sessions=8, max_transports=1)
+    assert _run(pool, 12) == []
+    assert pool.stats()["capacity"] == 2
+
+    # The sessions held outside of the pool were closed meanwhile
+    primary.transport.max_sessions = 8
+    later = time.monotonic() + CAPACITY_TTL + 1
+    with mock.patch("ceph.ssh_pool.monotonic", return_value=later):
+        assert pool.stats()["capacity"] == 8
+        slots = [pool.acquire(timeout=1) for _ in range(4)]
+    assert primary.transport.sessions == 4
+    for slot, channel in slots:
+        pool.release(slot, channel)
+
+
+def test_acquire_times_out_when_saturated():
+    pool, _, _ = _pool(max_sessions=1, max_transports=1)
+    slot, channel = pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire(timeout=0.1)
+
+    pool.release(slot, channel)
+    with pool.session(timeout=0.1):
+        pass
+
+
+def test_inactive_secondary_transport_is_replaced():
+    pool, _, clients = _pool(max_sessions=1, max_transports=2)
+    first = pool.acquire()
+    second = pool.acquire()
+    pool.release(*second)
+    pool.release(*first)
+
+    clients[0].close()
+    _, channel = pool.acquire()
+    pool.acquire()
+    assert len(clients) == 2 and channel.transport is not clients[0].transport
+
+
+def test_failed_transport_limit_expires():
+    pool, _, clients = _pool(max_sessions=1, max_transports=3)
+    first = pool.acquire()
+    with mock.patch.object(pool, "_connect", side_effect=OSError("rebooting")):
+        with pytest.raises(OSError):
+            pool.acquire()
+    assert pool.transport_limit() == 1
+    pool.release(*first)
+
+    later = time.monotonic() + CAPACITY_TTL + 1
+    with mock.patch("ceph.ssh_pool.monotonic", return_value=later):
+        assert pool.transport_limit() == 3
+        slots = [pool.acquire(timeout=1) for _ in range(3)]
+    assert len(clients) == 2
+    for slot, channel in slots:
+        pool.release(slot, channel)
+
+
+def test_primary_connects_outside_the_lock():
+    connecting, connected = threading.Event(), threading.Event()
+    primary = FakeClient(10)
+
+    def _primary():
+        connecting.set()
+        connected.wait(5)
+        return primary
+
+    pool = ChannelPool("root@node", _primary, lambda: FakeClient(10))
+    waiter = threading.Thread(target=lambda: pool.release(*pool.acquire(timeout=5)))
+    waiter.start()
+    assert connecting.wait(5)
+
+    # Neither the stats nor the other callers are blocked by the connect
+    assert pool.stats()["transports"] == 1
+    with pytest.raises(PoolTimeout):
+        pool.acquire(timeout=0.1)
+
+    connected.set()
+    waiter.join(5)
+    with pool.session(timeout=1) as channel:
+        assert channel.transport is primary.transport
+
+
+def test_backoff_delays_are_capped():
+    delays = backoff_delays(base=1, cap=4)
+    values = [next(delays) for _ in range(10)]
+    assert all(0 <= d <= 4 for d in values)
+    assert values[0] <= 1
+
+
+def test_connection_manager_pickles_without_pool():
+    conn = SSHConnectionManager("10.0.0.1", "root", "passwd")
+    state = conn.__getstate__()
+    assert "pool" not in state and "_lock" not in state
+
+    restored = pickle.loads(pickle.dumps(conn))
+    assert restored.pool is not conn.pool
+    assert restored.pool.name == "root@10.0.0.1"
@@ -0,0 +1,60 @@
+import time
+
+import mock
+
+from ceph.waiter import ADAPTIVE, WaitUntil
+from cli.utilities.waiter import WaitUntil as CliWaitUntil
+
+
+def test_single_implementation():
+    assert CliWaitUntil is WaitUntil
+
+
+def test_delays_back_off_up_to_interval():
+    with mock.patch("ceph.waiter.time.sleep") as sleep:
+        waiter = WaitUntil(timeout=60, interval=4, initial=1, backoff=2, jitter=0)
+        for w in waiter:
+            if w.attempts == 6:
+                break
+
+    assert [c.args[0] for c in sleep.call_args_list] == [1, 2, 4, 4, 4]
+    assert not waiter.expired
+
+
+def test_fixed_interval_by_default():
+    with mock.patch("ceph.waiter.time.sleep") as sleep:
+        for w in WaitUntil(timeout=60, interval=5):
+            if w.attempts == 4:
+                break
+
+    assert [c.args[0] for c in sleep.call_args_list] == [5, 5, 5]
+
+
+def test_poll_ends_soon_after_condition():
+    ready_at = time.time() + 0.3
+    waiter = WaitUntil(timeout=5, interval=1, **{**ADAPTIVE, "initial": 0.02})
+    assert waiter.poll(lambda: time.time() >= ready_at)
+
+    metrics = waiter.metrics()
+    assert 0.3 <= metrics["time_to_condition"] < 0.5
+    assert metrics["attempts"] > 1 and not metrics["expired"]
+
+
+def test_deadline_is_not_exceeded():
+    start = time.time()
+    waiter = WaitUntil(timeout=0.3, interval=10, initial=0.2, backoff=1.5)
+    assert waiter.poll(lambda: False) is False
+    assert waiter.expired
+    assert time.time() - start < 0.45
+    # first attempt immediate, then one after 0.2s and the last at the deadline
+    assert waiter.attempts == 3
+
+
+def test_condition_short_circuits():
+    calls = []
+    waiter = WaitUntil(timeout=5, interval=0.01, condition=lambda: len(calls) >= 2)
+    for _ in waiter:
+        calls.append(1)
+
+    assert len(calls) == 2
+    assert waiter.result and not waiter.expired
@@ -0,0 +1,174 @@
+import socket
+import threading
+
+import mock
+import pytest
+from paramiko.buffered_pipe import BufferedPipe
+from paramiko.pipe import make_or_pipe, make_pipe
+
+from cephci.cluster_info import (
+    PROBE_MARKER,
+    _parse_probes,
+    _probe_script,
+    probe_node,
+    stream_tarball,
+)
+
+PROBES = f"""{PROBE_MARKER} kernel
+Linux node1 5.14.0-427.el9.x86_64
+{PROBE_MARKER} release
+Red Hat Enterprise Linux release 9.4 (Plow)
+{PROBE_MARKER} repos
+Repo ID:   rhel-9-for-x86_64-baseos-rpms
+Repo Name: Red Hat Enterprise Linux 9 for x86_64 - BaseOS (RPMs)
+
+{PROBE_MARKER} packages
+cephadm-18.2.1-1.el9cp.noarch
+package ansible is not installed
+{PROBE_MARKER} images
+registry.io/ceph/ceph 18.2.1
+{PROBE_MARKER} containers
+a1b2c3 registry.io/ceph/ceph:18.2.1 ceph-osd-0
+{PROBE_MARKER} disks
+ceph--vg-osd--block
+{PROBE_MARKER} container a1b2c3
+ceph-common-18.2.1-1.el9cp.x86_64
+"""
+
+
+class FakeChannel:
+    """Channel streaming the given stderr and stdout data from a timer"""
+
+    def __init__(self, out=b"", err=b"", rc=0, hang=False):
+        self.in_buffer = BufferedPipe()
+        self.in_stderr_buffer = BufferedPipe()
+        self.eof_received = False
+        self.rc = rc
+        self.data = (out, err)
+        self.hang = hang
+
+    def fileno(self):
+        pipe = make_pipe()
+        p1, p2 = make_or_pipe(pipe)
+        self.in_buffer.set_event(p1)
+        self.in_stderr_buffer.set_event(p2)
+        return pipe.fileno()
+
+    def settimeout(self, timeout):
+        pass
+
+    def exec_command(self, cmd):
+        self.cmd = cmd
+        if not self.hang:
+            threading.Timer(0.01, self._send).start()
+
+    def _send(self):
+        out, err = self.data
+        self.in_stderr_buffer.feed(err)
+        for idx in range(0, len(out), 1000):
+            self.in_buffer.feed(out[idx : idx + 1000])
+        self.eof_received = True
+        self.in_buffer.close()
+        self.in_stderr_buffer.close()
+
+    def recv_ready(self):
+        return self.in_buffer.read_ready()
+
+    def recv(self, nbytes):
+        return self.in_buffer.read(nbytes)
+
+    def recv_stderr_ready(self):
+        return self.in_stderr_buffer.read_ready()
+
+    def recv_stderr(self, nbytes):
+        return self.in_stderr_buffer.read(nbytes)
+
+    def recv_exit_status(self):
+        return self.rc
+
+
+class RacyChannel(FakeChannel):
+    """Channel receiving all of its data and EOF right after being polled"""
+
+    def recv_ready(self):
+        ready = super().recv_ready()
+        if not ready and not self.eof_received:
+            self._send()
+        return ready
+
+    def exec_command(self, cmd):
+        self.cmd = cmd
+
+
+def _node(role="osd", channel=None):
+    node = mock.Mock(hostname="node1", role=role)
+    node.root_connection.pool.acquire.return_value = ("slot", channel)
+    return node
+
+
+def test_probe_script():
+    script = _probe_script(_node("osd"))
+    for name in ("kernel", "release", "repos", "packages", "images", "disks"):
+        assert f"echo '{PROBE_MARKER} {name}'" in script
+    assert "podman exec $ctr" in script
+
+    script = _probe_script(_node("client"))
+    assert f"{PROBE_MARKER} images" not in script
+    assert f"{PROBE_MARKER} disks" not in script
+    assert "podman exec" not in script
+
+
+def test_parse_probes():
+    probes = _parse_probes(f"noise\n{PROBES}{PROBE_MARKER} empty\n")
+
+    assert probes["kernel"] == ["Linux node1 5.14.0-427.el9.x86_64"]
+    assert probes["container a1b2c3"] == ["ceph-common-18.2.1-1.el9cp.x86_64"]
+    assert probes["empty"] == []
+    assert "noise" not in str(probes)
+
+
+def test_probe_node():
+    node = _node("osd")
+    node.exec_command.return_value = (PROBES, "")
+    hostname, info = probe_node(node)
+
+    assert hostname == "node1"
+    assert node.exec_command.call_count == 1
+    assert info["Repos_enabled"] == ["rhel-9-for-x86_64-baseos-rpms"]
+    assert info["List_of_packages"] == ["cephadm-18.2.1-1.el9cp.noarch"]
+    assert info["List_of_images"] == [
+        {"Name": "registry.io/ceph/ceph", "Tag": "18.2.1"}
+    ]
+    assert info["List_of_containers"][0]["Packages"] == [
+        "ceph-common-18.2.1-1.el9cp.x86_64"
+    ]
+    assert info["List_of_host_ceph_disks"] == ["ceph--vg-osd--block"]
+
+
+def test_stream_tarball_drains_stderr(tmp_path):
+    out = bytes(range(256)) * 400
+    channel = FakeChannel(out=out, err=b"tar: file changed as we read it\n" * 4000)
+    node = _node(channel=channel)
+    dst = tmp_path / "node1.tar"
+
+    assert stream_tarball(node, ["var/log/ceph"], str(dst)) == len(out)
+    assert dst.read_bytes() == out
+    assert not channel.recv_stderr_ready()
+    node.root_connection.pool.release.assert_called_once_with("slot", channel)
+
+
+def test_stream_tarball_keeps_data_fed_with_eof(tmp_path):
+    channel = RacyChannel(out=b"tail" * 10)
+    dst = tmp_path / "node1.tar"
+
+    assert stream_tarball(_node(channel=channel), ["etc/ceph"], str(dst)) == 40
+    assert dst.read_bytes() == b"tail" * 10
+
+
+def test_stream_tarball_timeout(tmp_path):
+    channel = FakeChannel(hang=True)
+    node = _node(channel=channel)
+
+    with pytest.raises(socket.timeout):
+        stream_tarball(node, ["var/log/ceph"], str(tmp_path / "x.tar"), timeout=0.1)
+    node.root_connection.pool.release.assert_called_once_with("slot", channel)
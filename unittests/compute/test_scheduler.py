@@ -0,0 +1,104 @@
+import threading
+from time import sleep
+
+import mock
+import pytest
+
+from compute.exceptions import NodeError
+from compute.scheduler import (
+    ProvisionScheduler,
+    ProvisionThrottled,
+    TokenBucket,
+    is_throttled,
+)
+
+
+class Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+@pytest.fixture
+def scheduler():
+    _scheduler = ProvisionScheduler(
+        rate=1000, burst=1000, max_in_flight=2, retries=2, base_delay=0
+    )
+    return _scheduler
+
+
+def test_is_throttled():
+    assert is_throttled(response=Response(429))
+    assert not is_throttled(response=Response(201))
+    assert is_throttled(error=Exception("RequestLimitExceeded"))
+    assert not is_throttled(error=NodeError("Failed to create VM"))
+    assert not is_throttled(error=NodeError("Quota exceeded for instances"))
+    assert not is_throttled(error=NodeError("Volume 1f429a not found"))
+
+
+@mock.patch("compute.scheduler.sleep")
+def test_token_bucket_waits_for_refill(sleep_mock):
+    bucket = TokenBucket(rate=2, burst=1)
+    bucket.acquire()
+    sleep_mock.side_effect = lambda _: setattr(bucket, "_tokens", 1)
+    bucket.acquire()
+    assert sleep_mock.call_args[0][0] == pytest.approx(0.5, abs=0.01)
+
+
+def test_retry_on_throttled_error(scheduler):
+    func = mock.Mock(side_effect=[NodeError("429 Too Many Requests"), "vm"])
+    func.__name__ = "setup_vm_node"
+    assert scheduler.run(func, "node1") == "vm"
+    assert func.call_count == 2
+
+
+def test_no_retry_on_other_errors(scheduler):
+    func = mock.Mock(side_effect=NodeError("Failed to create VM"))
+    func.__name__ = "setup_vm_node"
+    with pytest.raises(NodeError):
+        scheduler.run(func)
+    assert func.call_count == 1
+
+
+def test_throttled_response_exhausts_retries(scheduler):
+    func = mock.Mock(return_value=Response(429))
+    func.__name__ = "post"
+    with pytest.raises(ProvisionThrottled):
+        scheduler.run(func)
+    assert func.call_count == 3
+
+
+def test_max_in_flight(scheduler):
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def provision():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        sleep(0.05)
+        with lock:
+            active[0] -= 1
+
+    threads = [
+        threading.Thread(target=scheduler.run, args=(provision,)) for _ in range(6)
+    ]
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+    assert peak[0] == 2
+
+
+def test_in_flight_not_bounded_by_default():
+    assert ProvisionScheduler().max_in_flight is None
+
+
+def test_from_custom_config():
+    _scheduler = ProvisionScheduler.from_custom_config(
+        ["provision_rate=2", "provision_max_in_flight=3", "foo=bar"]
+    )
+    assert _scheduler.bucket.rate == 2.0
+    assert _scheduler.max_in_flight == 3
+
+    _scheduler = ProvisionScheduler.from_custom_config(
+        ["provision_retries=4"], retries=0
+    )
+    assert _scheduler.retries == 0
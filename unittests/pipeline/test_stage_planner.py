@@ -0,0 +1,109 @@
+import os
+
+import mock
+import yaml
+
+from pipeline.scripts.ci.stage_planner import (
+    _suite_duration,
+    load_history,
+    load_or_plan,
+    plan_stages,
+)
+
+XUNIT = """<testsuites><testsuite name="{file}">
+<properties><property name="suite-name" value=" {name}"/></properties>
+<testcase name="install" time="{time}"/><testcase name="io" time="0"/>
+</testsuite></testsuites>"""
+
+
+def _conf(repo_dir, nodes):
+    name = f"conf/{nodes}-node.yaml"
+    path = os.path.join(repo_dir, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    cluster = {f"node{i}": {"role": ["osd"]} for i in range(1, nodes + 1)}
+    with open(path, "w") as fh:
+        yaml.dump({"globals": [{"ceph-cluster": cluster}]}, fh)
+    return name
+
+
+def _suite(name, duration, nodes, repo_dir):
+    return {
+        "name": name,
+        "suite": f"suites/{name}.yaml",
+        "execution_time": f"{duration}s",
+        "global-conf": _conf(repo_dir, nodes),
+    }
+
+
+def _names(stage):
+    return [[s["name"] for s in lane["suites"]] for lane in stage["lanes"]]
+
+
+def test_quota_packing(tmp_path):
+    suites = [_suite(n, 100, 3, str(tmp_path)) for n in ("a", "b", "c", "d", "e")]
+    stages = plan_stages(suites, {}, quota=9, repo_dir=str(tmp_path))
+
+    assert [_names(s) for s in stages] == [[["a"], ["b"], ["c"]], [["d"], ["e"]]]
+    assert [s["nodes"] for s in stages] == [9, 6]
+    assert (stages[1]["start"], stages[1]["end"]) == (100, 200)
+
+
+def test_suite_larger_than_quota(tmp_path):
+    suites = [
+        _suite("big", 50, 12, str(tmp_path)),
+        _suite("small", 300, 2, str(tmp_path)),
+    ]
+    stages = plan_stages(suites, {}, quota=5, repo_dir=str(tmp_path))
+
+    assert [_names(s) for s in stages] == [[["small"]], [["big"]]]
+    assert stages[1]["nodes"] == 12
+
+
+def test_lane_chaining(tmp_path):
+    suites = [
+        _suite("long", 100, 2, str(tmp_path)),
+        _suite("mid", 60, 2, str(tmp_path)),
+        _suite("short", 40, 1, str(tmp_path)),
+    ]
+    stages = plan_stages(suites, {}, quota=4, repo_dir=str(tmp_path))
+
+    assert len(stages) == 1 and _names(stages[0]) == [["long"], ["mid", "short"]]
+    short = stages[0]["lanes"][1]["suites"][1]
+    assert (short["start"], short["end"]) == (60, 100)
+
+
+def test_suite_duration_uses_joined_name():
+    suite = {"suite": "suites/a.yaml::suites/b.yaml", "execution_time": "1h"}
+    history = {"suites/a.yaml": 100, "suites/a.yaml::suites/b.yaml": 700}
+
+    assert _suite_duration(suite, history, 5) == 700
+    assert _suite_duration(suite, {"suites/b.yaml": 200}, 5) == 200
+    assert _suite_duration(suite, {}, 5) == 3600
+    assert _suite_duration({}, {}, 5) == 5
+
+
+def test_load_history(tmp_path):
+    for run, time in enumerate([900, 100, 200, 300]):
+        path = tmp_path / f"run{run}" / "xunit.xml"
+        path.parent.mkdir()
+        path.write_text(XUNIT.format(file="a", name="suites/a.yaml", time=time))
+        os.utime(path, (run, run))
+    (tmp_path / "run4").mkdir()
+    (tmp_path / "run4" / "xunit.xml").write_text("<testsuites>")
+
+    assert load_history(str(tmp_path), runs=3) == {"suites/a.yaml": 200}
+    assert load_history(str(tmp_path), runs=5) == {"suites/a.yaml": 250}
+
+
+def test_load_or_plan(tmp_path):
+    plan_file = str(tmp_path / "plan.json")
+    plan = mock.Mock(return_value=[{"stage": "stage-1"}])
+
+    assert load_or_plan(plan_file, "v1", plan) == [{"stage": "stage-1"}]
+    assert load_or_plan(plan_file, "v1", plan) == [{"stage": "stage-1"}]
+    assert plan.call_count == 1
+
+    plan.return_value = [{"stage": "stage-2"}]
+    assert load_or_plan(plan_file, "v2", plan) == [{"stage": "stage-2"}]
+    assert load_or_plan("", "v2", plan) == [{"stage": "stage-2"}]
+    assert plan.call_count == 3
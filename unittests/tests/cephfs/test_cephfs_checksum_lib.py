@@ -0,0 +1,94 @@
+import mock
+import pytest
+
+from ceph.ceph import CommandFailed
+from tests.cephfs.lib.cephfs_checksum_lib import (
+    ChecksumParser,
+    diff_tree_checksums,
+    get_tree_checksums,
+)
+
+
+class FakeChannel:
+    """Channel holding the complete output of the command, read in small chunks"""
+
+    def __init__(self, out=b"", err=b"", rc=0, chunk=7, eof=True):
+        self.out = [out[i : i + chunk] for i in range(0, len(out), chunk)]
+        self.err = [err] if err else []
+        self.rc = rc
+        self.eof_received = eof
+
+    def settimeout(self, timeout):
+        pass
+
+    def exec_command(self, cmd):
+        self.cmd = cmd
+
+    def recv_ready(self):
+        return bool(self.out)
+
+    def recv(self, nbytes):
+        return self.out.pop(0)
+
+    def recv_stderr_ready(self):
+        return bool(self.err)
+
+    def recv_stderr(self, nbytes):
+        return self.err.pop(0)
+
+    def recv_exit_status(self):
+        return self.rc
+
+
+def _client(channel):
+    client = mock.Mock(hostname="client1")
+    client.root_connection.pool.acquire.return_value = ("slot", channel)
+    return client
+
+
+def test_parser_records_across_chunks():
+    parser = ChecksumParser()
+    records = list(parser.feed(b"d41d8  ./dir/a\0e3b0"))
+    records += list(parser.feed(b"c  ./b c\0f00  ./last"))
+    records += list(parser.close())
+
+    assert records == [("dir/a", "d41d8"), ("b c", "e3b0c"), ("last", "f00")]
+    assert list(parser.close()) == []
+
+    with pytest.raises(ValueError, match="Malformed"):
+        list(ChecksumParser().feed(b"garbage\0"))
+
+
+def test_tree_checksums():
+    channel = FakeChannel(out=b"aa  ./x\0bb  ./y/z\0", err=b"warning\n")
+    client = _client(channel)
+
+    assert get_tree_checksums(client, "/mnt/cephfs") == {"x": "aa", "y/z": "bb"}
+    assert "cd /mnt/cephfs && find . -type f" in channel.cmd
+    assert not channel.recv_stderr_ready()
+    client.root_connection.pool.release.assert_called_once_with("slot", channel)
+
+
+def test_tree_checksums_failure():
+    channel = FakeChannel(err=b"No such file or directory", rc=1)
+    with pytest.raises(CommandFailed, match="No such file or directory"):
+        get_tree_checksums(_client(channel), "/mnt/missing")
+
+
+@mock.patch("ceph.ceph.select.select", return_value=([], [], []))
+def test_tree_checksums_timeout(_):
+    channel = FakeChannel(eof=False)
+    client = _client(channel)
+
+    with pytest.raises(CommandFailed, match="within 3600s"):
+        get_tree_checksums(client, "/mnt/cephfs")
+    client.root_connection.pool.release.assert_called_once_with("slot", channel)
+
+
+def test_diff_tree_checksums():
+    out = b"Saa  ./mod\0Tab  ./mod\0Scc  ./gone\0Tdd  ./new\0"
+    channel = FakeChannel(out=out)
+    diff = diff_tree_checksums(_client(channel), "/mnt/.snap/s1", "/mnt")
+
+    assert diff == {"modified": ["mod"], "missing": ["gone"], "extra": ["new"]}
+    assert "comm -3 -z" in channel.cmd
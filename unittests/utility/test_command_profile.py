@@ -0,0 +1,58 @@
+import csv
+import json
+
+from utility.command_profile import CommandProfiler, normalize_command
+from utility.log import clear_thread_test, set_thread_test
+
+
+def test_normalize_command():
+    assert normalize_command("ceph osd out 12") == "ceph osd out <n>"
+    assert normalize_command("ping -c 3 10.0.0.12") == "ping -c <n> <ip>"
+    assert normalize_command("echo 'secret data'") == "echo '<str>'"
+    assert "abc" not in normalize_command("login --password abc")
+
+
+def test_flush(tmp_path):
+    profiler = CommandProfiler(size=2)
+    for osd_id in range(3):
+        profiler.record("node1", f"ceph osd out {osd_id}", 0.5, 14, 0, 0)
+
+    prefix = str(tmp_path / "test")
+    assert profiler.flush(prefix) == 2
+    assert profiler.flush(prefix) == 0
+
+    with open(f"{prefix}.profile.json") as fh:
+        records = json.load(fh)
+    assert records[0]["template"] == "ceph osd out <n>"
+    assert records[0]["host"] == "node1"
+
+    with open(f"{prefix}.profile.csv") as fh:
+        assert len(list(csv.reader(fh))) == 3
+
+
+def test_flush_per_test(tmp_path):
+    profiler = CommandProfiler()
+    for test in ("test-a", "test-b"):
+        set_thread_test(test)
+        profiler.record("node1", f"ceph osd pool create {test}", 0.5, 30, 0, 0)
+    clear_thread_test()
+    profiler.record("node1", "ceph -s", 0.1, 7, 100, 0)
+
+    assert profiler.flush(str(tmp_path / "test-a"), test="test-a") == 1
+    with open(tmp_path / "test-a.profile.json") as fh:
+        assert json.load(fh)[0]["template"].endswith("test-a")
+
+    # the records of the other tests and of the run are left for their flush
+    assert profiler.flush(str(tmp_path / "tests")) == 2
+
+
+def test_summary():
+    profiler = CommandProfiler()
+    profiler.record("node1", "ceph osd dump", 2.0, 13, 100, 0)
+    profiler.record("node1", "ceph -s", 0.1, 7, 100, 0)
+    profiler.record("node2", "ceph -s", 0.3, 7, 100, 0)
+
+    lines = profiler.summary(top=1).splitlines()
+    assert "ceph osd dump" in lines[3]
+    assert lines[-1].split()[0] == "2"
+    assert lines[-1].endswith("ceph -s")
@@ -0,0 +1,93 @@
+import base64
+import json
+
+import mock
+
+from utility import fio_results
+
+
+def _job(name, iops, percentiles, total_ios=1000, bins=None):
+    clat = {
+        "min": 100,
+        "max": 10000,
+        "mean": 1000.0,
+        "N": total_ios,
+        "percentile": {f"{p:.6f}": v for p, v in percentiles.items()},
+    }
+    if bins:
+        clat["bins"] = {str(k): v for k, v in bins.items()}
+    stats = {
+        "iops": iops,
+        "bw": iops * 4,
+        "io_bytes": total_ios * 4096,
+        "runtime": 1000,
+        "total_ios": total_ios,
+        "lat_ns": {"mean": 1100.0},
+        "clat_ns": clat,
+    }
+    return {"jobname": name, "read": stats, "write": {"total_ios": 0}}
+
+
+def _report(*jobs):
+    return "fio: warning, ignored\n" + json.dumps({"jobs": list(jobs)})
+
+
+def test_parse_fio_json():
+    records = fio_results.parse_fio_json(
+        _report(_job("randread", 250.0, {50: 1000, 99: 5000})), "c1", "r.json"
+    )
+    assert len(records) == 1
+    record = records[0]
+    assert (record.test, record.direction, record.client) == ("randread", "read", "c1")
+    assert record.percentiles == {50.0: 1000, 99.0: 5000}
+    assert record.bins is None
+
+
+def test_merge_percentiles():
+    fast = _job("j", 100.0, {50: 1000, 99: 2000})
+    slow = _job("j", 100.0, {50: 3000, 99: 9000})
+    records = fio_results.parse_fio_json(_report(fast), "c1", test="t")
+    records += fio_results.parse_fio_json(_report(slow), "c2", test="t")
+
+    summary = fio_results.merge_records(records, percentiles=(50.0, 99.0))[0]
+    assert (summary["clients"], summary["iops"]) == (2, 200.0)
+    assert summary["percentile_method"] == "mixture"
+    # the median of the mixture is not the mean of the medians
+    assert round(summary["p50_ms"] * 1e6) == 1521
+    assert 2000 < summary["p99_ms"] * 1e6 <= 9000
+
+    hist = [
+        _job("j", 1.0, {50: 2}, total_ios=4, bins={1: 2, 2: 1, 9: 1}),
+        _job("j", 1.0, {50: 5}, total_ios=4, bins={5: 4}),
+    ]
+    records = [
+        r
+        for i, j in enumerate(hist)
+        for r in fio_results.parse_fio_json({"jobs": [j]}, f"c{i}")
+    ]
+    summary = fio_results.merge_records(records, percentiles=(50.0, 99.0))[0]
+    assert summary["percentile_method"] == "hist"
+    assert (summary["p50_ms"] * 1e6, summary["p99_ms"] * 1e6) == (5, 9)
+
+
+def test_collect_and_report(tmp_path):
+    report = _report(_job("seqwrite", 10.0, {50: 1000}))
+    node = mock.MagicMock(hostname="client1")
+    node.exec_command.return_value = (
+        f"{fio_results.FIO_MARKER} /root/a.json\n"
+        f"{base64.b64encode(report.encode()).decode()}\n",
+        "",
+    )
+
+    records = fio_results.collect_fio_results(
+        node, {"/root/a.json": "cephfs", "/root/b.json": "nfs"}, save_dir=str(tmp_path)
+    )
+    assert node.exec_command.call_count == 1
+    assert [(r.test, r.client) for r in records] == [("cephfs", "client1")]
+    assert (tmp_path / "a.json").read_text() == report
+
+    summary = fio_results.write_fio_report(records, str(tmp_path / "out.json"))
+    artifact = json.loads((tmp_path / "out.json").read_text())
+    assert artifact["summary"] == json.loads(json.dumps(summary))
+    assert "bins" not in artifact["records"][0]
+    assert "cephfs" in fio_results.format_summary(summary)
@@ -4,12 +4,22 @@
 This test module uses pytest to unit test the sensitive data log filter
 """
 
+import logging
 import os
+import threading
+import time
 from copy import deepcopy
 
 import pytest
 
-from utility.log import Log
+from utility.log import (
+    Log,
+    LogPipeline,
+    QueuedRotatingFileHandler,
+    SensitiveLogFilter,
+    clear_thread_test,
+    set_thread_test,
+)
 
 str_data = "This has password something."
 str_data_no_passwd = "This test has no sensitive data."
@@ -116,3 +126,151 @@ def test_log_list_of_dictionaries(logger):
     assert list_dict_data[1]["test"]["module"] in log_contents
     assert "masked" not in log_contents
     assert None not in _test_data
+
+
+def test_log_routing_concurrent_tests(tmp_path):
+    """Records of a thread are written only to the log of its test."""
+    log = Log()
+    for name in ("test-a", "test-b"):
+        log.configure_logger(name, str(tmp_path), True, concurrent=True)
+
+    def emit(name):
+        set_thread_test(name)
+        log.info(f"message from {name}")
+        clear_thread_test()
+
+    threads = [threading.Thread(target=emit, args=(n,)) for n in ("test-a", "test-b")]
+    for thread in threads:
+        thread.start()
+        thread.join()
+    log.info("message from run")
+
+    log.close_and_remove_filehandlers("test-a")
+    log.info("message after test-a")
+    log.close_and_remove_filehandlers()
+
+    log_a = (tmp_path / "test-a.log").read_text()
+    log_b = (tmp_path / "test-b.log").read_text()
+    assert "message from test-a" in log_a and "message from test-b" not in log_a
+    assert "message from test-b" in log_b and "message from test-a" not in log_b
+    assert "message from run" in log_a and "message from run" in log_b
+    assert "message after test-a" not in log_a and "message after test-a" in log_b
+
+
+@pytest.fixture
+def queued_logger(tmp_path, monkeypatch):
+    """Returns the logger writing the log files through the LogPipeline."""
+    pipeline = LogPipeline(flush_interval=0.05)
+    monkeypatch.setattr("utility.log._pipeline", pipeline)
+    log = Log()
+    log.configure_logger("queued", str(tmp_path), True)
+    yield log, pipeline, tmp_path
+    log.close_and_remove_filehandlers()
+
+
+def test_log_pipeline_writes_redacted_records(queued_logger):
+    log, pipeline, tmp_path = queued_logger
+    assert isinstance(log.logger.handlers[0], QueuedRotatingFileHandler)
+
+    _test_data = deepcopy(dict_data)
+    for num in range(100):
+        log.info(f"line {num} with %s", "password secret")
+    log.info(_test_data)
+    log.error("failed")
+    log.close_and_remove_filehandlers()
+
+    log_contents = (tmp_path / "queued.log").read_text()
+    assert log_contents.count("with password <masked>") == 100
+    assert "'access-key': '<masked>'" in log_contents
+    assert "secret" not in log_contents
+    assert _test_data == dict_data
+    assert (tmp_path / "queued.err").read_text().endswith("failed\n")
+
+    stats = pipeline.stats()
+    assert stats["written"] >= 103 and stats["dropped"] == 0
+    assert stats["depth"] == 0 and stats["batches"] <= stats["written"]
+
+
+def test_log_pipeline_drops_when_full():
+    blocked = threading.Event()
+
+    class SlowHandler:
+        def write(self, record):
+            blocked.wait()
+
+        def flush(self):
+            pass
+
+    pipeline = LogPipeline(max_queue=2, put_timeout=0.01)
+    for num in range(6):
+        pipeline.submit(SlowHandler(), num)
+
+    assert pipeline.dropped >= 1
+    blocked.set()
+    pipeline.flush()
+    stats = pipeline.stats()
+    assert stats["depth"] == 0
+    assert stats["written"] + stats["dropped"] == 6
+
+
+def test_log_pipeline_flushes_a_single_handler():
+    gate, hold, written = threading.Event(), threading.Event(), []
+
+    class Handler:
+        def __init__(self, event=None):
+            self.event = event
+
+        def write(self, record):
+            if self.event:
+                self.event.wait()
+            written.append(record)
+
+        def flush(self):
+            pass
+
+    pipeline = LogPipeline(flush_interval=0.05)
+    pipeline.submit(Handler(gate), "a1")
+    while pipeline.stats()["depth"]:
+        time.sleep(0.01)
+
+    # b1 and the flush marker of its handler are queued ahead of a2
+    handler = Handler()
+    pipeline.submit(handler, "b1")
+    flusher = threading.Thread(target=pipeline.flush, args=(handler,))
+    flusher.start()
+    while pipeline.stats()["depth"] < 2:
+        time.sleep(0.01)
+    pipeline.submit(Handler(hold), "a2")
+
+    gate.set()
+    flusher.join(timeout=5)
+    assert not flusher.is_alive()
+    assert written == ["a1", "b1"]
+
+    hold.set()
+    pipeline.flush()
+    assert pipeline.stats()["written"] == 3
+
+
+def test_queued_handler_not_reopened_after_close(tmp_path):
+    pipeline = LogPipeline(flush_interval=0.05)
+    handler = QueuedRotatingFileHandler(str(tmp_path / "closed.log"), pipeline)
+    record = logging.makeLogRecord({"msg": "before close"})
+    handler.handle(record)
+    handler.close()
+
+    # Records queued after the flush marker of close are dropped
+    pipeline.submit(handler, logging.makeLogRecord({"msg": "after close"}))
+    handler.handle(logging.makeLogRecord({"msg": "after close"}))
+    pipeline.flush()
+
+    assert handler.stream is None
+    assert (tmp_path / "closed.log").read_text() == "before close\n"
+
+
+def test_redaction_fast_path():
+    log_filter = SensitiveLogFilter()
+    line = "osd.1 pg 3.1f active+clean"
+    assert log_filter.redact(line) is line
+    assert log_filter.redact(b"TOKEN=abc def") == "TOKEN <masked> def"
+    assert log_filter.redact(("keyring: x", 1)) == ("keyring <masked>", 1)
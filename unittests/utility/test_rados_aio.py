@@ -0,0 +1,100 @@
+import io
+import threading
+
+import pytest
+
+from utility.rados_aio import AioPipeline, AioPipelineError
+
+
+class FakeCompletion:
+    def __init__(self, rc):
+        self.rc = rc
+
+    def get_return_value(self):
+        return self.rc
+
+
+class FakeIoctx:
+    """Completes every op from a separate thread after a short delay"""
+
+    def __init__(self, fail=()):
+        self.fail = fail
+        self.objects = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.released = 0
+        self.lock = threading.Lock()
+
+    def _queue(self, obj, oncomplete, apply):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        def _complete():
+            rc = -5 if obj in self.fail else 0
+            with self.lock:
+                self.in_flight -= 1
+                if not rc:
+                    apply()
+            oncomplete(FakeCompletion(rc))
+
+        threading.Timer(0.001, _complete).start()
+
+    def aio_write(self, obj, data, offset=0, oncomplete=None):
+        self._queue(obj, oncomplete, lambda: self.objects.update({obj: data}))
+
+    def aio_remove(self, obj, oncomplete=None):
+        self._queue(obj, oncomplete, lambda: self.objects.pop(obj))
+
+    def create_write_op(self):
+        return {}
+
+    def set_omap(self, write_op, keys, values):
+        write_op.update(zip(keys, values))
+
+    def operate_aio_write_op(self, write_op, obj, oncomplete=None):
+        self._queue(obj, oncomplete, lambda: self.objects.update({obj: write_op}))
+
+    def release_write_op(self, write_op):
+        self.released += 1
+
+
+def _pipeline(ioctx, **kw):
+    return AioPipeline(ioctx, window=4, stream=io.StringIO(), **kw)
+
+
+def test_write_and_remove():
+    ioctx = FakeIoctx()
+    with _pipeline(ioctx, total=10) as pipeline:
+        for i in range(10):
+            pipeline.write(f"obj_{i}", b"x" * 8)
+
+    assert pipeline.completed == 10 and pipeline.bytes == 80
+    assert ioctx.max_in_flight <= 4
+
+    with _pipeline(ioctx) as pipeline:
+        for i in range(0, 10, 2):
+            pipeline.remove(f"obj_{i}")
+
+    assert sorted(ioctx.objects) == [f"obj_{i}" for i in range(1, 10, 2)]
+    assert "5 ops in" in pipeline.summary()
+
+
+def test_set_omap():
+    ioctx = FakeIoctx()
+    with _pipeline(ioctx) as pipeline:
+        for i in range(6):
+            pipeline.set_omap(f"omap_{i}", ("k1", "k2"), ("v1", "v2"))
+
+    assert ioctx.objects["omap_5"] == {"k1": "v1", "k2": "v2"}
+    assert ioctx.released == 6
+
+
+def test_failed_ops():
+    ioctx = FakeIoctx(fail=("obj_2",))
+    with pytest.raises(AioPipelineError, match="obj_2 returned -5"):
+        with _pipeline(ioctx) as pipeline:
+            for i in range(5):
+                pipeline.write(f"obj_{i}", b"x")
+
+    assert pipeline.completed == 5 and len(pipeline.errors) == 1
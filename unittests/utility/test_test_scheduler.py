@@ -0,0 +1,109 @@
+import threading
+
+import pytest
+
+from utility import test_scheduler
+
+CLUSTERS = ["ceph-pri", "ceph-sec"]
+
+
+def _test(name, **kwargs):
+    return dict(name=name, module=f"{name}.py", **kwargs)
+
+
+def test_plan_default_claims_preserve_order():
+    nodes = test_scheduler.plan([_test("a"), _test("b"), _test("c")], CLUSTERS)
+    assert [n.depends_on for n in nodes] == [set(), {0}, {0, 1}]
+
+
+def test_plan_independent_clusters():
+    tests = [
+        _test("pri", clusters={"ceph-pri": {}}),
+        _test("sec", clusters={"ceph-sec": {}}),
+        _test("both"),
+    ]
+    nodes = test_scheduler.plan(tests, CLUSTERS)
+    assert nodes[1].depends_on == set()
+    assert nodes[2].depends_on == {0, 1}
+
+
+def test_plan_shared_and_pool_claims():
+    tests = [
+        _test("r1", resources=[{"cluster": "ceph-pri", "mode": "shared"}]),
+        _test("r2", resources=[{"cluster": "ceph-pri", "mode": "shared"}]),
+        _test("p1", resources=[{"cluster": "ceph-sec", "pool": "p1"}]),
+        _test("p2", resources=[{"cluster": "ceph-sec", "pool": "p2"}]),
+        _test("sec", resources=[{"cluster": "ceph-sec", "mode": "shared"}]),
+    ]
+    nodes = test_scheduler.plan(tests, CLUSTERS)
+    assert [n.depends_on for n in nodes[:4]] == [set(), set(), set(), set()]
+    assert nodes[4].depends_on == {2, 3}
+
+
+def test_plan_depends_on_and_barrier():
+    tests = [
+        _test("a", resources=[{"cluster": "ceph-pri"}]),
+        _test("b", resources=[{"cluster": "ceph-sec"}], **{"depends-on": ["a"]}),
+        _test("c", resources=[{"cluster": "ceph-sec"}], **{"recreate-cluster": True}),
+        _test("d", resources=[{"cluster": "ceph-pri"}]),
+    ]
+    nodes = test_scheduler.plan(tests, CLUSTERS)
+    assert nodes[1].required == {0}
+    assert nodes[2].depends_on == {0, 1}
+    assert nodes[3].depends_on == {0, 2}
+
+
+def test_plan_invalid_dependencies():
+    with pytest.raises(test_scheduler.TestSchedulerError):
+        test_scheduler.plan([_test("a", **{"depends-on": ["x"]})], CLUSTERS)
+
+    with pytest.raises(test_scheduler.TestSchedulerError):
+        test_scheduler.plan(
+            [_test("a", **{"depends-on": "b"}), _test("b")],
+            CLUSTERS,
+        )
+
+
+def test_scheduler_runs_independent_tests_concurrently():
+    tests = [_test(f"t{i}", resources=[{"pool": f"p{i}"}]) for i in range(3)]
+    nodes = test_scheduler.plan(tests, CLUSTERS)
+    barrier = threading.Barrier(3, timeout=5)
+
+    def execute(node):
+        barrier.wait()
+        return node.name
+
+    scheduler = test_scheduler.TestScheduler(nodes, workers=3)
+    results = scheduler.run(execute)
+    assert [r for _, r in results] == ["t0", "t1", "t2"]
+
+
+def test_scheduler_skip_and_abort():
+    tests = [
+        _test("a", resources=[{"pool": "a"}]),
+        _test("b", resources=[{"pool": "b"}], **{"depends-on": ["a"]}),
+        _test("c", resources=[{"pool": "c"}], **{"depends-on": ["b"]}),
+        _test("d", resources=[{"pool": "a"}]),
+    ]
+    nodes = test_scheduler.plan(tests, CLUSTERS)
+    scheduler = test_scheduler.TestScheduler(nodes, workers=1)
+    results = scheduler.run(
+        lambda node: "Failed" if node.name == "a" else "Pass",
+        succeeded=lambda result: result == "Pass",
+        skip=lambda node: "Skipped",
+    )
+    assert [(n.name, r) for n, r in results] == [
+        ("a", "Failed"),
+        ("b", "Skipped"),
+        ("c", "Skipped"),
+        ("d", "Pass"),
+    ]
+
+    scheduler = test_scheduler.TestScheduler(nodes, workers=1)
+    results = scheduler.run(
+        lambda node: "Failed",
+        succeeded=lambda result: result == "Pass",
+        abort=lambda node, _: True,
+    )
+    assert scheduler.aborted
+    assert [n.name for n, _ in results] == ["a"]
@@ -0,0 +1,124 @@
+import mock
+import pytest
+
+from ceph.ceph import CommandFailed
+from utility import tool_bundle
+from utility.tool_bundle import ToolBundle
+
+REVISION = "0123456789abcdef0123456789abcdef01234567"
+
+
+def _node(name, platform="rhel-9.4-py3.9-x86_64", installed=""):
+    node = mock.MagicMock(shortname=name)
+    node.commands = []
+
+    def _exec(cmd, **kw):
+        node.commands.append(cmd)
+        if "os-release" in cmd:
+            return f"{platform}\n/home/cephuser\n{installed}\n", ""
+        return "", ""
+
+    def _download(src, dst):
+        with open(dst, "w") as fd:
+            fd.write(src)
+
+    node.exec_command.side_effect = _exec
+    node.download_file.side_effect = _download
+    return node
+
+
+@pytest.fixture
+def bundle(tmp_path):
+    return ToolBundle(
+        name="rgw-tests",
+        repo_url="https://example.com/ceph-qe-scripts.git",
+        branch=REVISION,
+        requirements="rgw/requirements.txt",
+        cache_dir=str(tmp_path),
+    )
+
+
+def test_built_once_and_pushed_concurrently(bundle):
+    nodes = [_node(f"node{i}") for i in range(3)]
+    actions = bundle.deploy(nodes)
+
+    assert actions == {"node0": "built", "node1": "pushed", "node2": "pushed"}
+    assert nodes[0].download_file.call_count == 1
+    assert nodes[0].upload_file.call_count == 0
+    for node in nodes[1:]:
+        assert node.upload_file.call_count == 1
+        assert not any("git clone" in cmd for cmd in node.commands)
+
+
+def test_cached_bundle_is_reused(bundle):
+    bundle.deploy([_node("builder"), _node("node0")])
+    nodes = [_node("node1"), _node("node2")]
+
+    assert bundle.deploy(nodes) == {"node1": "pushed", "node2": "pushed"}
+
+
+def test_single_node_is_not_archived(bundle, tmp_path):
+    node = _node("node0")
+
+    assert bundle.deploy([node]) == {"node0": "built"}
+    assert node.download_file.call_count == 0
+    assert not any("tar czf" in cmd for cmd in node.commands)
+    assert not list(tmp_path.iterdir())
+
+
+def test_nodes_holding_the_key_are_skipped(bundle):
+    key = bundle.key("rhel-9.4-py3.9-x86_64", "/home/cephuser")
+    current, stale = _node("node0", installed=key), _node("node1", installed="x")
+    bundle.deploy([_node("builder"), _node("node2")])
+
+    assert bundle.deploy([current, stale]) == {"node0": "skipped", "node1": "pushed"}
+    assert current.exec_command.call_count == 1
+    assert current.upload_file.call_count == 0
+
+
+@mock.patch("utility.tool_bundle.resolve_revision")
+def test_nodes_holding_the_branch_are_skipped(resolve, bundle):
+    bundle.branch = "master"
+    node = _node("node0", installed=f"0123abcd {bundle.source}")
+
+    assert bundle.deploy([node]) == {"node0": "skipped"}
+    resolve.assert_not_called()
+
+
+@mock.patch("utility.tool_bundle.subprocess.run")
+def test_revision_resolved_once_per_run(run, monkeypatch):
+    monkeypatch.setattr(tool_bundle, "_REVISIONS", dict())
+    run.return_value.stdout = f"{REVISION}\trefs/heads/master\n"
+    url = "https://example.com/repo.git"
+
+    assert tool_bundle.resolve_revision(url, "master") == REVISION
+    run.return_value.stdout = f"{'f' * 40}\trefs/heads/master\n"
+    assert tool_bundle.resolve_revision(url, "master") == REVISION
+    assert run.call_count == 1
+
+
+def test_key_depends_on_revision_and_platform(bundle):
+    key = bundle.key("rhel-9.4-py3.9-x86_64", "/home/cephuser")
+    assert key != bundle.key("rhel-8.10-py3.6-x86_64", "/home/cephuser")
+
+    bundle._revision = "f" * 40
+    assert key != bundle.key("rhel-9.4-py3.9-x86_64", "/home/cephuser")
+
+
+def test_failed_build_is_cleaned_up(bundle, tmp_path):
+    node = _node("node0")
+
+    def _exec(cmd, **kw):
+        node.commands.append(cmd)
+        if "os-release" in cmd:
+            return "rhel-9.4-py3.9-x86_64\n/home/cephuser\n\n", ""
+        if "git clone" in cmd:
+            raise CommandFailed("pip install failed")
+        return "", ""
+
+    node.exec_command.side_effect = _exec
+    with pytest.raises(CommandFailed):
+        bundle.deploy([node])
+
+    assert node.commands[-1].startswith("sudo rm -rf ~/rgw-tests ~/venv")
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,198 @@
+"""Per-command latency and volume instrumentation of the remote execution.
+
+Every command executed on the nodes is recorded with the host, a normalized
+command template, the duration, the volume of data sent and received and the
+exit code into an in-memory ring buffer. The buffer is flushed as a JSON and
+CSV profile next to the test log and the aggregates collected over the entire
+run are used to summarize the slowest and the most frequent commands. When the
+tests run concurrently, the records are tagged with the test owning the thread
+and flushed to the profile of that test.
+
+Example::
+
+    from utility.command_profile import profiler
+
+    profiler.record("node1", "ceph osd dump -f json", 0.8, 25, 2048, 0)
+    profiler.flush("/tmp/run/test_name")
+    print(profiler.summary())
+"""
+
+import csv
+import json
+import re
+import threading
+from collections import deque
+from datetime import datetime
+
+from utility.log import Log, SensitiveLogFilter, get_thread_test
+
+log = Log(__name__)
+_filter = SensitiveLogFilter()
+
+RING_BUFFER_SIZE = 100000
+FIELDS = (
+    "timestamp",
+    "host",
+    "template",
+    "duration",
+    "bytes_in",
+    "bytes_out",
+    "exit_code",
+    "source",
+)
+
+_PATTERNS = (
+    (re.compile(r"(['\"]).*?\1"), r"\1<str>\1"),
+    (
+        re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b"),
+        "<uuid>",
+    ),
+    (re.compile(r"\b\d{1,3}(\.\d{1,3}){3}(/\d+)?\b"), "<ip>"),
+    (re.compile(r"\b[0-9a-f]{12,}\b"), "<id>"),
+    (re.compile(r"\b\d+(\.\d+)*\b"), "<n>"),
+)
+
+
+def normalize_command(cmd: str) -> str:
+    """Returns the command template by masking the variable parts of the command.
+
+    Quoted strings, UUIDs, IP addresses, long hex identifiers and numbers are
+    replaced with placeholders and sensitive values are redacted.
+
+    Args:
+        cmd (str): command executed on the node
+
+    Returns:
+        command template (str)
+    """
+    template = " ".join(cmd.split())
+    for pattern, repl in _PATTERNS:
+        template = pattern.sub(repl, template)
+
+    return _filter.redact_str(template)
+
+
+class CommandProfiler:
+    """Collects the command execution records of the run."""
+
+    def __init__(self, size: int = RING_BUFFER_SIZE):
+        """
+        Args:
+            size (int): maximum number of records held between two flushes
+        """
+        self.records = deque(maxlen=size)
+        self.aggregates = dict()
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        host: str,
+        cmd: str,
+        duration: float,
+        bytes_in: int,
+        bytes_out: int,
+        exit_code,
+        source: str = "ssh",
+    ):
+        """Records the execution details of a command.
+
+        Args:
+            host (str): hostname of the node
+            cmd (str): command executed
+            duration (float): time taken in seconds
+            bytes_in (int): size of the data sent to the node
+            bytes_out (int): size of the stdout and stderr data received
+            exit_code (int): exit code of the command, None if it did not complete
+            source (str): execution channel i.e. ssh or shell-session
+        """
+        template = normalize_command(cmd)
+        entry = (
+            datetime.now().isoformat(),
+            host,
+            template,
+            round(duration, 6),
+            bytes_in,
+            bytes_out,
+            exit_code,
+            source,
+        )
+        owner = get_thread_test()
+        with self._lock:
+            self.records.append((owner, entry))
+            count, total, slowest = self.aggregates.get(template, (0, 0.0, 0.0))
+            self.aggregates[template] = (
+                count + 1,
+                total + duration,
+                max(slowest, duration),
+            )
+
+    def flush(self, path_prefix: str, test: str = None):
+        """Writes the records collected since the last flush and clears them.
+
+        Args:
+            path_prefix (str): path of the profile without extension, the
+                               records are written to <prefix>.profile.json
+                               and <prefix>.profile.csv
+            test (str): flush only the records of the given test
+
+        Returns:
+            number of records written
+        """
+        with self._lock:
+            if test is None:
+                records = [entry for _, entry in self.records]
+                self.records.clear()
+            else:
+                records = [entry for owner, entry in self.records if owner == test]
+                pending = [r for r in self.records if r[0] != test]
+                self.records.clear()
+                self.records.extend(pending)
+
+        if not records:
+            return 0
+
+        try:
+            with open(f"{path_prefix}.profile.json", "w") as fh:
+                json.dump([dict(zip(FIELDS, r)) for r in records], fh, indent=2)
+
+            with open(f"{path_prefix}.profile.csv", "w", newline="") as fh:
+                writer = csv.writer(fh)
+                writer.writerow(FIELDS)
+                writer.writerows(records)
+        except OSError as err:
+            log.warning(f"Unable to write command profile {path_prefix}: {err}")
+
+        return len(records)
+
+    def summary(self, top: int = 10) -> str:
+        """Returns the top N slowest and the most frequent commands of the run."""
+        with self._lock:
+            stats = [(t, *v) for t, v in self.aggregates.items()]
+
+        if not stats:
+            return ""
+
+        lines = [f"\nTop {top} commands by total time:"]
+        lines.append(f"{'Count':>8} {'Total(s)':>10} {'Max(s)':>8}  Command")
+        for template, count, total, slowest in sorted(
+            stats, key=lambda s: s[2], reverse=True
+        )[:top]:
+            lines.append(f"{count:>8} {total:>10.2f} {slowest:>8.2f}  {template}")
+
+        lines.append(f"\nTop {top} commands by frequency:")
+        lines.append(f"{'Count':>8} {'Avg(s)':>10}  Command")
+        for template, count, total, _ in sorted(
+            stats, key=lambda s: s[1], reverse=True
+        )[:top]:
+            lines.append(f"{count:>8} {total / count:>10.3f}  {template}")
+
+        return "\n".join(lines)
+
+    def reset(self):
+        """Clears the records and the aggregates."""
+        with self._lock:
+            self.records.clear()
+            self.aggregates.clear()
+
+
+profiler = CommandProfiler()
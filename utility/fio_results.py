@@ -0,0 +1,421 @@
+"""
+fio results pipeline.
+
+The JSON reports (--output-format=json or json+) left on the clients are pulled
+back in bulk i.e. a single command per client, and every job is normalized into
+a FioRecord per IO direction. The records of many clients and mounts are merged
+into per test summaries.
+
+Latency percentiles can not be averaged. When the reports carry the latency
+histogram (json+) the histograms are summed and the percentiles are read from
+the merged histogram. Otherwise the percentiles of the mixture of the job latency
+distributions are computed from the piecewise linear CDF of every job, weighted
+by the number of samples of the job.
+
+Usage:
+    records = collect_fio_results(client, ["read.json", "write.json"], test="rbd")
+    summary = write_fio_report(records, f"{log_dir}/fio_results.json")
+"""
+
+import base64
+import json
+import os
+import shlex
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+
+from ceph.parallel import parallel
+from utility.log import Log
+
+log = Log(__name__)
+
+DIRECTIONS = ("read", "write", "trim")
+DEFAULT_PERCENTILES = (50.0, 90.0, 95.0, 99.0, 99.9)
+DEFAULT_KEYS = ("test", "direction")
+FIO_MARKER = "__CEPHCI_FIO__"
+
+
+@dataclass
+class FioRecord:
+    """
+    Result of a fio job for a single IO direction
+
+    Attributes:
+        test: name of the test the job belongs to
+        client: hostname of the client which executed the job
+        source: fio report the record was read from
+        job: name of the job
+        direction: read, write or trim
+        iops: IO operations per second
+        bw_kib: bandwidth in KiB/sec
+        io_bytes: total bytes transferred
+        runtime_ms: runtime of the job in milliseconds
+        total_ios: number of IO operations
+        lat_mean_ns: mean total latency in nanoseconds
+        clat_mean_ns: mean completion latency in nanoseconds
+        clat_min_ns: minimum completion latency in nanoseconds
+        clat_max_ns: maximum completion latency in nanoseconds
+        clat_samples: number of completion latency samples
+        percentiles: completion latency percentiles in nanoseconds
+        bins: completion latency histogram, present with json+ reports
+    """
+
+    test: str
+    client: str
+    source: str
+    job: str
+    direction: str
+    iops: float = 0.0
+    bw_kib: float = 0.0
+    io_bytes: int = 0
+    runtime_ms: int = 0
+    total_ios: int = 0
+    lat_mean_ns: float = 0.0
+    clat_mean_ns: float = 0.0
+    clat_min_ns: float = 0.0
+    clat_max_ns: float = 0.0
+    clat_samples: int = 0
+    percentiles: dict = field(default_factory=dict)
+    bins: dict = None
+
+    def to_dict(self):
+        """Returns the record without the latency histogram"""
+        record = asdict(self)
+        record.pop("bins")
+        return record
+
+
+def _load_report(data):
+    """Returns the report discarding the fio messages printed before the JSON"""
+    start = data.find("{")
+    if start == -1:
+        raise ValueError("fio report does not contain JSON")
+    return json.loads(data[start:])
+
+
+def parse_fio_json(data, client="", source="", test=None):
+    """
+    Normalizes the jobs of the fio report into records
+
+    Args:
+        data (str|dict): fio JSON report
+        client (str): hostname of the client
+        source (str): path of the report
+        test (str): name of the test, defaults to the job name
+
+    Returns:
+        list of FioRecord, one per job and direction with IO
+    """
+    report = _load_report(data) if isinstance(data, str) else data
+    records = []
+    for job in report.get("jobs", []):
+        for direction in DIRECTIONS:
+            stats = job.get(direction)
+            if not stats or not stats.get("total_ios"):
+                continue
+
+            clat = stats.get("clat_ns", {})
+            records.append(
+                FioRecord(
+                    test=test or job.get("jobname"),
+                    client=client,
+                    source=source,
+                    job=job.get("jobname"),
+                    direction=direction,
+                    iops=stats.get("iops", 0.0),
+                    bw_kib=stats.get("bw", 0.0),
+                    io_bytes=stats.get("io_bytes", 0),
+                    runtime_ms=stats.get("runtime", 0),
+                    total_ios=stats.get("total_ios", 0),
+                    lat_mean_ns=stats.get("lat_ns", {}).get("mean", 0.0),
+                    clat_mean_ns=clat.get("mean", 0.0),
+                    clat_min_ns=clat.get("min", 0.0),
+                    clat_max_ns=clat.get("max", 0.0),
+                    clat_samples=clat.get("N", stats.get("total_ios", 0)),
+                    percentiles={
+                        float(p): v for p, v in clat.get("percentile", {}).items()
+                    },
+                    bins=(
+                        {int(k): v for k, v in clat["bins"].items()}
+                        if clat.get("bins")
+                        else None
+                    ),
+                )
+            )
+
+    return records
+
+
+def _cdf_points(record):
+    """Returns the (latency, percent) points of the record latency CDF"""
+    points = [(record.clat_min_ns, 0.0)]
+    points.extend((v, p) for p, v in sorted(record.percentiles.items()))
+    points.append((max(record.clat_max_ns, points[-1][0]), 100.0))
+
+    # Percentiles are reported on bucket boundaries, keep the CDF monotonic
+    cdf, last = [], (None, -1.0)
+    for latency, percent in points:
+        if last[0] is not None and latency <= last[0]:
+            cdf[-1] = (last[0], max(percent, last[1]))
+        else:
+            cdf.append((latency, percent))
+        last = cdf[-1]
+    return cdf
+
+
+def _cdf(points, latency):
+    """Returns the percent of samples at or below the latency"""
+    if latency < points[0][0]:
+        return 0.0
+    for (x0, p0), (x1, p1) in zip(points, points[1:]):
+        if latency <= x1:
+            return p0 + (p1 - p0) * (latency - x0) / (x1 - x0)
+    return 100.0
+
+
+def histogram_percentiles(bins, percentiles=DEFAULT_PERCENTILES):
+    """
+    Returns the percentiles of the latency histogram
+
+    Args:
+        bins (dict): latency in nanoseconds and the number of samples
+        percentiles (tuple): percentiles to be computed
+
+    Returns:
+        dict of percentile and latency in nanoseconds
+    """
+    total = sum(bins.values())
+    ordered = sorted(bins.items())
+    result = {}
+    for percentile in percentiles:
+        target, seen = total * percentile / 100, 0
+        for latency, count in ordered:
+            seen += count
+            if seen >= target:
+                result[percentile] = latency
+                break
+    return result
+
+
+def mixture_percentiles(records, percentiles=DEFAULT_PERCENTILES):
+    """
+    Returns the percentiles of the mixture of the record latency distributions
+
+    The CDF of every record is interpolated linearly between its reported
+    percentiles, the mixture CDF is the sample weighted sum of the record
+    CDFs, hence it is linear between the union of the record break points.
+
+    Args:
+        records (list): FioRecord objects with the reported percentiles
+        percentiles (tuple): percentiles to be computed
+
+    Returns:
+        dict of percentile and latency in nanoseconds
+    """
+    curves = [(_cdf_points(r), r.clat_samples or r.total_ios) for r in records]
+    total = sum(w for _, w in curves)
+    if not total:
+        return {}
+
+    xs = sorted({x for points, _ in curves for x, _ in points})
+    ys = [sum(w * _cdf(points, x) for points, w in curves) / total for x in xs]
+
+    result = {}
+    for percentile in percentiles:
+        for idx, (x, y) in enumerate(zip(xs, ys)):
+            if y >= percentile:
+                if idx == 0 or y == ys[idx - 1]:
+                    result[percentile] = x
+                else:
+                    x0, y0 = xs[idx - 1], ys[idx - 1]
+                    result[percentile] = x0 + (x - x0) * (percentile - y0) / (y - y0)
+                break
+        else:
+            result[percentile] = xs[-1]
+    return result
+
+
+def merge_records(records, keys=DEFAULT_KEYS, percentiles=DEFAULT_PERCENTILES):
+    """
+    Merges the records of the clients and mounts into per key summaries
+
+    IOPS and bandwidth are summed as the jobs run concurrently, the mean
+    latencies are weighted by the number of IOs of the jobs.
+
+    Args:
+        records (list): FioRecord objects
+        keys (tuple): record attributes identifying a summary
+        percentiles (tuple): latency percentiles of the summary
+
+    Returns:
+        list of summaries (dict) in the order of the records
+    """
+    groups = OrderedDict()
+    for record in records:
+        groups.setdefault(tuple(getattr(record, k) for k in keys), []).append(record)
+
+    summaries = []
+    for key, group in groups.items():
+        ios = sum(r.total_ios for r in group) or 1
+        if all(r.bins for r in group):
+            merged = dict()
+            for record in group:
+                for latency, count in record.bins.items():
+                    merged[latency] = merged.get(latency, 0) + count
+            _percentiles, method = histogram_percentiles(merged, percentiles), "hist"
+        else:
+            _percentiles, method = mixture_percentiles(group, percentiles), "mixture"
+
+        summary = OrderedDict(zip(keys, key))
+        summary.update(
+            {
+                "clients": len({r.client for r in group}),
+                "jobs": len(group),
+                "iops": sum(r.iops for r in group),
+                "bw_mib": sum(r.bw_kib for r in group) / 1024,
+                "lat_mean_ms": sum(r.lat_mean_ns * r.total_ios for r in group)
+                / ios
+                / 1e6,
+                "clat_max_ms": max(r.clat_max_ns for r in group) / 1e6,
+            }
+        )
+        for percentile in percentiles:
+            summary[f"p{percentile:g}_ms"] = _percentiles.get(percentile, 0) / 1e6
+        summary["percentile_method"] = method
+        summaries.append(summary)
+
+    return summaries
+
+
+def format_summary(summaries):
+    """Returns the summaries as a plain text table"""
+    if not summaries:
+        return "No fio results"
+
+    columns = list(summaries[0].keys())
+    rows = [
+        [f"{v:.2f}" if isinstance(v, float) else str(v) for v in s.values()]
+        for s in summaries
+    ]
+    widths = [max(len(c), *(len(r[i]) for r in rows)) for i, c in enumerate(columns)]
+    lines = ["  ".join(c.ljust(w) for c, w in zip(columns, widths))]
+    lines.append("  ".join("-" * w for w in widths))
+    lines.extend("  ".join(v.ljust(w) for v, w in zip(r, widths)) for r in rows)
+    return "\n".join(lines)
+
+
+def _hostname(node):
+    return getattr(node, "hostname", None) or node.node.hostname
+
+
+def fetch_fio_reports(node, paths):
+    """
+    Pulls the fio reports from the node using a single command
+
+    Args:
+        node: CephNode or CephObject of the client
+        paths (list): paths of the reports on the node
+
+    Returns:
+        dict of path and report content, missing reports are skipped
+    """
+    cmd = (
+        f"for f in {' '.join(shlex.quote(p) for p in paths)}; do "
+        f'[ -f "$f" ] || continue; echo "{FIO_MARKER} $f"; base64 -w0 "$f"; echo; done'
+    )
+    out, _ = node.exec_command(sudo=True, cmd=cmd)
+
+    reports, path = dict(), None
+    for line in out.splitlines():
+        if line.startswith(f"{FIO_MARKER} "):
+            path = line[len(FIO_MARKER) + 1 :]
+        elif path is not None:
+            reports[path] = base64.b64decode(line).decode("utf-8", errors="replace")
+            path = None
+
+    missing = set(paths) - set(reports)
+    if missing:
+        log.warning(f"fio reports {sorted(missing)} not found on {_hostname(node)}")
+    return reports
+
+
+def collect_fio_results(node, paths, test=None, save_dir=None):
+    """
+    Pulls the fio reports from the node and normalizes them into records
+
+    Args:
+        node: CephNode or CephObject of the client
+        paths (list|dict): paths of the reports or path and test name mapping
+        test (str): name of the test for all the reports, defaults to the job name
+        save_dir (str): local directory to store the raw reports
+
+    Returns:
+        list of FioRecord
+    """
+    tests = paths if isinstance(paths, dict) else {p: test for p in paths}
+    hostname = _hostname(node)
+
+    records = []
+    for path, data in fetch_fio_reports(node, list(tests)).items():
+        if save_dir:
+            with open(os.path.join(save_dir, os.path.basename(path)), "w") as fd:
+                fd.write(data)
+        try:
+            records.extend(parse_fio_json(data, hostname, path, tests[path]))
+        except ValueError as err:
+            log.error(f"Unable to parse fio report {path} of {hostname}: {err}")
+
+    return records
+
+
+def collect_fio_results_from_clients(reports, save_dir=None):
+    """
+    Pulls the fio reports from many clients concurrently
+
+    Args:
+        reports (list): tuples of the node and the collect_fio_results paths
+        save_dir (str): local directory to store the raw reports per client
+
+    Returns:
+        list of FioRecord
+    """
+    records = []
+    with parallel() as p:
+        for node, paths in reports:
+            _dir = None
+            if save_dir:
+                _dir = os.path.join(save_dir, _hostname(node))
+                os.makedirs(_dir, exist_ok=True)
+            p.spawn(collect_fio_results, node, paths, save_dir=_dir)
+
+    for result in p.results:
+        records.extend(result)
+    return records
+
+
+def write_fio_report(records, path, keys=DEFAULT_KEYS, percentiles=DEFAULT_PERCENTILES):
+    """
+    Writes the records and their summaries as a JSON artifact and logs the table
+
+    Args:
+        records (list): FioRecord objects
+        path (str): local path of the JSON artifact
+        keys (tuple): record attributes identifying a summary
+        percentiles (tuple): latency percentiles of the summary
+
+    Returns:
+        list of summaries (dict)
+    """
+    summaries = merge_records(records, keys, percentiles)
+    with open(path, "w") as fd:
+        json.dump(
+            {
+                "summary": summaries,
+                "records": [r.to_dict() for r in records],
+            },
+            fd,
+            indent=2,
+        )
+
+    log.info(f"fio results summary, artifact: {path}\n{format_summary(summaries)}")
+    return summaries
@@ -3,20 +3,21 @@
 # !/usr/bin/env python
 from __future__ import print_function
 
-import sys
-
 from docopt import docopt
 from rados import Rados
+from rados_aio import DEFAULT_WINDOW, AioPipeline
 
-doc = """
+doc = f"""
 Usage:
   generate_frag_objs.py --pool <pool_name> --create <object_count> --remove <object_count> --size <each_object_size>
+        [--window <num_ops>]
 
 Options:
   --pool <name>      Name of the pool where the omap entries need to be generated
   --create <num>       Start point/count to create objects
   --remove <num>       Start point/count to create objects
   --size <num>       Number of kw pairs to be created for each object
+  --window <num>     Number of ops in flight [default: {DEFAULT_WINDOW}]
 
 """
 
@@ -27,43 +28,39 @@ def run(args):
     remove = int(args["--remove"])
     size = int(args["--size"])
     data = bytes(size)
+    window = int(args.get("--window") or DEFAULT_WINDOW)
+
+    # Every phase is drained before the next one begins
     with Rados(conffile="") as cluster:
         with cluster.open_ioctx(pool) as ioctx:
             prefix = "filler_" + str(size) + "_"
-            for i in range(0, create):
-                ioctx.write(prefix + str(i), data, 0)
-                print(
-                    "create",
-                    i,
-                    "of",
-                    create,
-                    "objects",
-                    end="\r",
-                )
-                sys.stdout.flush()
-            for i in range(0, create, 2):
-                ioctx.remove_object(prefix + str(i))
-                print(
-                    "removed - fragment",
-                    int(i / 2),
-                    "of",
-                    int(create / 2),
-                    "objects",
-                    end="\r",
-                )
-                sys.stdout.flush()
-            for i in range(0, remove, 2):
-                ioctx.remove_object(prefix + str(i + 1))
-                print(
-                    "removed - defragment",
-                    int(i / 2),
-                    "of",
-                    int(remove / 2),
-                    "objects",
-                    end="\r",
-                )
-                sys.stdout.flush()
-    print("\nDone!")
+            with AioPipeline(
+                ioctx, window=window, total=create, label="created objects"
+            ) as pipeline:
+                for i in range(0, create):
+                    pipeline.write(prefix + str(i), data, 0)
+            print("\n" + pipeline.summary())
+
+            with AioPipeline(
+                ioctx,
+                window=window,
+                total=len(range(0, create, 2)),
+                label="removed - fragment objects",
+            ) as pipeline:
+                for i in range(0, create, 2):
+                    pipeline.remove(prefix + str(i))
+            print("\n" + pipeline.summary())
+
+            with AioPipeline(
+                ioctx,
+                window=window,
+                total=len(range(0, remove, 2)),
+                label="removed - defragment objects",
+            ) as pipeline:
+                for i in range(0, remove, 2):
+                    pipeline.remove(prefix + str(i + 1))
+            print("\n" + pipeline.summary())
+    print("Done!")
 
 
 if __name__ == "__main__":
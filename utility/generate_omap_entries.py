@@ -9,20 +9,22 @@ Module used to:
 from __future__ import print_function
 
 import os
-import sys
 
 from docopt import docopt
-from rados import Rados, WriteOpCtx
+from rados import Rados
+from rados_aio import DEFAULT_WINDOW, AioPipeline
 
-doc = """
+doc = f"""
 Usage:
   generate_omap_entries.py --pool <pool_name> --start <init_count> --end <end_count> --key-count <num_keys>
+        [--window <num_ops>]
 
 Options:
   --pool <name>                     Name of the pool where the omap entries need to be generated
   --start <num>                     Start point/count to create objects
   --end <num>                       end point/count to create objects
   --key-count <num>                 Number of kw pairs to be created for each object
+  --window <num>                    Number of write ops in flight [default: {DEFAULT_WINDOW}]
 
 """
 
@@ -35,23 +37,20 @@ def run(args):
     keys = tuple(["key_" + str(x) for x in range(keys_per_object)])
     values = tuple(["value_" + str(x) for x in range(keys_per_object)])
 
+    window = int(args.get("--window") or DEFAULT_WINDOW)
+
     with Rados(conffile="") as cluster:
         with cluster.open_ioctx(pool) as ioctx:
             prefix = "omap_obj_" + str(os.getpid()) + "_"
-            for i in range(start, end):
-                with WriteOpCtx(ioctx) as write_op:
-                    ioctx.set_omap(write_op, keys, values)
-                    ioctx.operate_write_op(write_op, prefix + str(i))
-                    print(
-                        "wrote",
-                        (i + 1) * keys_per_object,
-                        "of",
-                        (end - start) * keys_per_object,
-                        "omap entries",
-                        end="\r",
-                    )
-                    sys.stdout.flush()
-    print("\nDone!")
+            with AioPipeline(
+                ioctx, window=window, total=end - start, label="omap objects"
+            ) as pipeline:
+                for i in range(start, end):
+                    pipeline.set_omap(prefix + str(i), keys, values)
+
+    print(f"\nwrote {pipeline.completed * keys_per_object} omap entries")
+    print(pipeline.summary())
+    print("Done!")
 
 
 if __name__ == "__main__":
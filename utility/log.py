@@ -1,8 +1,12 @@
+import atexit
 import logging
 import logging.handlers
 import os
+import queue
 import re
+import threading
 from copy import deepcopy
+from time import monotonic
 from typing import Dict
 
 from .config import TestMetaData
@@ -15,6 +19,276 @@ magna_server = "http://magna002.ceph.redhat.com"
 magna_url = f"{magna_server}/cephci-jenkins/"
 
 
+# Test owning the thread, used for routing the records when tests run concurrently
+_thread_tests = dict()
+
+
+def set_thread_test(test_name, ident=None):
+    """Associates the thread with the given test for log routing.
+
+    Args:
+        test_name (str): unique name of the test executed by the thread
+        ident (int): thread identifier, defaults to the current thread
+    """
+    _thread_tests[ident or threading.get_ident()] = test_name
+
+
+def clear_thread_test(ident=None):
+    """Removes the test association of the thread."""
+    _thread_tests.pop(ident or threading.get_ident(), None)
+
+
+def get_thread_test(ident=None):
+    """Returns the test associated with the thread or None."""
+    return _thread_tests.get(ident or threading.get_ident())
+
+
+class TestLogRouter(logging.Filter):
+    """Routes the records to the log files of the test owning the thread.
+
+    Records emitted from threads which are not associated with any test are
+    accepted by all the routers.
+    """
+
+    def __init__(self, test_name):
+        super().__init__(name=test_name)
+        self.test_name = test_name
+
+    def filter(self, record):
+        owner = _thread_tests.get(record.thread)
+        return owner is None or owner == self.test_name
+
+
+class LogPipeline:
+    """Writes the records of the queued handlers from a background thread.
+
+    Formatting the records and writing them to the log files is moved off the
+    threads executing the commands. The records are written in batches and the
+    files are flushed once per batch. When the queue is full the producers wait
+    for up to ``put_timeout`` seconds, after which the record is dropped and
+    counted rather than blocking the test.
+    """
+
+    def __init__(
+        self, max_queue=65536, batch_size=512, flush_interval=0.5, put_timeout=5
+    ):
+        """
+        Args:
+            max_queue (int): maximum number of records waiting to be written
+            batch_size (int): maximum number of records written per flush
+            flush_interval (float): maximum time in seconds before a flush
+            put_timeout (float): time in seconds to wait for space in the queue
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.peak_depth = 0
+        self.write_time = 0.0
+
+    def submit(self, handler, record):
+        """Queues the record to be written by the handler."""
+        self._start()
+        try:
+            self._queue.put((handler, record), timeout=self.put_timeout)
+        except queue.Full:
+            self.dropped += 1
+            return
+
+        depth = self._queue.qsize()
+        if depth > self.peak_depth:
+            self.peak_depth = depth
+
+    def _start(self):
+        if self._thread and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="cephci-log-writer", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            _start = monotonic()
+            handlers, written = set(), 0
+            for handler, record in batch:
+                if isinstance(record, threading.Event):
+                    # Flush marker, the earlier records of the handler are written
+                    if handler in handlers:
+                        handler.flush()
+                        handlers.discard(handler)
+                    record.set()
+                    continue
+
+                handler.write(record)
+                handlers.add(handler)
+                written += 1
+
+            for handler in handlers:
+                handler.flush()
+
+            self.write_time += monotonic() - _start
+            self.written += written
+            self.batches += 1
+            for _ in batch:
+                self._queue.task_done()
+
+    def flush(self, handler=None):
+        """Waits until the queued records are written.
+
+        Args:
+            handler: wait only for the records of the handler queued so far,
+                     all the records otherwise
+        """
+        if not (self._thread and self._thread.is_alive()):
+            return
+
+        if handler is None:
+            self._queue.join()
+            return
+
+        marker = threading.Event()
+        self._queue.put((handler, marker))
+        while not marker.wait(1):
+            if not self._thread.is_alive():
+                return
+
+    def stats(self):
+        """Returns the queue depth, drop and write counters."""
+        return {
+            "depth": self._queue.qsize(),
+            "peak_depth": self.peak_depth,
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "write_time": round(self.write_time, 3),
+        }
+
+
+_pipeline = None
+
+
+def enable_log_pipeline(**kwargs):
+    """Makes configure_logger write the log files through the LogPipeline.
+
+    Args:
+        kwargs: arguments of the LogPipeline
+
+    Returns:
+        the LogPipeline
+    """
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = LogPipeline(**kwargs)
+        atexit.register(_pipeline.flush)
+    return _pipeline
+
+
+def get_log_pipeline():
+    """Returns the enabled LogPipeline or None."""
+    return _pipeline
+
+
+class QueuedHandlerMixin:
+    """Hands the records over to the LogPipeline instead of writing them.
+
+    Only the redaction (filters) and merging of the message arguments happen on
+    the calling thread, the pipeline thread formats and writes the record.
+    """
+
+    pipeline = None
+    closed = False
+
+    def handle(self, record):
+        # The handler lock is held by the pipeline thread while writing
+        rv = self.filter(record)
+        if rv:
+            self.emit(record)
+        return rv
+
+    def emit(self, record):
+        try:
+            # Snapshot the message, the arguments may change once we return
+            record.msg = record.getMessage()
+            record.args = None
+            if record.exc_info and not record.exc_text:
+                record.exc_text = self.formatter.formatException(record.exc_info)
+        except Exception:
+            self.handleError(record)
+            return
+
+        if not self.closed:
+            self.pipeline.submit(self, record)
+
+    def write(self, record):
+        """Writes the record without flushing, invoked by the pipeline thread."""
+        try:
+            self.acquire()
+            try:
+                # Records queued after the handler is closed are dropped
+                if self.closed:
+                    return
+                msg = self.format(record) + self.terminator
+                if self.stream is None:
+                    self.stream = self._open()
+                # Formats the record only once unlike shouldRollover
+                max_bytes = getattr(self, "maxBytes", 0)
+                if max_bytes and self.stream.tell() + len(msg) >= max_bytes:
+                    self.doRollover()
+                self.stream.write(msg)
+            finally:
+                self.release()
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        self.pipeline.flush(self)
+        self.acquire()
+        try:
+            self.closed = True
+        finally:
+            self.release()
+        super().close()
+
+
+class QueuedRotatingFileHandler(
+    QueuedHandlerMixin, logging.handlers.RotatingFileHandler
+):
+    """RotatingFileHandler writing through the LogPipeline."""
+
+    def __init__(self, filename, pipeline, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.pipeline = pipeline
+
+
+class QueuedFileHandler(QueuedHandlerMixin, logging.FileHandler):
+    """FileHandler writing through the LogPipeline."""
+
+    def __init__(self, filename, pipeline, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.pipeline = pipeline
+
+
 class LoggerInitializationException(Exception):
     """Exception raised for logger initialization errors."""
 
@@ -107,6 +381,8 @@ class Log(logging.Logger):
         Args:
             test_name: name of the test being executed. used for naming the logfile
             run_dir: directory where logs are being placed
+            concurrent: when enabled, the file handlers of the other tests are retained
+                        and the records are routed based on the test owning the thread.
         Returns:
             URL where the log file can be viewed or None if the run_dir does not exist
         """
@@ -116,7 +392,9 @@ class Log(logging.Logger):
             )
             return None
 
-        self.close_and_remove_filehandlers()
+        concurrent = kwargs.get("concurrent", False)
+        if not concurrent:
+            self.close_and_remove_filehandlers()
         pass_filter = SensitiveLogFilter(name="cephci_filter")
 
         log_format = logging.Formatter(self.log_format)
@@ -127,23 +405,34 @@ class Log(logging.Logger):
         if disable_console_log:
             self._logger.propagate = False
 
-        _handler = logging.FileHandler(test_logfile)
-        _handler = logging.handlers.RotatingFileHandler(
+        # The files are written from the pipeline thread when it is enabled
+        _pipeline = get_log_pipeline()
+        _rotating, _file = logging.handlers.RotatingFileHandler, logging.FileHandler
+        _kw = dict()
+        if _pipeline:
+            _rotating, _file = QueuedRotatingFileHandler, QueuedFileHandler
+            _kw = {"pipeline": _pipeline}
+
+        _handler = _rotating(
             test_logfile,
             maxBytes=10 * 1024 * 1024,  # Set the maximum log file size to 10 MB
             backupCount=20,  # Keep up to 20 old log files which will be 200 MB per test case
+            **_kw,
         )
         _handler.setFormatter(log_format)
         _handler.addFilter(pass_filter)
-        self._logger.addHandler(_handler)
 
         # error file handler
         err_logfile = os.path.join(run_dir, f"{test_name}.err")
-        _err_handler = logging.FileHandler(err_logfile)
+        _err_handler = _file(err_logfile, **_kw)
         _err_handler.setFormatter(log_format)
         _err_handler.setLevel(logging.ERROR)
         _err_handler.addFilter(pass_filter)
-        self._logger.addHandler(_err_handler)
+
+        for _h in (_handler, _err_handler):
+            if concurrent:
+                _h.addFilter(TestLogRouter(test_name))
+            self._logger.addHandler(_h)
 
         console_handler = logging.StreamHandler()
         console_handler.setLevel(logging.INFO)
@@ -162,13 +451,30 @@ class Log(logging.Logger):
 
         return log_url
 
-    def close_and_remove_filehandlers(self):
-        """Close FileHandlers and then remove them from the logger's handlers list."""
+    def close_and_remove_filehandlers(self, test_name=None):
+        """Close FileHandlers and then remove them from the logger's handlers list.
+
+        Args:
+            test_name: when provided, only the handlers routing the records of the
+                       given test are removed.
+        """
         handlers = self._logger.handlers[:]
         for handler in handlers:
-            if isinstance(handler, logging.FileHandler):
-                handler.close()
-                self._logger.removeHandler(handler)
+            if not isinstance(handler, logging.FileHandler):
+                continue
+
+            if test_name and not any(
+                isinstance(f, TestLogRouter) and f.test_name == test_name
+                for f in handler.filters
+            ):
+                continue
+
+            handler.close()
+            self._logger.removeHandler(handler)
+
+
+# Compiled redaction matchers by the excluded words
+_redaction_matchers = dict()
 
 
 class SensitiveLogFilter(logging.Filter):
@@ -209,16 +515,34 @@ class SensitiveLogFilter(logging.Filter):
             elif isinstance(data[_key], (str, bytearray, bytes)):
                 data[_key] = self.redact_str(data[_key])
 
+    def _matcher(self):
+        """Returns the lowercase words and the redaction regex, compiled once."""
+        words = tuple(self.excluded_words)
+        matcher = _redaction_matchers.get(words)
+        if matcher is None:
+            _words = "|".join(words)
+            matcher = (
+                tuple(w.lower() for w in words),
+                re.compile(
+                    rf'({_words})\s*[:=]?\s*(["\']?)([^\s"\']+)(\2)(\s|$)',
+                    flags=re.IGNORECASE,
+                ),
+            )
+            _redaction_matchers[words] = matcher
+        return matcher
+
     def redact_str(self, data):
         """Redact strings containing sensitive keys."""
-        _words = "|".join(self.excluded_words)
-        rtn = re.sub(
-            rf'({_words})\s*[:=]?\s*(["\']?)([^\s"\']+)(\2)(\s|$)',
-            r"\1 <masked>\5",
-            data,
-            flags=re.IGNORECASE,
-        )
-        return rtn
+        if not isinstance(data, str):
+            data = str(data, "utf-8")
+
+        words, pattern = self._matcher()
+        # Fast path, most of the lines do not have any of the words
+        _data = data.lower()
+        if not any(word in _data for word in words):
+            return data
+
+        return pattern.sub(r"\1 <masked>\5", data)
 
     def redact(self, msg):
         """Return the redacted message if sensitive data found.
@@ -227,25 +551,28 @@ class SensitiveLogFilter(logging.Filter):
         the method encounters a dict, the keys of the dict are scanned for
         excluded fields.
         """
-        data = deepcopy(msg)
+        if isinstance(msg, str):
+            return self.redact_str(msg)
+
+        if isinstance(msg, (bytearray, bytes)):
+            return self.redact_str(msg)
 
-        if isinstance(data, dict):
+        if isinstance(msg, tuple):
+            return tuple(self.redact(arg) for arg in msg)
+
+        # Only the containers are copied, the caller's data must not change
+        if isinstance(msg, dict):
+            data = deepcopy(msg)
             self.redact_dict(data)
             return data
 
-        if isinstance(data, list):
+        if isinstance(msg, list):
+            data = deepcopy(msg)
             self.redact_list(data)
             return data
 
-        if isinstance(data, tuple):
-            return tuple(self.redact(arg) for arg in data)
-
-        if isinstance(data, (str, bytearray, bytes)):
-            data = data if isinstance(data, str) else str(data, "utf-8")
-            return self.redact_str(data)
-
         # Basic types that require no processing
-        return data
+        return msg
 
     def filter(self, record):
         """Modifies the log record.
@@ -256,7 +583,15 @@ class SensitiveLogFilter(logging.Filter):
         - logging of passwords when registering the server
         - logging of password using as authentication.
         """
+        # The same record passes through the filter of every handler
+        if getattr(record, "_redacted", False):
+            return True
+
+        record._redacted = True
         record.msg = self.redact(record.msg)
+        if not record.args:
+            return True
+
         if isinstance(record.args, dict):
             for k in record.args.keys():
                 record.args[k] = self.redact(record.args[k])
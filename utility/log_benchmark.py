@@ -0,0 +1,82 @@
+"""
+Measures the cost per log line on the calling thread for the synchronous file
+handlers and for the LogPipeline, using the handlers and the redaction filter
+configured by Log.configure_logger.
+
+The lines mimic the remote command output logged by read_stream, a fraction of
+them carries sensitive words to exercise the redaction.
+"""
+
+import logging
+import os
+import sys
+import tempfile
+from time import perf_counter
+
+from docopt import docopt
+
+from utility import log as cephci_log
+
+doc = """
+Benchmark the cephci logging pipeline
+
+    Usage:
+        log_benchmark.py [--lines <count>] [--sensitive <pct>]
+        log_benchmark.py (-h | --help)
+
+    Options:
+        -h --help               Shows the command usage
+        --lines <count>         number of lines logged per mode [default: 50000]
+        --sensitive <pct>       percent of lines carrying a password [default: 1]
+"""
+
+
+def _lines(count, sensitive):
+    every = int(100 / sensitive) if sensitive else 0
+    for num in range(count):
+        if every and num % every == 0:
+            yield f"ceph dashboard ac-user-create admin --password secret{num}"
+        else:
+            yield f"osd.{num % 64} pg 3.{num:x} active+clean scrub ok {num * 4096} bytes"
+
+
+def _run(name, count, sensitive, queued):
+    cephci_log._pipeline = cephci_log.LogPipeline() if queued else None
+    log = cephci_log.Log(name)
+    run_dir = tempfile.mkdtemp(prefix="log-benchmark-")
+    log.configure_logger(name, run_dir, True)
+    logger = log.logger
+    logger.setLevel(logging.DEBUG)
+
+    _start = perf_counter()
+    for line in _lines(count, sensitive):
+        logger.debug(line)
+    elapsed = perf_counter() - _start
+
+    log.close_and_remove_filehandlers()
+    total = perf_counter() - _start
+    size = os.path.getsize(os.path.join(run_dir, f"{name}.log"))
+    stats = cephci_log._pipeline.stats() if queued else {}
+    cephci_log._pipeline = None
+    return elapsed / count * 1e6, total / count * 1e6, size, stats
+
+
+def main(count, sensitive):
+    results = dict()
+    for mode, queued in (("synchronous", False), ("pipeline", True)):
+        per_line, total, size, stats = _run(f"bench-{mode}", count, sensitive, queued)
+        results[mode] = per_line
+        print(
+            f"{mode:12} {per_line:8.2f} us/line on the caller, {total:8.2f} us/line "
+            f"until written, {size} bytes {stats}"
+        )
+
+    print(f"caller speedup {results['synchronous'] / results['pipeline']:.1f}x")
+
+
+if __name__ == "__main__":
+    args = docopt(doc, help=True)
+    try:
+        main(int(args["--lines"]), float(args["--sensitive"]))
+    except KeyboardInterrupt:
+        sys.exit(1)
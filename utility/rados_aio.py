@@ -0,0 +1,193 @@
+"""
+Module providing an asynchronous librados write pipeline for the object generators.
+
+The generators issue millions of small writes, a single outstanding synchronous op
+makes them bound by the round trip latency. The pipeline keeps a configurable window
+of aio ops in flight, reports the progress in batches and summarizes the throughput.
+
+The module only depends on the Ioctx interface i.e. aio_write, aio_remove,
+create_write_op, set_omap, operate_aio_write_op and release_write_op, hence it can
+be exercised using a fake Ioctx.
+
+Usage:
+    with AioPipeline(ioctx, window=64, total=count, label="objects") as pipeline:
+        for i in range(count):
+            pipeline.write(f"obj_{i}", data)
+    print(pipeline.summary())
+"""
+
+import sys
+import threading
+import time
+
+DEFAULT_WINDOW = 64
+DEFAULT_REPORT_INTERVAL = 1.0
+
+
+class AioPipelineError(Exception):
+    """Raised when any of the submitted ops failed"""
+
+    pass
+
+
+class AioPipeline:
+    """Bounded window of librados aio ops"""
+
+    def __init__(
+        self,
+        ioctx,
+        window=DEFAULT_WINDOW,
+        total=None,
+        label="ops",
+        report_interval=DEFAULT_REPORT_INTERVAL,
+        stream=None,
+    ):
+        """
+        Args:
+            ioctx: librados Ioctx of the pool
+            window: maximum number of ops in flight
+            total: expected number of ops used for reporting the progress
+            label: name of the ops used for reporting
+            report_interval: minimum time in seconds between two progress lines
+            stream: stream for the progress and summary, defaults to stdout
+        """
+        self.ioctx = ioctx
+        self.window = max(int(window), 1)
+        self.total = total
+        self.label = label
+        self.report_interval = report_interval
+        self.stream = stream or sys.stdout
+
+        self.submitted = 0
+        self.completed = 0
+        self.bytes = 0
+        self.errors = []
+
+        self._slots = threading.BoundedSemaphore(self.window)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._start = None
+        self._end = None
+        self._reported = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.drain()
+        if exc_type is None:
+            self.raise_on_error()
+        return False
+
+    def _submit(self, obj, issue, size=0, release=None):
+        """Waits for a free slot and issues the aio op
+
+        Args:
+            obj: name of the object
+            issue: method accepting the completion callback and issuing the op
+            size: number of bytes written by the op
+            release: method to be invoked once the op is complete
+        """
+        if self._start is None:
+            self._start = time.time()
+
+        self._slots.acquire()
+
+        def _complete(completion):
+            rc = completion.get_return_value()
+            with self._lock:
+                self.completed += 1
+                if rc < 0:
+                    self.errors.append((obj, rc))
+                else:
+                    self.bytes += size
+                self._idle.notify_all()
+
+            if release:
+                release()
+            self._slots.release()
+
+        with self._lock:
+            self.submitted += 1
+
+        try:
+            issue(_complete)
+        except Exception:
+            with self._lock:
+                self.submitted -= 1
+            self._slots.release()
+            raise
+
+        self.report()
+
+    def write(self, obj, data, offset=0):
+        """Writes the data to the object asynchronously"""
+        self._submit(
+            obj,
+            lambda cb: self.ioctx.aio_write(obj, data, offset, oncomplete=cb),
+            size=len(data),
+        )
+
+    def remove(self, obj):
+        """Removes the object asynchronously"""
+        self._submit(obj, lambda cb: self.ioctx.aio_remove(obj, oncomplete=cb))
+
+    def set_omap(self, obj, keys, values):
+        """Sets the omap entries of the object asynchronously"""
+        write_op = self.ioctx.create_write_op()
+        self.ioctx.set_omap(write_op, keys, values)
+        self._submit(
+            obj,
+            lambda cb: self.ioctx.operate_aio_write_op(write_op, obj, oncomplete=cb),
+            size=sum(len(k) + len(v) for k, v in zip(keys, values)),
+            release=lambda: self.ioctx.release_write_op(write_op),
+        )
+
+    def drain(self):
+        """Waits for all the ops in flight to complete"""
+        with self._idle:
+            while self.completed < self.submitted:
+                self._idle.wait(self.report_interval)
+
+        if self._start is not None:
+            self._end = time.time()
+        self.report(force=True)
+
+    def raise_on_error(self):
+        """Raises AioPipelineError if any of the ops failed"""
+        if self.errors:
+            obj, rc = self.errors[0]
+            raise AioPipelineError(
+                f"{len(self.errors)} {self.label} failed, first failure {obj} returned {rc}"
+            )
+
+    def report(self, force=False):
+        """Prints the progress if the report interval has elapsed"""
+        now = time.time()
+        if not force and now - self._reported < self.report_interval:
+            return
+
+        self._reported = now
+        total = f" of {self.total}" if self.total is not None else ""
+        print(
+            f"completed {self.completed}{total} {self.label}",
+            end="\r",
+            file=self.stream,
+        )
+        self.stream.flush()
+
+    @property
+    def elapsed(self):
+        if self._start is None:
+            return 0.0
+        return (self._end or time.time()) - self._start
+
+    def summary(self):
+        """Returns the throughput summary of the completed ops"""
+        elapsed = self.elapsed or 1e-9
+        return (
+            f"{self.completed} {self.label} in {self.elapsed:.2f}s: "
+            f"{self.completed / elapsed:.1f} ops/s, "
+            f"{self.bytes / elapsed / 1048576:.2f} MiB/s, "
+            f"{len(self.errors)} errors, window {self.window}"
+        )
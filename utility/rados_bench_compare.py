@@ -0,0 +1,81 @@
+"""
+Compares the rados bench results of a build against a baseline build and flags
+the regressions. The results are recorded by RadosOrchestrator.bench_write when
+record_results is provided.
+
+Exit code is 1 when any of the metrics regressed beyond the tolerance.
+"""
+
+import sys
+
+from docopt import docopt
+
+from ceph.rados.rados_bench import DEFAULT_RESULTS_DB, BenchResultStore
+
+doc = """
+Compare the rados bench results against a baseline build
+
+    Usage:
+        rados_bench_compare.py --build <build> --baseline <build>
+            [--db <path>] [--suite <suite>] [--pool-profile <profile>]
+            [--cluster-shape <shape>] [--mode <mode>] [--tolerance <pct>]
+            [--metric-tolerance <metric=pct>...]
+        rados_bench_compare.py (-h | --help)
+
+    Options:
+        -h --help                         Shows the command usage
+        --build <build>                   build to be verified eg: 18.2.1-229.el9cp
+        --baseline <build>                reference build eg: 18.2.1-194.el9cp
+        --db <path>                       results store [default: {db}]
+        --suite <suite>                   compare only the results of the suite
+        --pool-profile <profile>          compare only the pool profile eg: ec-jerasure-4-2
+        --cluster-shape <shape>           compare only the cluster shape eg: hosts-4-osds-12
+        --mode <mode>                     compare only the write, seq or rand results
+        --tolerance <pct>                 allowed degradation in percent [default: 10]
+        --metric-tolerance <metric=pct>   per metric tolerance eg: latency_max=25
+""".format(
+    db=DEFAULT_RESULTS_DB
+)
+
+
+def main(args):
+    tolerances = dict()
+    for entry in args["--metric-tolerance"]:
+        metric, _, pct = entry.partition("=")
+        tolerances[metric] = float(pct) / 100
+
+    store = BenchResultStore(args["--db"])
+    try:
+        report = store.compare(
+            args["--build"],
+            args["--baseline"],
+            tolerance=float(args["--tolerance"]) / 100,
+            tolerances=tolerances,
+            suite=args["--suite"],
+            pool_profile=args["--pool-profile"],
+            cluster_shape=args["--cluster-shape"],
+            mode=args["--mode"],
+        )
+    finally:
+        store.close()
+
+    if not report:
+        print(f"No comparable results of {args['--build']} and {args['--baseline']}")
+        return 0
+
+    failed = False
+    for key, regressions in sorted(report.items(), key=str):
+        status = "REGRESSED" if regressions else "OK"
+        print(f"{status:<10}{' '.join(str(k) for k in key)}")
+        for reg in regressions:
+            failed = True
+            print(
+                f"{'':<10}{reg.metric}: {reg.baseline:.4f} -> {reg.current:.4f} "
+                f"({reg.change * 100:+.1f}%)"
+            )
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(docopt(doc)))
@@ -0,0 +1,264 @@
+"""Dependency aware scheduler executing the suite tests concurrently.
+
+Every test of the suite can declare the resources it works on and the tests it
+depends on. Tests without any declaration claim their clusters exclusively,
+hence suites without the new keys are executed in the suite order.
+
+Example::
+
+    tests:
+      - test:
+          name: verify pool stats
+          module: test_pool_stats.py
+          resources:
+            - cluster: ceph-pri
+              pool: rbd
+              mode: shared
+          depends-on:
+            - create rbd pool
+
+A test conflicts with an earlier test of the suite when their claims overlap
+i.e. one of the resource paths is a prefix of the other and at least one of the
+claims is exclusive. The conflicting tests are executed in the suite order while
+the rest are dispatched to the worker pool as soon as their dependencies are
+complete. Tests destroying or recreating the clusters act as barriers.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from utility.log import Log
+
+log = Log(__name__)
+
+EXCLUSIVE = "exclusive"
+SHARED = "shared"
+BARRIER_KEYS = ("destroy-cluster", "recreate-cluster")
+
+
+class TestSchedulerError(Exception):
+    """Raised when the suite resource claims or dependencies are invalid."""
+
+    pass
+
+
+class Claim:
+    """Resource claimed by a test."""
+
+    def __init__(self, path, mode=EXCLUSIVE):
+        """
+        Args:
+            path (tuple): resource path i.e. ("cluster", "ceph", "pool", "rbd")
+            mode (str): exclusive or shared
+        """
+        if mode not in (EXCLUSIVE, SHARED):
+            raise TestSchedulerError(f"Unsupported resource claim mode {mode}")
+
+        self.path = tuple(path)
+        self.mode = mode
+
+    def overlaps(self, other):
+        """Checks whether the resource paths overlap."""
+        _len = min(len(self.path), len(other.path))
+        return self.path[:_len] == other.path[:_len]
+
+    def conflicts(self, other):
+        """Checks whether the claims cannot be held at the same time."""
+        if self.mode == SHARED and other.mode == SHARED:
+            return False
+
+        return self.overlaps(other)
+
+    def __repr__(self):
+        return f"{'/'.join(self.path)}:{self.mode}"
+
+
+class TestNode:
+    """Test of the suite along with its claims and dependencies."""
+
+    def __init__(self, index, name, test, claims, barrier=False):
+        """
+        Args:
+            index (int): position of the test in the suite
+            name (str): name of the test
+            test (dict): test definition of the suite
+            claims (list): resources claimed by the test
+            barrier (bool): test requires exclusive access to the complete run
+        """
+        self.index = index
+        self.name = name
+        self.test = test
+        self.claims = claims
+        self.barrier = barrier
+        self.depends_on = set()
+        self.required = set()
+
+    def __repr__(self):
+        return f"TestNode({self.index}, {self.name})"
+
+
+def get_claims(test, clusters):
+    """Returns the resource claims of the test.
+
+    Args:
+        test (dict): test definition of the suite
+        clusters (list): names of the clusters of the run
+
+    Returns:
+        list of Claim
+    """
+    resources = test.get("resources")
+    if not resources:
+        return [Claim(("cluster", c)) for c in test.get("clusters") or clusters]
+
+    claims = list()
+    for resource in resources:
+        mode = resource.get("mode", EXCLUSIVE)
+        cluster = resource.get("cluster")
+        targets = [cluster] if cluster else list(test.get("clusters") or clusters)
+
+        for target in targets:
+            path = ["cluster", target]
+            if resource.get("pool"):
+                path.extend(["pool", resource["pool"]])
+            claims.append(Claim(path, mode))
+
+    return claims
+
+
+def plan(tests, clusters):
+    """Builds the dependency graph of the suite tests.
+
+    Args:
+        tests (list): test definitions in the suite order
+        clusters (list): names of the clusters of the run
+
+    Returns:
+        list of TestNode in the suite order
+
+    Raises:
+        TestSchedulerError: on unknown or cyclic dependencies
+    """
+    nodes = list()
+    names = dict()
+    for index, test in enumerate(tests):
+        node = TestNode(
+            index,
+            test.get("name"),
+            test,
+            get_claims(test, clusters),
+            barrier=any(test.get(k) is True for k in BARRIER_KEYS),
+        )
+        names.setdefault(node.name, []).append(node)
+        nodes.append(node)
+
+    for node in nodes:
+        deps = node.test.get("depends-on") or []
+        for dep in [deps] if isinstance(deps, str) else deps:
+            if dep not in names:
+                raise TestSchedulerError(f"{node.name} depends on unknown test '{dep}'")
+            _deps = {n.index for n in names[dep] if n is not node}
+            node.depends_on |= _deps
+            node.required |= _deps
+
+        for prev in nodes[: node.index]:
+            if prev.barrier or node.barrier:
+                node.depends_on.add(prev.index)
+                continue
+
+            if any(a.conflicts(b) for a in node.claims for b in prev.claims):
+                node.depends_on.add(prev.index)
+
+    _check_cycles(nodes)
+    return nodes
+
+
+def _check_cycles(nodes):
+    """Raises TestSchedulerError when the dependencies are cyclic."""
+    pending = {n.index: set(n.depends_on) for n in nodes}
+    while pending:
+        ready = [i for i, deps in pending.items() if not deps & pending.keys()]
+        if not ready:
+            cycle = ", ".join(nodes[i].name for i in sorted(pending))
+            raise TestSchedulerError(f"Cyclic dependency between tests: {cycle}")
+
+        for i in ready:
+            pending.pop(i)
+
+
+class TestScheduler:
+    """Executes the planned tests on a pool of workers."""
+
+    def __init__(self, nodes, workers=1):
+        """
+        Args:
+            nodes (list): TestNode objects returned by plan
+            workers (int): maximum number of tests executed concurrently
+        """
+        self.nodes = nodes
+        self.workers = max(int(workers), 1)
+        self.results = dict()
+        self.aborted = False
+
+    def run(self, execute, succeeded=bool, abort=None, skip=None):
+        """Executes the tests honouring the dependencies.
+
+        A test is dispatched once all the tests it depends on are complete. A
+        test whose explicit dependency did not succeed is not executed and the
+        value returned by skip is recorded as its result. Scheduling of new
+        tests stops once abort returns True, the tests in flight are awaited.
+
+        Args:
+            execute: method accepting the TestNode and returning the result
+            succeeded: method accepting the result, returns True on success
+            abort: method accepting the TestNode and result, returns True to
+                   stop scheduling the remaining tests
+            skip: method accepting the TestNode whose dependencies failed
+
+        Returns:
+            list of (TestNode, result) of the processed tests in the suite order
+        """
+        done, passed = set(), set()
+        pending = list(self.nodes)
+        in_flight = dict()
+
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="cephci-test"
+        ) as executor:
+            while True:
+                while not self.aborted and len(in_flight) < self.workers:
+                    node = next((n for n in pending if n.depends_on <= done), None)
+                    if node is None:
+                        break
+
+                    pending.remove(node)
+                    if not node.required <= passed:
+                        log.info(
+                            f"Not executing {node.name} as its dependencies failed"
+                        )
+                        self.results[node.index] = skip(node) if skip else None
+                        done.add(node.index)
+                        continue
+
+                    log.debug(f"Dispatching test {node.name}")
+                    in_flight[executor.submit(execute, node)] = node
+
+                if not in_flight:
+                    break
+
+                finished, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                for future in sorted(finished, key=lambda f: in_flight[f].index):
+                    node = in_flight.pop(future)
+                    result = future.result()
+                    self.results[node.index] = result
+                    done.add(node.index)
+                    if succeeded(result):
+                        passed.add(node.index)
+                    elif abort and abort(node, result):
+                        log.info(f"Aborting the run on failure of {node.name}")
+                        self.aborted = True
+
+        return [
+            (node, self.results[node.index])
+            for node in self.nodes
+            if self.results.get(node.index) is not None
+        ]
@@ -0,0 +1,326 @@
+"""
+Prebuilt, content-addressed tooling bundles for the test nodes.
+
+Setting up the test tooling e.g. ceph-qe-scripts on a node used to take a git
+clone, a virtualenv creation and a pip install from the external mirrors on
+every node of every fresh cluster. A bundle is built once, as a tarball of the
+cloned repo along with the virtualenv holding its requirements, cached on the
+controller and pushed to the nodes in a single SFTP transfer each.
+
+The bundles are keyed by a hash of the repo, its revision, the requirements
+and the platform of the node i.e. the distribution, the python version and the
+architecture. The virtualenv is built on a node of the same platform at the
+same path it is extracted to, hence it can be relocated as is.
+
+The revision of a branch is resolved once per run. Nodes already holding a
+bundle of the same repo and branch are skipped, so that the tooling and the
+configs written to it by the earlier tests are kept even if the branch moved.
+A bundle is only archived into the cache when it is pushed to other nodes,
+a single node is set up in place like a plain clone.
+
+Usage:
+    bundle = ToolBundle(
+        name="rgw-tests",
+        repo_url="https://github.com/red-hat-storage/ceph-qe-scripts.git",
+        branch="master",
+        requirements="rgw/requirements.txt",
+    )
+    bundle.deploy([client_node, rgw_node])
+"""
+
+import hashlib
+import json
+import os
+import re
+import shlex
+import subprocess
+import threading
+from collections import namedtuple
+
+from ceph.parallel import parallel
+from utility.log import Log
+
+log = Log(__name__)
+
+DEFAULT_CACHE_DIR = os.path.expanduser("~/.cephci/bundles")
+CACHED_BUNDLES = 10
+BUILD_TIMEOUT = 1800
+
+# Prints the platform, the home directory and the key of the installed bundle
+PROBE_SCRIPT = (
+    "command -v python3 >/dev/null || "
+    "sudo yum install -y --nogpgcheck python3 >/dev/null 2>&1; "
+    ". /etc/os-release; "
+    "echo \"$ID-$VERSION_ID-$(python3 -c 'import sys, platform; "
+    'print("py%d.%d-%s" % (sys.version_info[0], sys.version_info[1], '
+    "platform.machine()))')\"; "
+    'echo "$HOME"; '
+    "cat {marker} 2>/dev/null; true"
+)
+
+NodeState = namedtuple("NodeState", ["node", "platform", "home", "installed"])
+
+# Revisions of the branches resolved in this run
+_REVISIONS = dict()
+_REVISIONS_LOCK = threading.Lock()
+
+
+def resolve_revision(repo_url, branch, node=None):
+    """Returns the commit the branch of the repo points to.
+
+    The revision is resolved from the controller, or from the node when the
+    controller cannot reach the repo. It is resolved once per run, the later
+    calls return the same revision.
+
+    Args:
+        repo_url (str): git url of the repo
+        branch (str): branch, tag or commit
+        node: CephNode used when the controller cannot resolve the revision
+    """
+    if re.fullmatch(r"[0-9a-f]{40}", branch):
+        return branch
+
+    with _REVISIONS_LOCK:
+        if (repo_url, branch) in _REVISIONS:
+            return _REVISIONS[(repo_url, branch)]
+
+    cmd = f"git ls-remote {shlex.quote(repo_url)} {shlex.quote(branch)}"
+    try:
+        out = subprocess.run(
+            cmd, shell=True, capture_output=True, text=True, timeout=60
+        ).stdout
+    except subprocess.TimeoutExpired:
+        out = ""
+
+    if not out and node:
+        out, _ = node.exec_command(cmd=cmd, check_ec=False)
+
+    if not out:
+        raise Exception(f"Unable to resolve {branch} of {repo_url}")
+
+    with _REVISIONS_LOCK:
+        return _REVISIONS.setdefault((repo_url, branch), out.split()[0])
+
+
+class ToolBundle(object):
+    """A git repo and the virtualenv of its requirements, built once per key."""
+
+    def __init__(
+        self,
+        name,
+        repo_url,
+        branch="master",
+        requirements="requirements.txt",
+        venv="venv",
+        cache_dir=DEFAULT_CACHE_DIR,
+    ):
+        """
+        Args:
+            name (str): directory of the home the repo is cloned in
+            repo_url (str): git url of the repo
+            branch (str): branch, tag or commit of the repo
+            requirements (str): requirements file relative to the repo
+            venv (str): directory of the home holding the virtualenv
+            cache_dir (str): directory of the controller caching the bundles
+        """
+        self.name = name
+        self.repo_url = repo_url
+        self.branch = branch
+        self.requirements = requirements
+        self.venv = venv
+        self.cache_dir = cache_dir
+        self.repo_dir = f"{name}/{os.path.basename(repo_url).replace('.git', '')}"
+        self.marker = f"~/.cephci-bundle-{name}"
+        self._revision = None
+
+    @property
+    def revision(self):
+        if self._revision is None:
+            self._revision = resolve_revision(self.repo_url, self.branch)
+        return self._revision
+
+    def resolve(self, node=None):
+        """Resolves the revision of the branch once per bundle."""
+        if self._revision is None:
+            self._revision = resolve_revision(self.repo_url, self.branch, node)
+        return self._revision
+
+    def key(self, platform, home):
+        """Returns the content key of the bundle for the platform and home."""
+        content = json.dumps(
+            [
+                self.repo_url,
+                self.revision,
+                self.requirements,
+                self.venv,
+                self.name,
+                platform,
+                home,
+            ]
+        )
+        return hashlib.sha256(content.encode()).hexdigest()[:20]
+
+    @property
+    def source(self):
+        """Identifies the repo, branch and layout of the bundle, not its revision."""
+        content = json.dumps(
+            [self.repo_url, self.branch, self.requirements, self.venv, self.name]
+        )
+        return hashlib.sha256(content.encode()).hexdigest()[:20]
+
+    def path(self, key):
+        """Returns the path of the bundle in the cache of the controller."""
+        return os.path.join(self.cache_dir, f"{self.name}-{key}.tar.gz")
+
+    def probe(self, node):
+        """Returns the platform, home directory and installed bundle of the node."""
+        out, _ = node.exec_command(
+            cmd=f"bash -c {shlex.quote(PROBE_SCRIPT.format(marker=self.marker))}"
+        )
+        lines = out.splitlines() + ["", "", ""]
+        return NodeState(node, lines[0].strip(), lines[1].strip(), lines[2].strip())
+
+    def _remove_cmd(self):
+        return f"sudo rm -rf ~/{self.name} ~/{self.venv} {self.marker}"
+
+    def _install(self, node, script, **kw):
+        """Executes the install script, a partial install is removed on failure."""
+        try:
+            node.exec_command(cmd=f"bash -c {shlex.quote(script)}", **kw)
+        except Exception:
+            node.exec_command(cmd=self._remove_cmd(), check_ec=False)
+            raise
+
+    def _marker_cmd(self, key):
+        return f"echo {key} {self.source} > {self.marker}"
+
+    def build(self, node, key, archive=True):
+        """Builds the bundle on the node and stores it in the cache.
+
+        The node is left with the bundle installed.
+
+        Args:
+            node (CephNode): node of the platform of the key
+            key (str): key of the bundle
+            archive (bool): store the bundle in the cache of the controller
+
+        Returns:
+            the path of the cached bundle, None if not archived
+        """
+        remote = f"/tmp/{self.name}-{key}.tar.gz"
+        log.info(f"Building the {self.name} bundle {key} on {node.shortname}")
+        requirements = f"{self.repo_dir}/{self.requirements}"
+        steps = [
+            "cd ~",
+            self._remove_cmd(),
+            f"mkdir -p {self.name}",
+            f"git clone -q {shlex.quote(self.repo_url)} {self.repo_dir}",
+            f"git -C {self.repo_dir} checkout -q {self.revision}",
+            f"python3 -m venv {self.venv}",
+            f"{self.venv}/bin/pip install -q --upgrade pip",
+            f"{self.venv}/bin/pip install -q -r {requirements}",
+        ]
+        if archive:
+            steps.append(f"tar czf {remote} {self.name} {self.venv}")
+        steps.append(self._marker_cmd(key))
+        self._install(
+            node,
+            " && ".join(steps),
+            long_running=True,
+            check_ec=True,
+            timeout=BUILD_TIMEOUT,
+        )
+        if not archive:
+            return None
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path(key)
+        partial = f"{path}.{os.getpid()}.part"
+        try:
+            node.download_file(remote, partial)
+            os.replace(partial, path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+            node.exec_command(cmd=f"rm -f {remote}", check_ec=False)
+        self._prune()
+        return path
+
+    def push(self, node, key):
+        """Installs the cached bundle on the node in a single transfer."""
+        remote = f"/tmp/{self.name}-{key}.tar.gz"
+        log.info(f"Pushing the {self.name} bundle {key} to {node.shortname}")
+        node.upload_file(self.path(key), remote)
+        script = " && ".join(
+            [
+                "cd ~",
+                self._remove_cmd(),
+                f"tar xzf {remote}",
+                f"rm -f {remote}",
+                f"{self.venv}/bin/python -c 'import sys'",
+                self._marker_cmd(key),
+            ]
+        )
+        self._install(node, script)
+
+    def _prune(self):
+        bundles = [
+            os.path.join(self.cache_dir, f)
+            for f in os.listdir(self.cache_dir)
+            if f.startswith(f"{self.name}-") and f.endswith(".tar.gz")
+        ]
+        bundles.sort(key=os.path.getmtime, reverse=True)
+        for stale in bundles[CACHED_BUNDLES:]:
+            os.remove(stale)
+
+    def deploy(self, nodes):
+        """Installs the bundle on the nodes which do not hold it already.
+
+        A bundle missing from the cache is built on the first node of its
+        platform, then pushed to all the other nodes concurrently. The
+        revision is only resolved when a node has to be set up.
+
+        Args:
+            nodes (list): CephNodes the bundle is installed on
+
+        Returns:
+            a dict of the node shortname and its action, one of skipped, built
+            or pushed
+        """
+        nodes = list({id(n): n for n in nodes}.values())
+        with parallel() as p:
+            for node in nodes:
+                p.spawn(self.probe, node)
+
+        actions, pending = dict(), dict()
+        for state in p.results:
+            installed = state.installed.split()
+            if self.source in installed[1:]:
+                log.info(f"{state.node.shortname} holds the {self.name} bundle")
+                actions[state.node.shortname] = "skipped"
+                continue
+
+            self.resolve(state.node)
+            key = self.key(state.platform, state.home)
+            if installed[:1] == [key]:
+                log.info(f"{state.node.shortname} holds the {self.name} bundle {key}")
+                actions[state.node.shortname] = "skipped"
+                continue
+
+            pending.setdefault(key, list()).append(state.node)
+
+        pushes = list()
+        for key, targets in pending.items():
+            if not os.path.exists(self.path(key)):
+                builder, targets = targets[0], targets[1:]
+                self.build(builder, key, archive=bool(targets))
+                actions[builder.shortname] = "built"
+            pushes.extend((node, key) for node in targets)
+
+        if pushes:
+            with parallel() as p:
+                for node, key in pushes:
+                    p.spawn(self.push, node, key)
+            for node, _ in pushes:
+                actions[node.shortname] = "pushed"
+        return actions
@@ -28,6 +28,7 @@ from jinja_markdown import MarkdownExtension
 from packaging.version import InvalidVersion, Version
 
 from cli.exceptions import ConfigError
+from utility.fio_results import collect_fio_results
 from utility.log import Log
 
 log = Log(__name__)
@@ -2311,6 +2312,8 @@ def run_fio(**fio_args):
         size: 'size' for file size/io size
         cmd_timeout: command timeout in seconds eg., 'notimeout' | 1200
         no_run_time: None | no_runtime
+        results: list extended with the FioRecord objects of the run when the
+                 output_format is json or json+
     Prerequisite: fio package must have been installed on the client node.
     One of device_name, filename, (rbdname,pool) is required.
     """
@@ -2400,6 +2403,12 @@ def run_fio(**fio_args):
 
     out = fio_args["client_node"].exec_command(**exec_args)
     if output_fmt:
+        if fio_args.get("results") is not None and output_fmt.startswith("json"):
+            fio_args["results"].extend(
+                collect_fio_results(
+                    fio_args["client_node"], [cmd_args["output"]], cmd_args["name"]
+                )
+            )
         return cmd_args["output"]
     return out
 